@@ -17,18 +17,26 @@ Flujo:
 from __future__ import annotations
 
 import logging
-import io
+import os
 from typing import Any
 
 import streamlit as st
 
 from core.validator_core import (
-    run_validation,
+    iter_validation,
+    preflight,
+    reaggregate,
     build_excel,
     DEFAULT_PCT_OK_AMARILLO,
     DEFAULT_PCT_ROJO_ROJO,
+    MODOS_EVALUACION,
 )
-from ui.styling import render_all_results
+from core.crudos_cache import CacheCrudos
+from core.frames_cache import CacheDataFrames, CacheFeather, cargar_pyarrow
+from core.fuente_archivo import FuenteArchivo
+from core.umbrales_cache import CacheUmbrales
+from core.models import EventoValidacion
+from ui.styling import render_all_results, render_crudos_terminados, render_preflight, texto_progreso
 
 logging.basicConfig(
     level=logging.INFO,
@@ -50,13 +58,43 @@ st.set_page_config(
 )
 
 
+@st.cache_resource
+def _cache_umbrales() -> CacheUmbrales:
+    """Caché en disco de la matriz compilada, compartida por todas las sesiones."""
+    return CacheUmbrales()
+
+
+@st.cache_resource
+def _cache_frames() -> CacheDataFrames:
+    """ISA/RAMS ya parseados, compartidos por todas las sesiones (disco si hay pyarrow)."""
+    return CacheDataFrames(disco=CacheFeather() if cargar_pyarrow() is not None else None)
+
+
+def _fuente(f, fuentes: list[FuenteArchivo]) -> FuenteArchivo:
+    """Vista sobre el buffer subido (sin copiar los bytes); se anota en `fuentes` para cerrarla."""
+    f.seek(0)
+    fuente = FuenteArchivo.desde(f, f.name)
+    fuentes.append(fuente)
+    return fuente
+
+
+def _clave_excel(result: Any) -> tuple:
+    """Identifica el resultado (y sus porcentajes) con el que se generó excel_bytes."""
+    return (id(result), result.pct_ok_amarillo, result.pct_rojo_rojo)
+
+
 def _init_state() -> None:
     defaults: dict[str, Any] = {
         "matriz_file":  None,
         "isa_files":    [],
         "rams_files":   [],
         "result":       None,
+        "preflight":    None,
         "excel_bytes":  None,
+        "excel_clave":  None,       # (id(result), pct_ok, pct_rojo) de excel_bytes
+        # Resultados por crudo de esta sesión: al revalidar, solo se
+        # recalculan los pares que cambiaron
+        "cache_crudos": CacheCrudos(),
     }
     for key, val in defaults.items():
         if key not in st.session_state:
@@ -101,9 +139,9 @@ def render_sidebar():
         st.header("📂 Archivos ISA")
         isa_uploaded = st.file_uploader(
             "Selecciona archivos ISA",
-            type=["xlsx", "xls", "csv"],
+            type=["xlsx", "xls", "csv", "zip"],
             accept_multiple_files=True,
-            help="Archivos de predicciones ISA a validar.",
+            help="Archivos de predicciones ISA a validar, sueltos o en uno o varios ZIP.",
             key="uploader_isa",
         )
         if isa_uploaded:
@@ -115,9 +153,9 @@ def render_sidebar():
         st.header("📂 Archivos RAMS")
         rams_uploaded = st.file_uploader(
             "Selecciona archivos RAMS",
-            type=["xlsx", "xls", "csv"],
+            type=["xlsx", "xls", "csv", "zip"],
             accept_multiple_files=True,
-            help="Archivos de referencia RAMS.",
+            help="Archivos de referencia RAMS, sueltos o en uno o varios ZIP.",
             key="uploader_rams",
         )
         if rams_uploaded:
@@ -125,6 +163,15 @@ def render_sidebar():
         if st.session_state.rams_files:
             st.success(f"✅ {len(st.session_state.rams_files)} archivo(s) RAMS cargado(s)")
 
+        multihoja = st.checkbox(
+            "Una hoja por crudo",
+            value=bool(st.secrets.get("defaults", {}).get("multihoja", False)),
+            help=(
+                "Los libros ISA/RAMS con varias hojas aportan un crudo por hoja, "
+                "emparejado por el nombre de la hoja. Desactivado = solo la primera hoja."
+            ),
+        )
+
         st.divider()
 
         # --- 4. Parámetros de agregación global ---
@@ -156,6 +203,43 @@ def render_sidebar():
                 help="Si > X% de cortes son ROJO, la propiedad/crudo es ROJO (ej. 0.30 = 30%).",
             )
 
+        # --- 5. Rendimiento ---
+        max_workers = os.cpu_count() or 1
+        workers = st.number_input(
+            "Procesos de lectura",
+            min_value=1,
+            max_value=max_workers,
+            value=min(max_workers, int(st.secrets.get("defaults", {}).get("workers", 1))),
+            step=1,
+            help="Archivos ISA/RAMS que se leen en paralelo (1 = en serie).",
+        )
+        modos = list(MODOS_EVALUACION)
+        modo_defecto = st.secrets.get("defaults", {}).get("evaluacion", "serie")
+        modo_evaluacion = st.selectbox(
+            "Evaluación de crudos",
+            options=modos,
+            index=modos.index(modo_defecto) if modo_defecto in modos else 0,
+            help=(
+                "Con más de un proceso de lectura, evalúa los crudos en un pool de hilos "
+                "o de procesos. El resultado es el mismo que en serie."
+            ),
+        )
+
+        st.divider()
+        preflight_btn = st.button(
+            "🔎 Comprobación previa",
+            disabled=not (
+                st.session_state.matriz_file
+                and st.session_state.isa_files
+                and st.session_state.rams_files
+            ),
+            use_container_width=True,
+            help=(
+                "Lee solo las cabeceras y la columna Propiedad: emparejamiento, "
+                "cortes y propiedades sin umbral o sin RAMS, sin validar."
+            ),
+        )
+
         st.divider()
         st.caption("© Todos los derechos reservados")
 
@@ -166,6 +250,10 @@ def render_sidebar():
         sheet_hint,
         pct_ok_amarillo,
         pct_rojo_rojo,
+        int(workers),
+        modo_evaluacion,
+        multihoja,
+        preflight_btn,
     )
 
 
@@ -179,6 +267,10 @@ def main() -> None:
         sheet_hint,
         pct_ok_amarillo,
         pct_rojo_rojo,
+        workers,
+        modo_evaluacion,
+        multihoja,
+        preflight_btn,
     ) = render_sidebar()
 
     st.title("🛢️ Validador de Crudos RAMS vs ISA")
@@ -223,30 +315,49 @@ def main() -> None:
 
     st.divider()
 
+    if preflight_btn:
+        fuentes_previa: list[FuenteArchivo] = []
+        try:
+            st.session_state.preflight = preflight(
+                isa_files={f.name: _fuente(f, fuentes_previa) for f in isa_files_raw},
+                rams_files={f.name: _fuente(f, fuentes_previa) for f in rams_files_raw},
+                matriz_file=_fuente(matriz_file, fuentes_previa),
+                matriz_filename=matriz_file.name,
+                sheet_hint=sheet_hint,
+                cache_umbrales=_cache_umbrales(),
+                multihoja=multihoja,
+            )
+        except ValueError as e:
+            st.session_state.preflight = None
+            st.error(f"❌ Error de configuración o datos: {e}")
+            logger.warning("ValueError en preflight: %s", e)
+        finally:
+            for fuente in fuentes_previa:
+                fuente.cerrar()
+
+    if st.session_state.preflight is not None:
+        with st.expander("🔎 Comprobación previa", expanded=not st.session_state.preflight.ok):
+            render_preflight(st.session_state.preflight)
+
     if run_btn:
         if not (0.0 <= pct_ok_amarillo <= 1.0 and 0.0 <= pct_rojo_rojo <= 1.0):
             st.error("❌ Los porcentajes deben estar en [0, 1].")
             st.stop()
 
-        progress = st.progress(0, text="⏳ Iniciando validación...")
-
-        try:
-            matriz_file.seek(0)
-            matriz_bytes = io.BytesIO(matriz_file.read())
-
-            isa_dict: dict[str, io.BytesIO] = {}
-            for f in isa_files_raw:
-                f.seek(0)
-                isa_dict[f.name] = io.BytesIO(f.read())
+        progress = st.progress(0.0, text="⏳ Leyendo matriz de umbrales (REPRO + ADMISIBLE)...")
+        en_curso = st.empty()
+        terminados: list[EventoValidacion] = []
 
-            rams_dict: dict[str, io.BytesIO] = {}
-            for f in rams_files_raw:
-                f.seek(0)
-                rams_dict[f.name] = io.BytesIO(f.read())
+        # Vistas sobre los buffers subidos: los bytes no se copian
+        fuentes: list[FuenteArchivo] = []
 
-            progress.progress(20, text="⏳ Leyendo matriz de umbrales (REPRO + ADMISIBLE)...")
+        try:
+            matriz_bytes = _fuente(matriz_file, fuentes)
+            isa_dict  = {f.name: _fuente(f, fuentes) for f in isa_files_raw}
+            rams_dict = {f.name: _fuente(f, fuentes) for f in rams_files_raw}
 
-            result = run_validation(
+            result = None
+            for evento in iter_validation(
                 isa_files=isa_dict,
                 rams_files=rams_dict,
                 matriz_file=matriz_bytes,
@@ -254,12 +365,28 @@ def main() -> None:
                 pct_ok_amarillo=pct_ok_amarillo,
                 pct_rojo_rojo=pct_rojo_rojo,
                 sheet_hint=sheet_hint,
-            )
-
-            progress.progress(80, text="⏳ Generando Excel...")
+                cache_umbrales=_cache_umbrales(),
+                workers=workers,
+                cache_frames=_cache_frames(),
+                multihoja=multihoja,
+                modo_evaluacion=modo_evaluacion,
+                cache_crudos=st.session_state.cache_crudos,
+            ):
+                # El último 10 % de la barra es la generación del Excel
+                progress.progress(0.9 * evento.progreso, text=texto_progreso(evento))
+                if evento.tipo in ("evaluado", "fallido"):
+                    terminados.append(evento)
+                    with en_curso.container():
+                        render_crudos_terminados(terminados)
+                elif evento.tipo == "fin":
+                    result = evento.resultado
+
+            progress.progress(0.9, text="⏳ Generando Excel...")
+            en_curso.empty()
             st.session_state.result = result
             st.session_state.excel_bytes = build_excel(result) if result.has_results else None
-            progress.progress(100, text="✅ Validación completada.")
+            st.session_state.excel_clave = _clave_excel(result)
+            progress.progress(1.0, text="✅ Validación completada.")
             logger.info(
                 "Completado: %d pares, %d ISA sin par, %d RAMS sin par",
                 result.total_pairs,
@@ -274,15 +401,35 @@ def main() -> None:
             st.stop()
         except Exception as e:
             st.error(f"❌ Error inesperado: {e}")
-            logger.exception("Error inesperado en run_validation")
+            logger.exception("Error inesperado en la validación")
             progress.empty()
             st.stop()
+        finally:
+            for fuente in fuentes:
+                fuente.cerrar()
+
+    result = st.session_state.result
+    if result is not None and (result.pct_ok_amarillo, result.pct_rojo_rojo) != (pct_ok_amarillo, pct_rojo_rojo):
+        # Solo han cambiado los porcentajes: se reagregan los conteos guardados
+        # sin volver a leer los archivos. El Excel no se reconstruye aquí
+        # (segundos con detalle completo): se genera al pedirlo, una vez por
+        # resultado y porcentajes
+        result = reaggregate(result, pct_ok_amarillo, pct_rojo_rojo)
+        st.session_state.result = result
+        logger.info("Reagregado con pct_ok_amarillo=%.2f, pct_rojo_rojo=%.2f", pct_ok_amarillo, pct_rojo_rojo)
 
     if st.session_state.result is not None:
-        render_all_results(st.session_state.result)
+        result = st.session_state.result
+        render_all_results(result)
 
-        if st.session_state.excel_bytes:
+        if result.has_results:
             st.divider()
+            if st.session_state.excel_clave != _clave_excel(result):
+                if not st.button("📄 Preparar informe Excel"):
+                    return
+                with st.spinner("Generando informe Excel…"):
+                    st.session_state.excel_bytes = build_excel(result)
+                    st.session_state.excel_clave = _clave_excel(result)
             st.download_button(
                 label="📥 Descargar Informe Excel",
                 data=st.session_state.excel_bytes,
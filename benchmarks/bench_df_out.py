@@ -0,0 +1,108 @@
+"""
+benchmarks/bench_df_out.py
+==========================
+Micro-benchmark del constructor de df_out en calcular_errores_crudo_df.
+
+Compara el antiguo patrón `df_out.loc[len(df_out)] = fila` (una reasignación
+del DataFrame por fila) con el acumulador columnar `_df_desde_columnas`,
+que construye el DataFrame una sola vez. Verifica que ambos producen los
+mismos valores de celda antes de medir.
+
+Ejecutar desde la raíz del proyecto:
+    python -m benchmarks.bench_df_out
+"""
+from __future__ import annotations
+
+import os
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.validator_core import _columna_errores, _df_desde_columnas  # noqa: E402
+
+TAMANOS = (100, 1_000, 10_000)
+N_CORTES = 40
+REPETICIONES = 3
+
+CABECERA = ["Propiedad", "Semaforo", "Corte_peor", "Error_peor", "Umbral_peor"]
+
+
+def _datos(n: int) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    cortes = [f"{100 + 10 * j}-{110 + 10 * j}" for j in range(N_CORTES)]
+    errores = rng.uniform(0.0, 5.0, size=(n, N_CORTES))
+    nulo = rng.random((n, N_CORTES)) < 0.05
+    return cortes, errores, nulo
+
+
+def _filas(n: int, cortes: List[str], errores: np.ndarray, nulo: np.ndarray) -> List[Dict[str, Any]]:
+    filas = []
+    for i in range(n):
+        fila: Dict[str, Any] = {
+            "Propiedad":   f"PROP {i}",
+            "Semaforo":    "VERDE",
+            "Corte_peor":  cortes[0],
+            "Error_peor":  float(errores[i, 0]),
+            "Umbral_peor": 1.0,
+        }
+        for j, c in enumerate(cortes):
+            fila[c] = None if nulo[i, j] else float(errores[i, j])
+        filas.append(fila)
+    return filas
+
+
+def construir_loc(filas: List[Dict[str, Any]], columnas: List[str]) -> pd.DataFrame:
+    df_out = pd.DataFrame(columns=columnas)
+    for fila in filas:
+        df_out.loc[len(df_out)] = fila
+    return df_out
+
+
+def construir_columnar(filas: List[Dict[str, Any]], cortes: List[str],
+                       errores: np.ndarray, nulo: np.ndarray) -> pd.DataFrame:
+    columnas: List[Tuple[str, Any]] = [(c, [f[c] for f in filas]) for c in CABECERA]
+    for j, c in enumerate(cortes):
+        columnas.append((c, _columna_errores(errores[:, j], nulo[:, j])))
+    return _df_desde_columnas(columnas)
+
+
+def _mejor_tiempo(fn, *args) -> float:
+    mejor = float("inf")
+    for _ in range(REPETICIONES):
+        t0 = time.perf_counter()
+        fn(*args)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor
+
+
+def _celdas(df: pd.DataFrame) -> list:
+    """Valores por fila, con None para cualquier nulo (None o NaN)."""
+    return [[None if pd.isna(v) else repr(v) for v in fila] for fila in df.values.tolist()]
+
+
+def main() -> None:
+    print(f"{'filas':>8} | {'loc (s)':>10} | {'columnar (s)':>12} | {'speedup':>8}")
+    print("-" * 48)
+    for n in TAMANOS:
+        cortes, errores, nulo = _datos(n)
+        filas = _filas(n, cortes, errores, nulo)
+
+        t0 = time.perf_counter()
+        df_loc = construir_loc(filas, CABECERA + cortes)
+        t_loc = time.perf_counter() - t0   # una sola pasada: a 10 000 filas tarda decenas de segundos
+        df_col = construir_columnar(filas, cortes, errores, nulo)
+        assert list(df_loc.columns) == list(df_col.columns)
+        # pandas 2.x convierte en NaN el None de un corte sin valor al añadir por filas
+        assert _celdas(df_loc) == _celdas(df_col), "Resultados distintos"
+
+        t_col = _mejor_tiempo(construir_columnar, filas, cortes, errores, nulo)
+        print(f"{n:>8} | {t_loc:>10.4f} | {t_col:>12.4f} | {t_loc / t_col:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
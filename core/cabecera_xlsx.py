@@ -0,0 +1,193 @@
+"""
+core/cabecera_xlsx.py
+=====================
+Lectura mínima de un libro .xlsx para la comprobación previa: la fila de
+cabecera y una sola columna de cada hoja, sin parsear el resto de celdas.
+
+openpyxl, incluso en modo read_only, carga estilos al abrir el libro y
+convierte todas las celdas de cada fila que recorre: para saber qué
+propiedades trae un ISA hay que parsear la hoja entera. Aquí se lee el XML
+del paquete con zipfile y se localizan con expresiones regulares solo las
+celdas pedidas; el resto del XML no se tokeniza.
+
+Conversión de celdas igual que openpyxl (values_only, data_only) para
+cadenas compartidas, inline y de fórmula, números, booleanos, errores y
+fechas ISO. Los números con formato de fecha se devuelven como número (no se
+leen los estilos). Las hojas que no siguen el formato que escriben Excel,
+openpyxl o xlsxwriter (atributo r primero, sin prefijo de espacio de nombres)
+lanzan `FormatoNoSoportado`, y el llamante debe usar openpyxl.
+
+Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+import html
+import posixpath
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from typing import IO, Any, Dict, List, Optional, Tuple
+
+from openpyxl.reader.strings import read_string_table
+from openpyxl.utils import column_index_from_string, get_column_letter
+from openpyxl.utils.datetime import from_ISO8601
+
+_NS_PKG = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_NS_MAIN = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_NS_REL = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_TIPO_DOCUMENTO = "/officeDocument"
+_TIPO_HOJA = "/worksheet"
+_TIPO_CADENAS = "/sharedStrings"
+
+_RE_PRIMERA_CELDA = re.compile(rb"<c[\s/>]")
+_RE_ATRIBUTO_T = re.compile(rb'\st="([^"]*)"')
+_RE_V = re.compile(rb"<v>([^<]*)</v>")
+_RE_FONETICA = re.compile(rb"<rPh\b.*?</rPh>", re.S)
+_RE_T = re.compile(rb"<t(?:\s[^>]*)?>([^<]*)</t>")
+_RE_REF = re.compile(rb'<c r="([A-Z]+)(\d+)"')
+_RE_DIMENSION = re.compile(rb'<dimension ref="(?:[A-Z]+\d+:)?([A-Z]+)\d+"')
+
+
+class FormatoNoSoportado(Exception):
+    """El .xlsx no tiene la forma que este lector sabe recorrer sin openpyxl."""
+
+
+def _destino(base: str, target: str) -> str:
+    if target.startswith("/"):
+        return target[1:]
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base), target))
+
+
+def _relaciones(zf: zipfile.ZipFile, parte: str) -> Dict[str, Tuple[str, str]]:
+    """{Id → (Type, ruta en el ZIP)} de las relaciones de `parte`."""
+    ruta = posixpath.join(posixpath.dirname(parte), "_rels", posixpath.basename(parte) + ".rels")
+    raiz = ET.fromstring(zf.read(ruta))
+    return {
+        rel.get("Id"): (rel.get("Type", ""), _destino(parte, rel.get("Target", "")))
+        for rel in raiz.iter(f"{_NS_PKG}Relationship")
+    }
+
+
+def _numero(texto: str) -> Any:
+    if "." in texto or "E" in texto or "e" in texto:
+        return float(texto)
+    return int(texto)
+
+
+class HojaXlsx:
+    """XML de una hoja ya descomprimido; extrae filas o columnas sueltas."""
+
+    def __init__(self, nombre: str, xml: bytes, libro: "LibroXlsx") -> None:
+        self.nombre = nombre
+        self._xml = xml
+        self._libro = libro
+        primera = _RE_PRIMERA_CELDA.search(xml)
+        if primera is not None and not xml.startswith(b'<c r="', primera.start()):
+            raise FormatoNoSoportado(f"Celdas sin referencia o con prefijo en la hoja '{nombre}'.")
+
+    def _valor(self, atributos: bytes, contenido: Optional[bytes]) -> Any:
+        m = _RE_ATRIBUTO_T.search(atributos)
+        tipo = m.group(1).decode("ascii") if m else "n"
+        if not contenido:
+            return None
+        if tipo == "inlineStr":
+            sin_fonetica = _RE_FONETICA.sub(b"", contenido)
+            return html.unescape(b"".join(_RE_T.findall(sin_fonetica)).decode("utf-8"))
+        v = _RE_V.search(contenido)
+        texto = html.unescape(v.group(1).decode("utf-8")) if v else ""
+        if not texto:
+            return None
+        if tipo == "n":
+            return _numero(texto)
+        if tipo == "s":
+            return self._libro.cadena(int(texto))
+        if tipo == "b":
+            return bool(int(texto))
+        if tipo == "d":
+            return from_ISO8601(texto)
+        return texto                        # str (fórmula) y e (error)
+
+    def _celdas(self, patron: bytes, inicio: int = 0, fin: Optional[int] = None):
+        regex = re.compile(patron + rb'([^>]*?)(?:/>|>(.*?)</c>)', re.S)
+        return regex.finditer(self._xml, inicio, len(self._xml) if fin is None else fin)
+
+    def fila(self, numero: int = 1) -> List[Any]:
+        """Valores de la fila `numero` por columna (None en los huecos)."""
+        valores: Dict[int, Any] = {}
+        for m in self._celdas(rb'<c r="([A-Z]+)' + str(numero).encode("ascii") + rb'"'):
+            valores[column_index_from_string(m.group(1).decode("ascii"))] = self._valor(m.group(2), m.group(3))
+        ancho = max(valores, default=0)
+        return [valores.get(j) for j in range(1, ancho + 1)]
+
+    def ancho_declarado(self) -> Optional[int]:
+        """Última columna del rango usado según <dimension> (None si no lo declara)."""
+        m = _RE_DIMENSION.search(self._xml, 0, self._xml.find(b"<sheetData"))
+        return column_index_from_string(m.group(1).decode("ascii")) if m else None
+
+    def ultima_fila(self) -> int:
+        """Última fila con algún valor (0 si la hoja está vacía)."""
+        fin = max(self._xml.rfind(b"</v>"), self._xml.rfind(b"</is>"))
+        if fin < 0:
+            return 0
+        inicio = self._xml.rfind(b'<c r="', 0, fin)
+        m = _RE_REF.match(self._xml, inicio) if inicio >= 0 else None
+        return int(m.group(2)) if m else 0
+
+    def columna(self, indice: int, desde: int = 2, hasta: Optional[int] = None) -> List[Any]:
+        """Valores de la columna `indice` (0-based) de las filas desde..hasta (None en los huecos)."""
+        hasta = self.ultima_fila() if hasta is None else hasta
+        letra = get_column_letter(indice + 1).encode("ascii")
+        valores: Dict[int, Any] = {}
+        for m in self._celdas(rb'<c r="' + letra + rb'(\d+)"'):
+            fila = int(m.group(1))
+            if desde <= fila <= hasta:
+                valores[fila] = self._valor(m.group(2), m.group(3))
+        return [valores.get(i) for i in range(desde, hasta + 1)]
+
+
+class LibroXlsx:
+    """Índice de un .xlsx (hojas de cálculo y cadenas compartidas) sin openpyxl."""
+
+    def __init__(self, stream: IO[bytes]) -> None:
+        try:
+            self._zip = zipfile.ZipFile(stream)
+            docs = [d for t, d in _relaciones(self._zip, "").values() if t.endswith(_TIPO_DOCUMENTO)]
+            if not docs:
+                raise FormatoNoSoportado("El paquete no tiene libro principal.")
+            libro = docs[0]
+            rels = _relaciones(self._zip, libro)
+            raiz = ET.fromstring(self._zip.read(libro))
+        except (KeyError, ET.ParseError) as e:
+            raise FormatoNoSoportado(str(e)) from e
+
+        self.hojas: List[Tuple[str, str]] = []
+        for hoja in raiz.iter(f"{_NS_MAIN}sheet"):
+            tipo, ruta = rels.get(hoja.get(f"{_NS_REL}id"), ("", ""))
+            if tipo.endswith(_TIPO_HOJA):
+                self.hojas.append((hoja.get("name", ""), ruta))
+        self._ruta_cadenas = next((d for t, d in rels.values() if t.endswith(_TIPO_CADENAS)), None)
+        self._cadenas: Optional[List[str]] = None
+
+    def cadena(self, i: int) -> str:
+        if self._cadenas is None:
+            if self._ruta_cadenas is None:
+                raise FormatoNoSoportado("Celda de cadena compartida sin tabla de cadenas.")
+            with self._zip.open(self._ruta_cadenas) as src:
+                self._cadenas = read_string_table(src)
+        return self._cadenas[i]
+
+    def hoja(self, indice: int) -> HojaXlsx:
+        nombre, ruta = self.hojas[indice]
+        try:
+            return HojaXlsx(nombre, self._zip.read(ruta), self)
+        except KeyError as e:
+            raise FormatoNoSoportado(str(e)) from e
+
+    def close(self) -> None:
+        self._zip.close()
+
+    def __enter__(self) -> "LibroXlsx":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
@@ -0,0 +1,39 @@
+"""
+core/crudos_cache.py
+====================
+Resultados por crudo ya evaluados, para revalidar solo los pares que cambian.
+
+Al sustituir un RAMS en una sesión de 200 crudos, run_validation volvía a
+leer y evaluar los 200 pares. Cada entrada guarda el resultado parcial de un
+crudo bajo una clave que combina el contenido de su ISA y de su RAMS, los
+umbrales compilados y los parámetros de evaluación (ver
+`validator_core.clave_cache_crudo`): si nada de eso cambia, el crudo se
+reutiliza sin leer sus archivos.
+
+- LRU en memoria acotado por número de entradas (core.lru_memoria).
+- Los valores se comparten entre ejecuciones: deben tratarse como de solo
+  lectura.
+
+Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from core.lru_memoria import LRUMemoria
+
+DEFAULT_MAX_CRUDOS = 1024
+
+
+class CacheCrudos(LRUMemoria):
+    """LRU en memoria {clave → resultado de un crudo} acotado por número de entradas."""
+
+    def __init__(self, max_entradas: int = DEFAULT_MAX_CRUDOS) -> None:
+        if max_entradas < 1:
+            raise ValueError(f"max_entradas debe ser ≥ 1 (recibido {max_entradas}).")
+        super().__init__(max_entradas)
+        self.max_entradas = max_entradas
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos, fallos, expulsiones y ocupación."""
+        return {**super().estadisticas(), "max_entradas": self.max_entradas}
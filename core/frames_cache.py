@@ -0,0 +1,235 @@
+"""
+core/frames_cache.py
+====================
+Caché de DataFrames ya parseados (ISA/RAMS) entre ejecuciones.
+
+Los analistas relanzan la validación muchas veces al día con casi los mismos
+archivos RAMS de referencia. La clave de cada entrada es un hash BLAKE2 del
+contenido del archivo más las opciones de lectura (ver
+`validator_core.clave_cache_frame`), así que un archivo idéntico no se vuelve
+a parsear aunque cambie de nombre.
+
+- Nivel en memoria: LRU acotado por bytes (`memory_usage(deep=True)`),
+  compartido entre sesiones (core.lru_memoria).
+- Nivel en disco opcional (`CacheFeather`): un archivo Arrow IPC (Feather v2)
+  por DataFrame, con la escritura atómica y la expulsión de core.lru_disco.
+  Requiere pyarrow y solo admite DataFrames que Arrow reproduce sin pérdida;
+  los demás se quedan solo en memoria. Las columnas de texto de tipo object
+  (las que da pandas 2.x al leer) viajan como texto Arrow y vuelven a ser
+  object con el mismo nulo (None o NaN).
+
+Los DataFrames devueltos son copias superficiales: deben tratarse como de
+solo lectura. Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import IO, Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.lru_disco import LRUDisco
+from core.lru_memoria import LRUMemoria
+
+logger = logging.getLogger(__name__)
+
+ENV_CACHE_FRAMES_DIR = "VALIDADOR_CACHE_FRAMES_DIR"
+DEFAULT_MAX_BYTES_MEMORIA = 256 * 1024 * 1024
+DEFAULT_MAX_BYTES_DISCO = 1024 * 1024 * 1024
+DEFAULT_MAX_ENTRADAS_DISCO = 2048
+
+_DTYPES_ARROW = "fiubM"
+_META_ATTRS = b"validador:attrs"
+_META_OBJETOS = b"validador:objetos"
+
+
+def cargar_pyarrow() -> Any:
+    """Módulo pyarrow (con pyarrow.ipc) o None si no está instalado."""
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def _nulo_texto_objeto(col: pd.Series) -> Optional[str]:
+    """
+    "none" o "nan" (el nulo de la columna) si es una columna object solo de
+    texto y nulos de un único tipo; None si Arrow no la reproduce exactamente.
+    """
+    if pd.api.types.infer_dtype(col, skipna=True) not in ("string", "empty"):
+        return None
+    tipos = set()
+    for v in col[col.isna()].tolist():
+        if v is None:
+            tipos.add("none")
+        elif isinstance(v, float):
+            tipos.add("nan")
+        else:
+            return None                     # pd.NA, NaT...
+    if len(tipos) > 1:
+        return None
+    return tipos.pop() if tipos else "nan"
+
+
+def _nulos_objeto(df: pd.DataFrame) -> Optional[Dict[str, str]]:
+    """{columna object → nulo} (ver _nulo_texto_objeto) o None si alguna no es apta."""
+    nulos: Dict[str, str] = {}
+    for c, dt in df.dtypes.items():
+        if dt == object:
+            nulo = _nulo_texto_objeto(df[c])
+            if nulo is None:
+                return None
+            nulos[c] = nulo
+        elif not (isinstance(dt, pd.StringDtype) or (isinstance(dt, np.dtype) and dt.kind in _DTYPES_ARROW)):
+            return None
+    return nulos
+
+
+def apto_arrow(df: pd.DataFrame) -> bool:
+    """Arrow reproduce exactamente el DataFrame (sin objetos mixtos ni etiquetas raras)."""
+    return (
+        isinstance(df.index, pd.RangeIndex)
+        and df.columns.is_unique
+        and all(isinstance(c, str) for c in df.columns)
+        and _nulos_objeto(df) is not None
+    )
+
+
+def tabla_arrow(df: pd.DataFrame) -> Any:
+    """pyarrow.Table de un DataFrame apto_arrow, con lo necesario para df_desde_arrow."""
+    pa = cargar_pyarrow()
+    tabla = pa.Table.from_pandas(df)
+    meta = dict(tabla.schema.metadata or {})
+    meta[_META_OBJETOS] = json.dumps(_nulos_objeto(df)).encode("utf-8")
+    return tabla.replace_schema_metadata(meta)
+
+
+def df_desde_arrow(tabla: Any) -> pd.DataFrame:
+    """Inverso de tabla_arrow: las columnas de texto object vuelven a object con su nulo."""
+    df = tabla.to_pandas()
+    meta = tabla.schema.metadata or {}
+    for c, nulo in json.loads(meta.get(_META_OBJETOS, b"{}")).items():
+        valores = df[c].to_numpy(dtype=object, na_value=None if nulo == "none" else np.nan)
+        df[c] = pd.Series(valores, index=df.index, dtype=object)
+    return df
+
+
+def directorio_frames_por_defecto() -> Path:
+    """$VALIDADOR_CACHE_FRAMES_DIR o, en su defecto, ~/.cache/validador_crudos/frames."""
+    env = os.environ.get(ENV_CACHE_FRAMES_DIR, "").strip()
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME", "").strip() or os.path.join(Path.home(), ".cache")
+    return Path(base) / "validador_crudos" / "frames"
+
+
+class CacheFeather(LRUDisco):
+    """Nivel en disco: {clave hex → DataFrame} como archivos Arrow IPC."""
+
+    sufijo = ".arrow"
+
+    def __init__(
+        self,
+        directorio: Optional[os.PathLike] = None,
+        max_entradas: int = DEFAULT_MAX_ENTRADAS_DISCO,
+        max_bytes: int = DEFAULT_MAX_BYTES_DISCO,
+    ) -> None:
+        if cargar_pyarrow() is None:
+            raise ImportError("CacheFeather requiere pyarrow (pip install pyarrow).")
+        super().__init__(
+            directorio if directorio is not None else directorio_frames_por_defecto(),
+            max_entradas=max_entradas,
+            max_bytes=max_bytes,
+        )
+
+    def _volcar(self, df: pd.DataFrame, fh: IO[bytes]) -> None:
+        pa = cargar_pyarrow()
+        tabla = tabla_arrow(df)
+        meta = dict(tabla.schema.metadata or {})
+        meta[_META_ATTRS] = json.dumps(df.attrs, default=str).encode("utf-8")
+        tabla = tabla.replace_schema_metadata(meta)
+        with pa.ipc.new_file(fh, tabla.schema) as writer:
+            writer.write_table(tabla)
+
+    def _cargar(self, fh: IO[bytes]) -> pd.DataFrame:
+        pa = cargar_pyarrow()
+        tabla = pa.ipc.open_file(fh).read_all()
+        df = df_desde_arrow(tabla)
+        meta = tabla.schema.metadata or {}
+        df.attrs = json.loads(meta[_META_ATTRS]) if _META_ATTRS in meta else {}
+        return df
+
+
+def _bytes_df(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheDataFrames(LRUMemoria):
+    """LRU en memoria {clave → DataFrame} con presupuesto en bytes y nivel en disco opcional."""
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES_MEMORIA,
+        disco: Optional[CacheFeather] = None,
+    ) -> None:
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes debe ser ≥ 1 (recibido {max_bytes}).")
+        super().__init__(max_bytes)
+        self.max_bytes = max_bytes
+        self.disco = disco
+        self._hits_disco = 0
+
+    def _peso(self, df: pd.DataFrame) -> int:
+        return _bytes_df(df)
+
+    def obtener(self, clave: str) -> Optional[pd.DataFrame]:
+        """DataFrame guardado bajo `clave` (copia superficial) o None."""
+        with self._lock:
+            df = self._buscar(clave)
+            if df is not None:
+                self._hits += 1
+                return df.copy(deep=False)
+
+        df = self.disco.obtener(clave) if self.disco is not None else None
+        with self._lock:
+            if not isinstance(df, pd.DataFrame):
+                self._misses += 1
+                return None
+            self._hits_disco += 1
+            self._insertar(clave, df)      # si no cabe en memoria, sigue solo en disco
+        return df.copy(deep=False)
+
+    def guardar(self, clave: str, df: pd.DataFrame) -> None:
+        """Guarda `df` en memoria y, si Arrow lo admite, en disco."""
+        super().guardar(clave, df)
+        if self.disco is not None and apto_arrow(df):
+            self.disco.guardar(clave, df)
+
+    def limpiar(self) -> None:
+        """Vacía ambos niveles y reinicia las estadísticas."""
+        with self._lock:
+            self._hits_disco = 0
+        super().limpiar()
+        if self.disco is not None:
+            self.disco.limpiar()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos (memoria/disco), fallos, expulsiones y ocupación del nivel en memoria."""
+        with self._lock:
+            total = self._hits + self._hits_disco + self._misses
+            return {
+                "hits":       self._hits,
+                "hits_disco": self._hits_disco,
+                "misses":     self._misses,
+                "evictions":  self._evictions,
+                "size":       len(self._entradas),
+                "bytes":      self._peso_total,
+                "max_bytes":  self.max_bytes,
+                "hit_rate":   (self._hits + self._hits_disco) / total if total else 0.0,
+            }
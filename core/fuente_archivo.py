@@ -0,0 +1,318 @@
+"""
+core/fuente_archivo.py
+======================
+Acceso de solo lectura, sin copias, a los bytes de un archivo subido.
+
+Antes cada archivo se copiaba varias veces (`BytesIO(f.read())` en app.py,
+otra vez en read_file, otra más para el hash de la matriz). `FuenteArchivo`
+envuelve los bytes una sola vez y los comparte con todos los lectores:
+
+- Buffers ya en memoria (bytes, BytesIO, UploadedFile de Streamlit): una
+  `memoryview` sobre el buffer original, sin copiarlo.
+- Streams de origen desconocido (archivos abiertos, miembros de un ZIP…):
+  hasta `UMBRAL_SPOOL_BYTES` se leen a memoria; por encima se vuelcan a un
+  archivo temporal que se mapea en memoria (mmap), de modo que el sistema
+  operativo pagina el contenido en lugar de retenerlo en el heap.
+
+`abrir()` devuelve un lector independiente (read/seek/tell) que copia solo
+los fragmentos que se le piden. Al pasar una fuente a otro proceso viaja la
+ruta del temporal, no su contenido.
+
+Los archivos dentro de un ZIP (`miembros_zip`) no se descomprimen al listar
+el archivo: cada `MiembroZip` se extrae a su propia FuenteArchivo (memoria o
+spool a disco, igual que cualquier stream) solo cuando se va a leer.
+
+Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import weakref
+import zipfile
+from contextlib import contextmanager
+from typing import IO, Any, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+UMBRAL_SPOOL_BYTES = 32 * 1024 * 1024
+
+_PREFIJO_TEMPORAL = "validador-"
+
+
+class LectorMemoria(io.RawIOBase):
+    """Stream de solo lectura sobre una memoryview; no copia el buffer completo."""
+
+    def __init__(self, vista: memoryview, fuente: Any = None) -> None:
+        super().__init__()
+        self._vista = vista
+        self._fuente = fuente       # mantiene viva la fuente mientras se lee
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            pos = offset
+        elif whence == io.SEEK_CUR:
+            pos = self._pos + offset
+        elif whence == io.SEEK_END:
+            pos = len(self._vista) + offset
+        else:
+            raise ValueError(f"whence no válido: {whence}")
+        if pos < 0:
+            # Igual que un archivo real (EINVAL): zipfile y otros lo esperan así
+            raise OSError(f"Posición negativa: {pos}")
+        self._pos = pos
+        return pos
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        inicio = min(self._pos, len(self._vista))
+        fin = len(self._vista) if size is None or size < 0 else min(inicio + size, len(self._vista))
+        self._pos = fin
+        return self._vista[inicio:fin].tobytes()
+
+    def readall(self) -> bytes:
+        return self.read(-1)
+
+    def readinto(self, destino: Any) -> int:
+        datos = memoryview(destino).cast("B")
+        inicio = min(self._pos, len(self._vista))
+        n = min(len(datos), len(self._vista) - inicio)
+        datos[:n] = self._vista[inicio:inicio + n]
+        self._pos = inicio + n
+        return n
+
+
+def _liberar(vista: memoryview, mapa: Optional[mmap.mmap], fh: Any, ruta: Optional[str]) -> None:
+    try:
+        vista.release()
+        if mapa is not None:
+            mapa.close()
+    except BufferError:
+        # Aún hay lectores con fragmentos exportados: el GC cerrará el mmap
+        logger.debug("mmap con exportaciones activas; se cierra al recolectarlo.")
+    if fh is not None:
+        fh.close()
+    if ruta is not None:
+        try:
+            os.unlink(ruta)
+        except OSError:
+            pass
+
+
+class FuenteArchivo:
+    """Bytes de un archivo (en memoria o mapeados desde disco) compartidos sin copia."""
+
+    def __init__(
+        self,
+        vista: memoryview,
+        nombre: str = "",
+        *,
+        mapa: Optional[mmap.mmap] = None,
+        fh: Any = None,
+        ruta: Optional[str] = None,
+        propia: bool = False,
+    ) -> None:
+        self.nombre = nombre
+        self.ruta = ruta
+        self._vista = vista
+        self._huella: Optional[bytes] = None
+        self._finalizador = weakref.finalize(
+            self, _liberar, vista, mapa, fh, ruta if propia else None,
+        )
+
+    # --- construcción ------------------------------------------------------
+
+    @classmethod
+    def desde(
+        cls,
+        origen: Any,
+        nombre: str = "",
+        umbral_spool: int = UMBRAL_SPOOL_BYTES,
+    ) -> "FuenteArchivo":
+        """
+        Envuelve `origen`: bytes-like, un buffer en memoria (BytesIO/UploadedFile,
+        desde su posición actual) o cualquier stream con read().
+        """
+        if isinstance(origen, (bytes, bytearray, memoryview)):
+            return cls(memoryview(origen).cast("B"), nombre)
+        if hasattr(origen, "getbuffer"):
+            buffer = origen.getbuffer()
+            vista = buffer[origen.tell():]
+            buffer.release()
+            return cls(vista, nombre)
+        if hasattr(origen, "read"):
+            return cls._desde_stream(origen, nombre, umbral_spool)
+        raise TypeError(f"No se puede leer '{nombre}' desde {type(origen).__name__}")
+
+    @classmethod
+    def _desde_stream(cls, stream: IO[bytes], nombre: str, umbral_spool: int) -> "FuenteArchivo":
+        cabeza = stream.read(umbral_spool + 1)
+        if len(cabeza) <= umbral_spool:
+            return cls(memoryview(cabeza), nombre)
+
+        fd, ruta = tempfile.mkstemp(prefix=_PREFIJO_TEMPORAL)
+        try:
+            with os.fdopen(fd, "wb") as destino:
+                destino.write(cabeza)
+                del cabeza
+                shutil.copyfileobj(stream, destino)
+            fuente = cls._mapear(ruta, nombre, propia=True)
+        except BaseException:
+            try:
+                os.unlink(ruta)
+            except OSError:
+                pass
+            raise
+        logger.info("'%s' volcado a disco (%d bytes) y mapeado en memoria.", nombre, fuente.tamano)
+        return fuente
+
+    @classmethod
+    def _mapear(cls, ruta: str, nombre: str, propia: bool = False) -> "FuenteArchivo":
+        fh = open(ruta, "rb")
+        try:
+            mapa = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except BaseException:
+            fh.close()
+            raise
+        return cls(memoryview(mapa), nombre, mapa=mapa, fh=fh, ruta=ruta, propia=propia)
+
+    def __reduce__(self):
+        # Entre procesos: la ruta del temporal si existe; si no, los bytes
+        if self.ruta is not None:
+            return (FuenteArchivo._mapear, (self.ruta, self.nombre))
+        return (FuenteArchivo.desde, (self._vista.tobytes(), self.nombre))
+
+    # --- acceso ------------------------------------------------------------
+
+    @property
+    def tamano(self) -> int:
+        return len(self._vista)
+
+    def __len__(self) -> int:
+        return len(self._vista)
+
+    def vista(self) -> memoryview:
+        """Memoryview de solo lectura sobre todo el contenido (sin copia)."""
+        return self._vista.toreadonly()
+
+    def cabeza(self, n: int) -> bytes:
+        """Copia de los primeros `n` bytes."""
+        return self._vista[:n].tobytes()
+
+    def como_bytes(self) -> bytes:
+        """Contenido como bytes; sin copia si la fuente ya envuelve un objeto bytes entero."""
+        obj = self._vista.obj
+        if type(obj) is bytes and len(obj) == len(self._vista):
+            return obj
+        return self._vista.tobytes()
+
+    def huella(self) -> bytes:
+        """BLAKE2b (32 bytes) del contenido; se calcula una vez por fuente."""
+        if self._huella is None:
+            self._huella = hashlib.blake2b(self._vista, digest_size=32).digest()
+        return self._huella
+
+    def abrir(self) -> LectorMemoria:
+        """Nuevo lector independiente, posicionado al inicio."""
+        return LectorMemoria(self._vista, self)
+
+    # --- ciclo de vida -----------------------------------------------------
+
+    @property
+    def cerrada(self) -> bool:
+        return not self._finalizador.alive
+
+    def cerrar(self) -> None:
+        """Libera el buffer (y el mmap/temporal si los hay). Idempotente."""
+        self._finalizador()
+
+    def __enter__(self) -> "FuenteArchivo":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.cerrar()
+
+    def __repr__(self) -> str:
+        donde = "disco" if self.ruta is not None else "memoria"
+        return f"FuenteArchivo({self.nombre!r}, {self.tamano} bytes, {donde})"
+
+
+@contextmanager
+def abrir_fuente(origen: Any, nombre: str = "") -> Iterator[FuenteArchivo]:
+    """
+    `origen` como FuenteArchivo durante el bloque. Si ya lo era se usa tal cual
+    (la cierra quien la creó); si no, se crea y se cierra al salir.
+    """
+    if isinstance(origen, FuenteArchivo):
+        yield origen
+        return
+    fuente = FuenteArchivo.desde(origen, nombre)
+    try:
+        yield fuente
+    finally:
+        fuente.cerrar()
+
+
+class MiembroZip:
+    """Archivo dentro de un ZIP abierto; se descomprime al llamar a extraer()."""
+
+    def __init__(self, zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> None:
+        self._zip = zf
+        self._info = info
+
+    @property
+    def nombre(self) -> str:
+        """Nombre del archivo sin las carpetas del ZIP."""
+        return self._info.filename.rsplit("/", 1)[-1]
+
+    @property
+    def ruta_en_zip(self) -> str:
+        return self._info.filename
+
+    @property
+    def tamano(self) -> int:
+        return self._info.file_size
+
+    def extraer(self, umbral_spool: int = UMBRAL_SPOOL_BYTES) -> FuenteArchivo:
+        """Descomprime el miembro en streaming a una FuenteArchivo nueva (la cierra quien la pide)."""
+        # ZipFile serializa con un lock el acceso al archivo compartido: varios
+        # hilos pueden extraer miembros a la vez.
+        with self._zip.open(self._info) as stream:
+            return FuenteArchivo.desde(stream, self.nombre, umbral_spool)
+
+    def __repr__(self) -> str:
+        return f"MiembroZip({self.ruta_en_zip!r}, {self.tamano} bytes)"
+
+
+def miembros_zip(zf: zipfile.ZipFile, extensiones: Iterable[str]) -> List[MiembroZip]:
+    """
+    Miembros de `zf` con alguna de las `extensiones`, en el orden del ZIP.
+    Se ignoran carpetas, archivos ocultos y los metadatos de macOS (__MACOSX/).
+    """
+    extensiones = tuple(e.lower() for e in extensiones)
+    out = []
+    for info in zf.infolist():
+        miembro = MiembroZip(zf, info)
+        if (
+            info.is_dir()
+            or info.filename.startswith("__MACOSX/")
+            or miembro.nombre.startswith(".")
+            or not miembro.nombre.lower().endswith(extensiones)
+        ):
+            continue
+        out.append(miembro)
+    return out
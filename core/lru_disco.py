@@ -0,0 +1,130 @@
+"""
+core/lru_disco.py
+=================
+Caché LRU en disco común a las cachés persistentes (matriz de umbrales
+compilada, DataFrames parseados): un archivo por entrada, bajo una clave hex.
+
+- Escritura atómica (archivo temporal + os.replace): varios procesos pueden
+  compartir el directorio sin leer entradas a medias.
+- Tamaño acotado por número de entradas y por bytes; se expulsan primero las
+  entradas usadas hace más tiempo (mtime, que se refresca en cada acierto).
+- Cualquier fallo de E/S o de deserialización se trata como un fallo de caché:
+  nunca interrumpe la validación.
+- El formato de cada entrada (`sufijo`, `_volcar`, `_cargar`) y el directorio
+  por defecto los fija cada subclase.
+
+Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LRUDisco:
+    """Caché LRU en disco {clave hex → valor}; las subclases fijan el formato de las entradas."""
+
+    sufijo = ""
+
+    def __init__(self, directorio: os.PathLike, max_entradas: int, max_bytes: int) -> None:
+        if max_entradas < 1:
+            raise ValueError(f"max_entradas debe ser ≥ 1 (recibido {max_entradas}).")
+        if max_bytes < 1:
+            raise ValueError(f"max_bytes debe ser ≥ 1 (recibido {max_bytes}).")
+        self.directorio = Path(directorio)
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+
+    def _volcar(self, valor: Any, fh: IO[bytes]) -> None:
+        raise NotImplementedError
+
+    def _cargar(self, fh: IO[bytes]) -> Any:
+        raise NotImplementedError
+
+    def _ruta(self, clave: str) -> Path:
+        if not clave or not all(c in "0123456789abcdef" for c in clave):
+            raise ValueError(f"Clave de caché no válida: {clave!r}")
+        return self.directorio / f"{clave}{self.sufijo}"
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Valor guardado bajo `clave`, o None si no existe o no se puede leer."""
+        ruta = self._ruta(clave)
+        try:
+            with open(ruta, "rb") as fh:
+                valor = self._cargar(fh)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Entrada de caché ilegible '%s' (%s); se descarta.", ruta.name, e)
+            self._borrar(ruta)
+            return None
+        try:
+            os.utime(ruta)          # marca de uso reciente para la expulsión LRU
+        except OSError:
+            pass
+        return valor
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        """Guarda `valor` bajo `clave` y aplica los límites de tamaño."""
+        ruta = self._ruta(clave)
+        tmp = None
+        try:
+            self.directorio.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.directorio, prefix=".tmp-", suffix=self.sufijo)
+            with os.fdopen(fd, "wb") as fh:
+                self._volcar(valor, fh)
+            os.replace(tmp, ruta)
+            tmp = None
+        except Exception as e:
+            logger.warning("No se pudo escribir la caché en '%s': %s", self.directorio, e)
+            return
+        finally:
+            if tmp is not None:
+                self._borrar(Path(tmp))
+        self._expulsar()
+
+    def limpiar(self) -> None:
+        """Elimina todas las entradas."""
+        for ruta, _mtime, _size in self._entradas():
+            self._borrar(ruta)
+
+    def __len__(self) -> int:
+        return len(self._entradas())
+
+    def _entradas(self) -> List[Tuple[Path, float, int]]:
+        """(ruta, mtime, bytes) de cada entrada, de la más reciente a la más antigua."""
+        out = []
+        try:
+            rutas = list(self.directorio.glob(f"*{self.sufijo}"))
+        except OSError:
+            return out
+        for ruta in rutas:
+            if ruta.name.startswith(".tmp-"):
+                continue
+            try:
+                st = ruta.stat()
+            except OSError:
+                continue
+            out.append((ruta, st.st_mtime, st.st_size))
+        out.sort(key=lambda e: e[1], reverse=True)
+        return out
+
+    def _expulsar(self) -> None:
+        total = 0
+        for n, (ruta, _mtime, size) in enumerate(self._entradas()):
+            total += size
+            # La entrada más reciente se conserva siempre, aunque exceda max_bytes
+            if n > 0 and (n >= self.max_entradas or total > self.max_bytes):
+                self._borrar(ruta)
+
+    @staticmethod
+    def _borrar(ruta: Path) -> None:
+        try:
+            ruta.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,92 @@
+"""
+core/lru_memoria.py
+===================
+LRU en memoria compartido por las cachés de la sesión (DataFrames parseados,
+resultados por crudo).
+
+- Presupuesto por peso: cada entrada pesa 1 (límite = número de entradas) o
+  lo que diga `_peso` en la subclase (p. ej. bytes). Una entrada que no cabe
+  sola no se guarda.
+- Se expulsan primero las entradas usadas hace más tiempo.
+- Protegido con un lock; lleva aciertos, fallos y expulsiones.
+
+Sin dependencias de Streamlit ni de validator_core.
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class LRUMemoria:
+    """LRU en memoria {clave → valor} acotado por la suma de los pesos de sus entradas."""
+
+    def __init__(self, max_peso: int) -> None:
+        self._max_peso = max_peso
+        self._entradas: "OrderedDict[str, Tuple[Any, int]]" = OrderedDict()
+        self._peso_total = 0
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def _peso(self, valor: Any) -> int:
+        return 1
+
+    def obtener(self, clave: str) -> Optional[Any]:
+        """Valor guardado bajo `clave` o None."""
+        with self._lock:
+            valor = self._buscar(clave)
+            if valor is None:
+                self._misses += 1
+            else:
+                self._hits += 1
+            return valor
+
+    def guardar(self, clave: str, valor: Any) -> None:
+        with self._lock:
+            self._insertar(clave, valor)
+
+    def _buscar(self, clave: str) -> Optional[Any]:
+        """Como obtener, sin estadísticas; con el lock ya tomado."""
+        entrada = self._entradas.get(clave)
+        if entrada is None:
+            return None
+        self._entradas.move_to_end(clave)
+        return entrada[0]
+
+    def _insertar(self, clave: str, valor: Any) -> None:
+        """Guarda `valor` y expulsa las entradas más antiguas; con el lock ya tomado."""
+        peso = self._peso(valor)
+        anterior = self._entradas.pop(clave, None)
+        if anterior is not None:
+            self._peso_total -= anterior[1]
+        if peso > self._max_peso:
+            return
+        self._entradas[clave] = (valor, peso)
+        self._peso_total += peso
+        while self._peso_total > self._max_peso:
+            _clave, (_valor, p) = self._entradas.popitem(last=False)
+            self._peso_total -= p
+            self._evictions += 1
+
+    def limpiar(self) -> None:
+        """Vacía la caché y reinicia las estadísticas."""
+        with self._lock:
+            self._entradas.clear()
+            self._peso_total = 0
+            self._hits = self._misses = self._evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Aciertos, fallos, expulsiones y ocupación."""
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "hits":      self._hits,
+                "misses":    self._misses,
+                "evictions": self._evictions,
+                "size":      len(self._entradas),
+                "hit_rate":  self._hits / total if total else 0.0,
+            }
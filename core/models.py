@@ -33,6 +33,24 @@ class ThresholdConfig:
         return self.default_green, self.default_yellow
 
 
+# ---------------------------------------------------------------------------
+# ConteoCortes
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class ConteoCortes:
+    """
+    Cortes de una fila del detalle de un crudo por estado. Bastan para
+    recalcular el semáforo de la propiedad con otros pct_ok_amarillo /
+    pct_rojo_rojo sin volver a leer ni comparar los archivos.
+    """
+    propiedad: str      # propiedad canónica (clave de resumen_raw)
+    verde: int
+    amarillo: int
+    rojo: int
+    validos: int        # cortes con valor y umbral
+
+
 # ---------------------------------------------------------------------------
 # ValidationResult  (extendido para paridad con el MVP)
 # ---------------------------------------------------------------------------
@@ -56,6 +74,13 @@ class ValidationResult:
         summary:            DataFrame Resumen (Propiedad × crudos + fila GLOBAL)
         unpaired_isa:       Archivos ISA sin par
         unpaired_rams:      Archivos RAMS sin par ISA
+        dialectos_csv:      Archivo CSV → dialecto detectado (separador, decimal, miles, encoding)
+        detail:             Nivel de detalle por crudo ("none", "worst" o "full")
+        conteos_cortes:     nombre_crudo → ConteoCortes de cada fila de crudo_dataframes
+                            (para validator_core.reaggregate)
+        crudos_reutilizados / crudos_recalculados:
+                            Con cache_crudos, crudos sin cambios (no se leen) y
+                            crudos evaluados en esta ejecución
     """
     # Core pipeline output
     paired_names: List[str] = field(default_factory=list)
@@ -73,6 +98,21 @@ class ValidationResult:
     unpaired_isa: List[str] = field(default_factory=list)
     unpaired_rams: List[str] = field(default_factory=list)
 
+    # Formato detectado de cada CSV leído: archivo → {sep, decimal, thousands, encoding}
+    dialectos_csv: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    # Nivel de detalle con que se calculó ("none", "worst" o "full"; ver
+    # validator_core.NIVELES_DETALLE): con "none", crudo_dataframes queda vacío
+    detail: str = "full"
+
+    # Conteos de cortes por fila de detalle: permiten reagregar con otros porcentajes
+    conteos_cortes: Dict[str, List[ConteoCortes]] = field(default_factory=dict)
+
+    # Con caché de crudos: crudos reutilizados de una ejecución anterior y
+    # crudos leídos y evaluados en esta (incluidos los que fallaron)
+    crudos_reutilizados: List[str] = field(default_factory=list)
+    crudos_recalculados: List[str] = field(default_factory=list)
+
     # Compatibilidad con UI antigua (mantenidos como alias)
     @property
     def error_matrices(self) -> Dict[str, pd.DataFrame]:
@@ -100,3 +140,138 @@ class ValidationResult:
     @property
     def total_pairs(self) -> int:
         return len(self.paired_names)
+
+
+# ---------------------------------------------------------------------------
+# Comprobación previa (preflight): solo cabeceras y columna Propiedad
+# ---------------------------------------------------------------------------
+
+@dataclass
+class PreflightCrudo:
+    """
+    Comprobación previa de un par ISA/RAMS.
+
+    Los cortes son nombres de columna del ISA; las propiedades, canónicas.
+        errores:                problemas que harán fallar el par en la validación
+        cortes_sin_umbral:      cortes del ISA sin ningún umbral en la matriz
+        cortes_sin_rams:        cortes del ISA que el RAMS no tiene
+        propiedades_sin_umbral: propiedades del ISA sin umbral (saldrán N/A)
+        propiedades_sin_rams:   propiedades del ISA que el RAMS no tiene
+    """
+    isa: str
+    rams: str
+    cortes: List[str] = field(default_factory=list)
+    n_propiedades: int = 0
+    cortes_sin_umbral: List[str] = field(default_factory=list)
+    cortes_sin_rams: List[str] = field(default_factory=list)
+    propiedades_sin_umbral: List[str] = field(default_factory=list)
+    propiedades_sin_rams: List[str] = field(default_factory=list)
+    errores: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.errores
+
+    @property
+    def con_avisos(self) -> bool:
+        return bool(
+            self.cortes_sin_umbral or self.cortes_sin_rams
+            or self.propiedades_sin_umbral or self.propiedades_sin_rams
+        )
+
+
+@dataclass
+class PreflightReport:
+    """
+    Resultado de `validator_core.preflight`: emparejamiento y cabeceras de
+    cada par, sin haber parseado los archivos completos.
+
+        crudos:          nombre_crudo → PreflightCrudo (orden de validación)
+        unpaired_isa:    archivos ISA sin par RAMS
+        unpaired_rams:   archivos RAMS sin par ISA
+        errores_lectura: archivo → error al leer su cabecera
+        segundos:        duración de la comprobación
+    """
+    crudos: Dict[str, PreflightCrudo] = field(default_factory=dict)
+    unpaired_isa: List[str] = field(default_factory=list)
+    unpaired_rams: List[str] = field(default_factory=list)
+    errores_lectura: Dict[str, str] = field(default_factory=dict)
+    segundos: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        """Hay pares y ninguno fallará (los avisos no cuentan)."""
+        return (
+            bool(self.crudos)
+            and not self.errores_lectura
+            and all(c.ok for c in self.crudos.values())
+        )
+
+    @property
+    def total_pairs(self) -> int:
+        return len(self.crudos)
+
+    @property
+    def tabla(self) -> pd.DataFrame:
+        """Una fila por par con los recuentos de la comprobación."""
+        filas = [
+            {
+                "Crudo":                  name,
+                "ISA":                    c.isa,
+                "RAMS":                   c.rams,
+                "Cortes":                 len(c.cortes),
+                "Propiedades":            c.n_propiedades,
+                "Cortes sin umbral":      len(c.cortes_sin_umbral),
+                "Cortes sin RAMS":        len(c.cortes_sin_rams),
+                "Propiedades sin umbral": len(c.propiedades_sin_umbral),
+                "Propiedades sin RAMS":   len(c.propiedades_sin_rams),
+                "Estado":                 "; ".join(c.errores) if c.errores else ("Avisos" if c.con_avisos else "OK"),
+            }
+            for name, c in self.crudos.items()
+        ]
+        return pd.DataFrame(filas)
+
+
+# ---------------------------------------------------------------------------
+# Progreso de la validación (iter_validation)
+# ---------------------------------------------------------------------------
+
+# Tipos de EventoValidacion, en el orden en que aparecen
+EVENTOS_VALIDACION = ("umbrales", "emparejado", "leido", "evaluado", "fallido", "fin")
+
+
+@dataclass
+class EventoValidacion:
+    """
+    Evento de `validator_core.iter_validation`, emitido a medida que avanza.
+
+        tipo:            uno de EVENTOS_VALIDACION
+        crudo:           crudo al que se refiere ("leido", "evaluado", "fallido")
+        completados:     crudos evaluados o fallidos hasta este evento
+        total:           pares a procesar (0 antes de "emparejado")
+        segundos:        duración de la etapa; en "leido", la espera hasta tener el par
+        mensaje:         resumen de la etapa o error del crudo ("fallido")
+        semaforo:        semáforo global del crudo ("evaluado")
+        df_out:          detalle del crudo ("evaluado"), como en crudo_dataframes
+        cortes_visibles: cortes del crudo ("evaluado")
+        resultado:       ValidationResult completo ("fin")
+        reutilizado:     el crudo no cambió y viene de la caché de crudos ("evaluado")
+    """
+    tipo: str
+    crudo: Optional[str] = None
+    completados: int = 0
+    total: int = 0
+    segundos: float = 0.0
+    mensaje: str = ""
+    semaforo: str = ""
+    df_out: Optional[pd.DataFrame] = None
+    cortes_visibles: List[str] = field(default_factory=list)
+    resultado: Optional[ValidationResult] = None
+    reutilizado: bool = False
+
+    @property
+    def progreso(self) -> float:
+        """Fracción de crudos terminados, en [0, 1] (1 en "fin")."""
+        if self.tipo == "fin":
+            return 1.0
+        return self.completados / self.total if self.total else 0.0
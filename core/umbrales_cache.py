@@ -0,0 +1,62 @@
+"""
+core/umbrales_cache.py
+======================
+Caché en disco de la Matriz de Umbrales ya compilada.
+
+La matriz casi nunca cambia entre ejecuciones, así que el resultado de
+`construir_umbrales` se guarda serializado (pickle) bajo una clave derivada
+del contenido del archivo (ver `validator_core.clave_cache_umbrales`).
+Una ejecución en caliente evita por completo el parseo del Excel.
+
+Escritura atómica, límites y expulsión LRU: core.lru_disco.
+
+Sin dependencias de Streamlit ni de validator_core. El directorio debe ser de
+confianza (pickle ejecuta código al cargar).
+"""
+from __future__ import annotations
+
+import os
+import pickle
+from pathlib import Path
+from typing import IO, Any, Optional
+
+from core.lru_disco import LRUDisco
+
+ENV_CACHE_DIR = "VALIDADOR_CACHE_DIR"
+DEFAULT_MAX_ENTRADAS = 32
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_SUFIJO = ".pkl"
+
+
+def directorio_cache_por_defecto() -> Path:
+    """$VALIDADOR_CACHE_DIR o, en su defecto, ~/.cache/validador_crudos/umbrales."""
+    env = os.environ.get(ENV_CACHE_DIR, "").strip()
+    if env:
+        return Path(env)
+    base = os.environ.get("XDG_CACHE_HOME", "").strip() or os.path.join(Path.home(), ".cache")
+    return Path(base) / "validador_crudos" / "umbrales"
+
+
+class CacheUmbrales(LRUDisco):
+    """Caché LRU en disco {clave hex → umbrales compilados}, serializados con pickle."""
+
+    sufijo = _SUFIJO
+
+    def __init__(
+        self,
+        directorio: Optional[os.PathLike] = None,
+        max_entradas: int = DEFAULT_MAX_ENTRADAS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        super().__init__(
+            directorio if directorio is not None else directorio_cache_por_defecto(),
+            max_entradas=max_entradas,
+            max_bytes=max_bytes,
+        )
+
+    def _volcar(self, valor: Any, fh: IO[bytes]) -> None:
+        pickle.dump(valor, fh, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _cargar(self, fh: IO[bytes]) -> Any:
+        return pickle.load(fh)
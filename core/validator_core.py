@@ -16,12 +16,30 @@ Sin imports de Streamlit — 100 % testeable en aislamiento.
 """
 from __future__ import annotations
 
+import csv
+import hashlib
 import io
+import json
 import logging
+import math
+import os
 import re
+import threading
+import time
 import unicodedata
-from typing import IO, Any, Dict, List, Optional, Tuple
-
+import zipfile
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from dataclasses import asdict, dataclass, field, replace
+from datetime import time as dt_time
+from functools import lru_cache
+from pathlib import Path
+from types import MappingProxyType
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
 import pandas as pd
 import openpyxl
 from openpyxl import Workbook
@@ -30,8 +48,22 @@ from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.formatting.rule import Rule
 from openpyxl.styles.differential import DifferentialStyle
 from openpyxl.utils import get_column_letter
-
-from core.models import ValidationResult, ThresholdConfig
+from openpyxl.cell.cell import ERROR_CODES as _ERRORES_EXCEL
+from pandas.io.parsers import TextParser
+
+from core.models import (
+    ConteoCortes,
+    EventoValidacion,
+    PreflightCrudo,
+    PreflightReport,
+    ValidationResult,
+    ThresholdConfig,
+)
+from core.crudos_cache import CacheCrudos
+from core.frames_cache import CacheDataFrames, apto_arrow, cargar_pyarrow, df_desde_arrow, tabla_arrow
+from core.cabecera_xlsx import FormatoNoSoportado, HojaXlsx, LibroXlsx
+from core.fuente_archivo import FuenteArchivo, MiembroZip, abrir_fuente, miembros_zip
+from core.umbrales_cache import CacheUmbrales
 
 logger = logging.getLogger(__name__)
 
@@ -65,36 +97,70 @@ DEFAULT_PCT_ROJO_ROJO   = 0.30
 # 1. Normalización de texto
 # ---------------------------------------------------------------------------
 
-def strip_accents(text: str) -> str:
-    if text is None:
-        return ""
-    text = str(text)
+# Las etiquetas se repiten en cada archivo, fila y corte: las funciones de
+# canonización trabajan sobre str con caché LRU acotada, tablas de traducción
+# y patrones precompilados. estadisticas_canonizacion() expone los aciertos.
+_TAM_CACHE_CANON = 8192
+# Plantillas de archivo distintas (cabecera + columna Propiedad) que se recuerdan
+_TAM_CACHE_PLANTILLAS = 256
+
+# Todos los separadores Zs de Unicode están en el BMP
+_ESPACIOS_ZS = {c: " " for c in range(0x10000) if unicodedata.category(chr(c)) == "Zs"}
+_TABLA_PROP = str.maketrans({".": None, "º": None, "°": None,
+                             "(": " ", ")": " ", "%": " ", "/": " ", ",": " "})
+_TABLA_CORTE = str.maketrans({
+    **_ESPACIOS_ZS,
+    **{d: "-" for d in ("\u2010", "\u2011", "\u2012", "\u2013", "\u2014", "\u2212")},
+    "º": None, "°": None,
+})
+_RE_ESPACIOS     = re.compile(r"\s+")
+_RE_GUION        = re.compile(r"\s*-\s*")
+_RE_ALFANUMERICO = re.compile(r"[A-Z0-9]")
+
+
+@lru_cache(maxsize=_TAM_CACHE_CANON)
+def _strip_accents_str(text: str) -> str:
     return "".join(
         c for c in unicodedata.normalize("NFD", text)
         if unicodedata.category(c) != "Mn"
     )
 
 
+@lru_cache(maxsize=_TAM_CACHE_CANON)
+def _canon_prop_norm_str(s: str) -> str:
+    t = _strip_accents_str(s).upper().strip().translate(_TABLA_PROP)
+    return _RE_ESPACIOS.sub(" ", t).strip()
+
+
+@lru_cache(maxsize=_TAM_CACHE_CANON)
+def _canon_prop_str(s: str) -> str:
+    t = _canon_prop_norm_str(s)
+    return t if _RE_ALFANUMERICO.search(t) else ""
+
+
+@lru_cache(maxsize=_TAM_CACHE_CANON)
+def _canon_corte_str(s: str) -> str:
+    t = _RE_GUION.sub("-", s.translate(_TABLA_CORTE))
+    return _RE_ESPACIOS.sub("", t).upper()
+
+
+def strip_accents(text: str) -> str:
+    if text is None:
+        return ""
+    return _strip_accents_str(str(text))
+
+
 def _canon_prop_norm(s: str) -> str:
     """Normalización interna robusta: elimina acentos, paréntesis, %, /, comas y espacios extra."""
     if s is None:
         return ""
-    t = strip_accents(str(s)).upper().strip()
-    for ch in [".", "º", "°"]:
-        t = t.replace(ch, "")
-    for ch in ["(", ")", "%", "/"]:
-        t = t.replace(ch, " ")
-    t = re.sub(r"\s*,\s*", " ", t)
-    t = re.sub(r"\s+", " ", t).strip()
-    return t
+    return _canon_prop_norm_str(str(s))
 
 
 def canon_prop(s: str, alias: Optional[Dict[str, str]] = None) -> str:
     """Canoniza nombres de propiedad y aplica alias."""
-    t = _canon_prop_norm(s)
-    if not re.search(r"[A-Z0-9]", t):
-        return ""
-    if alias:
+    t = "" if s is None else _canon_prop_str(str(s))
+    if t and alias:
         return alias.get(t, t)
     return t
 
@@ -103,15 +169,67 @@ def canon_corte(s: str) -> str:
     """Canoniza etiquetas de corte: normaliza guiones, grados, espacios."""
     if s is None:
         return ""
-    t = str(s)
-    t = t.replace("\u00A0", " ")
-    t = "".join(" " if unicodedata.category(c) == "Zs" else c for c in t)
-    for dash in ["\u2010", "\u2011", "\u2012", "\u2013", "\u2014", "\u2212"]:
-        t = t.replace(dash, "-")
-    t = t.replace("º", "").replace("°", "")
-    t = re.sub(r"\s*-\s*", "-", t)
-    t = re.sub(r"\s+", "", t).upper()
-    return t
+    return _canon_corte_str(str(s))
+
+
+def _aplicar_por_unicos(valores: List[Any], fn: Callable[[str], str], vacio: np.ndarray) -> np.ndarray:
+    """fn(str(v)) evaluada una sola vez por texto distinto; "" donde `vacio`."""
+    if not valores:
+        return np.array([], dtype=object)
+    codigos, unicos = pd.factorize(np.array(list(map(str, valores)), dtype=object))
+    out = np.array([fn(u) for u in unicos], dtype=object)[codigos]
+    out[vacio] = ""
+    return out
+
+
+def _es_none(valores: List[Any]) -> np.ndarray:
+    return np.fromiter((v is None for v in valores), dtype=bool, count=len(valores))
+
+
+def canon_prop_series(serie: pd.Series, alias: Optional[Mapping[str, str]] = None) -> pd.Series:
+    """canon_prop aplicado a toda una Series (coste por etiqueta distinta, no por celda)."""
+    def fn(texto: str) -> str:
+        t = _canon_prop_str(texto)
+        return alias.get(t, t) if t and alias else t
+
+    valores = serie.tolist()
+    canon = _aplicar_por_unicos(valores, fn, _es_none(valores))
+    return pd.Series(canon, index=serie.index, name=serie.name, dtype=object)
+
+
+def canon_corte_index(columnas: Iterable[Any]) -> pd.Index:
+    """canon_corte aplicado a todas las etiquetas de un Index de columnas."""
+    valores = list(columnas)
+    return pd.Index(_aplicar_por_unicos(valores, _canon_corte_str, _es_none(valores)), dtype=object)
+
+
+_CACHES_CANON = {
+    "strip_accents":   _strip_accents_str,
+    "canon_prop_norm": _canon_prop_norm_str,
+    "canon_prop":      _canon_prop_str,
+    "canon_corte":     _canon_corte_str,
+}
+
+
+def estadisticas_canonizacion() -> Dict[str, Dict[str, float]]:
+    """Aciertos / fallos / tamaño de cada caché de canonización (por proceso)."""
+    out: Dict[str, Dict[str, float]] = {}
+    for nombre, fn in _CACHES_CANON.items():
+        info = fn.cache_info()
+        total = info.hits + info.misses
+        out[nombre] = {
+            "hits":     info.hits,
+            "misses":   info.misses,
+            "size":     info.currsize,
+            "maxsize":  info.maxsize,
+            "hit_rate": info.hits / total if total else 0.0,
+        }
+    return out
+
+
+def limpiar_cache_canonizacion() -> None:
+    for fn in _CACHES_CANON.values():
+        fn.cache_clear()
 
 
 # ---------------------------------------------------------------------------
@@ -123,6 +241,95 @@ def canon_corte(s: str) -> str:
 UmbralesDict = Dict[Tuple[str, str], Tuple[Optional[float], Optional[float]]]
 
 
+class UmbralesCompilados(dict):
+    """
+    UmbralesDict compilado para la clasificación en lote.
+
+    Sigue siendo un dict {(PROP_CANON, CORTE_CANON): (repro, admis)} de solo
+    lectura (compatible con `_buscar_umbrales`), y además guarda:
+
+      - props_con_umbral: propiedades con al menos un umbral
+      - cortes / pos_corte: cortes conocidos y su posición
+      - matrices densas REPRO / ADMISIBLE (propiedad × posición de corte,
+        NaN = no definido) con el fallback PESO ACUMULADO → PESO ya resuelto
+    """
+
+    def __init__(self, data: Any = ()) -> None:
+        super().__init__(data)
+        self.props_con_umbral = frozenset(p for p, _c in self.keys())
+        self.cortes: Tuple[str, ...] = tuple(sorted({c for _p, c in self.keys()}))
+        self.pos_corte: Dict[str, int] = {c: j for j, c in enumerate(self.cortes)}
+
+        props = set(self.props_con_umbral)
+        props.update(p for p in _FALLBACK_UMBRAL if _FALLBACK_UMBRAL[p] in props)
+        self.props: Tuple[str, ...] = tuple(sorted(props))
+        self._fila: Dict[str, int] = {p: i for i, p in enumerate(self.props)}
+
+        # Una fila y una columna extra de NaN para propiedades / cortes desconocidos
+        forma = (len(self.props) + 1, len(self.cortes) + 1)
+        repro  = np.full(forma, np.nan)
+        admis  = np.full(forma, np.nan)
+        existe = np.zeros(forma, dtype=bool)
+        if self:
+            i = np.array([self._fila[p] for p, _c in self.keys()], dtype=int)
+            j = np.array([self.pos_corte[c] for _p, c in self.keys()], dtype=int)
+            repro[i, j]  = [_nan_si_none(r) for r, _a in self.values()]
+            admis[i, j]  = [_nan_si_none(a) for _r, a in self.values()]
+            existe[i, j] = True
+        for p, base in _FALLBACK_UMBRAL.items():
+            if p in self._fila and base in self._fila:
+                i, ib = self._fila[p], self._fila[base]
+                sin_clave = ~existe[i]
+                repro[i, sin_clave] = repro[ib, sin_clave]
+                admis[i, sin_clave] = admis[ib, sin_clave]
+        repro.setflags(write=False)
+        admis.setflags(write=False)
+        self.repro = repro
+        self.admis = admis
+
+    def huella(self) -> bytes:
+        """BLAKE2b del contenido {(prop, corte): (repro, admis)}, independiente del archivo de origen."""
+        return hashlib.blake2b(repr(sorted(self.items())).encode("utf-8"), digest_size=32).digest()
+
+    def tiene_umbral(self, prop_canon: str) -> bool:
+        """La propiedad (o su base de fallback) tiene algún umbral."""
+        return _prop_base_para_umbral(prop_canon) in self.props_con_umbral
+
+    def filas(self, prop_canon: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(repro, admis) de la propiedad indexados por posición de corte."""
+        i = self._fila.get(prop_canon, len(self.props))
+        return self.repro[i, :-1], self.admis[i, :-1]
+
+    def matrices(
+        self,
+        props_canon: List[str],
+        cortes_canon: List[str],
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Matrices REPRO / ADMISIBLE (P × C) alineadas y vector tiene_umbral (P,)."""
+        sin_fila, sin_col = len(self.props), len(self.cortes)
+        filas = np.array([self._fila.get(p, sin_fila) for p in props_canon], dtype=int)
+        cols  = np.array([self.pos_corte.get(c, sin_col) for c in cortes_canon], dtype=int)
+        idx = np.ix_(filas, cols)
+        tiene = np.array([self.tiene_umbral(p) for p in props_canon], dtype=bool)
+        return self.repro[idx], self.admis[idx], tiene
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    def _solo_lectura(self, *args: Any, **kwargs: Any) -> None:
+        raise TypeError("UmbralesCompilados es de solo lectura.")
+
+    __setitem__ = __delitem__ = _solo_lectura
+    clear = pop = popitem = setdefault = update = _solo_lectura
+
+
+def compilar_umbrales(umbrales: UmbralesDict) -> UmbralesCompilados:
+    """Devuelve `umbrales` compilado (sin coste si ya lo está)."""
+    if isinstance(umbrales, UmbralesCompilados):
+        return umbrales
+    return UmbralesCompilados(umbrales)
+
+
 def detectar_columna_tipo(df: pd.DataFrame) -> Optional[str]:
     for col in df.columns:
         name = str(col).strip().lower()
@@ -152,15 +359,17 @@ def normalizar_tipo(raw) -> str:
 def construir_umbrales(
     df: pd.DataFrame,
     alias_prop: Dict[str, str],
-) -> UmbralesDict:
+) -> UmbralesCompilados:
     """
-    Lee la matriz de umbrales y devuelve:
+    Lee la matriz de umbrales y devuelve, ya compilado (ver UmbralesCompilados):
         {(PROP_CANON, CORTE_CANON): (repro, admisible)}
 
     - Filas con Tipo REPRO/REPET   → alimentan repro   (conserva el mayor)
     - Filas con Tipo ADMISIBLE     → alimentan admisible (conserva el mayor)
     - La propiedad se hereda hacia abajo: si la celda está vacía se usa
       la última propiedad no vacía vista.
+    - Las cabeceras numéricas (p. ej. 300, como las deja Excel) también son
+      cortes, igual que en los ISA/RAMS (ver detectar_cortes_en_df).
     """
     col_prop = next((c for c in df.columns if str(c).strip().lower() == "propiedad"), None)
     if col_prop is None:
@@ -169,211 +378,208 @@ def construir_umbrales(
     if col_tipo is None:
         raise ValueError("No se localiza columna 'Tipo' en la matriz de umbrales.")
 
-    # Columnas de corte: todo lo que no sea Propiedad ni Tipo
-    cortes_cols: List[Tuple[str, str]] = []
-    for c in df.columns:
-        if c in {col_prop, col_tipo}:
-            continue
-        cc = canon_corte(str(c))
-        if cc in {"", "UNIDAD", "CRUDO"}:
-            continue
-        cortes_cols.append((str(c), cc))
-
-    repro_dict: Dict[Tuple[str, str], float] = {}
-    admis_dict: Dict[Tuple[str, str], float] = {}
-    prop_actual = ""
-
-    for _, row in df.iterrows():
-        # Actualizar propiedad solo cuando la celda tiene contenido
-        prop_raw = row.get(col_prop)
-        prop_c = canon_prop(prop_raw, alias_prop)
-        if prop_c:
-            prop_actual = prop_c
-        if not prop_actual:
-            continue
-
-        tipo = normalizar_tipo(row.get(col_tipo))
-        is_repro = "REPRO" in tipo or "REPET" in tipo
-        is_admis = "ADMISIBLE" in tipo
-
-        if not (is_repro or is_admis):
-            continue
-
-        for col_o, cc in cortes_cols:
-            val = row.get(col_o)
-            if pd.isna(val):
-                continue
-            vs = str(val).strip()
-            if vs == "":
-                continue
-            try:
-                v = float(vs.replace(",", "."))
-            except Exception:
-                continue
-
-            key = (prop_actual, cc)
-            if is_repro:
-                if key not in repro_dict or v > repro_dict[key]:
-                    repro_dict[key] = v
-            if is_admis:
-                if key not in admis_dict or v > admis_dict[key]:
-                    admis_dict[key] = v
+    columnas = list(df.columns)
+    pos_prop = columnas.index(col_prop)
+    pos_tipo = columnas.index(col_tipo)
 
-    all_keys = set(repro_dict) | set(admis_dict)
-    return {k: (repro_dict.get(k), admis_dict.get(k)) for k in all_keys}
+    # Columnas de corte: todo lo que no sea Propiedad ni Tipo
+    cortes_cols: List[Tuple[int, str]] = [
+        (j, cc)
+        for j, (c, cc) in enumerate(zip(columnas, canon_corte_index(str(c) for c in columnas)))
+        if c not in {col_prop, col_tipo} and cc not in {"", "UNIDAD", "CRUDO"}
+    ]
+
+    # Propiedad heredada hacia abajo (celda vacía o NaN → última propiedad vista)
+    col = df.iloc[:, pos_prop]
+    props = canon_prop_series(col, alias_prop).to_numpy(dtype=object, copy=True)
+    props[col.isna().to_numpy()] = ""
+    vista = np.where(props != "", np.arange(len(props)), -1)
+    np.maximum.accumulate(vista, out=vista)
+    prop_actual = np.where(vista >= 0, props[np.maximum(vista, 0)], "")
+
+    col = df.iloc[:, pos_tipo]
+    tipos = _aplicar_por_unicos(col.tolist(), normalizar_tipo, col.isna().to_numpy())
+    is_repro = np.array(["REPRO" in t or "REPET" in t for t in tipos], dtype=bool)
+    is_admis = np.array(["ADMISIBLE" in t for t in tipos], dtype=bool)
+
+    filas = np.flatnonzero((prop_actual != "") & (is_repro | is_admis))
+    if len(filas) == 0 or not cortes_cols:
+        return UmbralesCompilados()
+
+    # Formato largo (fila × corte) de las celdas numéricas
+    valores, nulo = _matriz_float(df, [j for j, _cc in cortes_cols], filas)
+    ok = ~nulo & ~np.isnan(valores)
+    fila_idx, col_idx = np.nonzero(ok)
+    v = valores[ok]
+    larga = pd.DataFrame({
+        "prop":  prop_actual[filas][fila_idx],
+        "corte": np.array([cc for _j, cc in cortes_cols], dtype=object)[col_idx],
+        "repro": np.where(is_repro[filas][fila_idx], v, np.nan),
+        "admis": np.where(is_admis[filas][fila_idx], v, np.nan),
+    })
+
+    # Máximo por (propiedad, corte) dentro de cada tipo; NaN = tipo sin valor
+    maximos = larga.groupby(["prop", "corte"], sort=False)[["repro", "admis"]].max()
+    repro = [None if x != x else x for x in maximos["repro"].tolist()]
+    admis = [None if x != x else x for x in maximos["admis"].tolist()]
+    return UmbralesCompilados(zip(maximos.index.tolist(), zip(repro, admis)))
 
 
 # ---------------------------------------------------------------------------
 # 3. Semántica de alias de propiedades
 # ---------------------------------------------------------------------------
 
-def crear_semantica_alias() -> Dict[str, str]:
-    raw: Dict[str, str] = {
-        # ── Peso ─────────────────────────────────────────────────────────────
-        "PESO":                             "PESO",
-        "PESO ACUMULADO":                   "PESO ACUMULADO",
-        "RENDIMIENTO":                      "PESO",
-        "RENDIMIENTO ACUMULADO":            "PESO ACUMULADO",
-        "% DESTILADO":                      "PESO",
-        "% VOL":                            "PESO",
-        "% EN PESO":                        "PESO",
-        # ── Densidad ─────────────────────────────────────────────────────────
-        "DENSIDAD":                         "DENSIDAD",
-        "DENSIDAD A 15C":                   "DENSIDAD",
-        "DENSIDAD A 15":                    "DENSIDAD",
-        "DENSIDAD 15C":                     "DENSIDAD",
-        "DENSIDAD RELATIVA":                "DENSIDAD",
-        "DENSIDAD RELATIVA 15/4":           "DENSIDAD",
-        "DENSIDAD A 15/4":                  "DENSIDAD",
-        "D15":                              "DENSIDAD",
-        "GRAVEDAD ESPECIFICA":              "DENSIDAD",
-        # ── Viscosidad ───────────────────────────────────────────────────────
-        "VISCOSIDAD 50":                    "VISCOSIDAD 50",
-        "VISCOSIDAD 50C":                   "VISCOSIDAD 50",
-        "VISCOSIDAD A 50C":                 "VISCOSIDAD 50",
-        "VISCOSIDAD CINEMATICA 50":         "VISCOSIDAD 50",
-        "VISCOSIDAD CINEMATICA 50C":        "VISCOSIDAD 50",
-        "VISCOSIDAD DINAMICA 50":           "VISCOSIDAD 50",
-        "VISCOSIDAD DINAMICA 50C":          "VISCOSIDAD 50",
-        "VIS 50":                           "VISCOSIDAD 50",
-        "VISCOSIDAD 100":                   "VISCOSIDAD 100",
-        "VISCOSIDAD 100C":                  "VISCOSIDAD 100",
-        "VISCOSIDAD A 100C":                "VISCOSIDAD 100",
-        "VISCOSIDAD CINEMATICA 100":        "VISCOSIDAD 100",
-        "VISCOSIDAD CINEMATICA 100C":       "VISCOSIDAD 100",
-        "VIS 100":                          "VISCOSIDAD 100",
-        # ── Azufre ───────────────────────────────────────────────────────────
-        "AZUFRE":                           "AZUFRE",
-        "AZUFRE TOTAL":                     "AZUFRE",
-        "AZUFRE MERCAPTANO":                "AZUFRE MERCAPTANO",
-        "S MERCAPTANO":                     "AZUFRE MERCAPTANO",
-        # ── Octanaje ─────────────────────────────────────────────────────────
-        "RON":                              "RON",
-        "NOR":                              "RON",
-        "NOR CLARO":                        "RON",
-        "N O R CLARO":                      "RON",
-        "NUMERO DE OCTANO INVESTIGACION":   "RON",
-        "MON":                              "MON",
-        "NOM":                              "MON",
-        "NOM CLARO":                        "MON",
-        "N O M CLARO":                      "MON",
-        "NUMERO DE OCTANO MOTOR":           "MON",
-        # ── Índice de neutralización ─────────────────────────────────────────
-        "N DE NEUTRALIZACION":              "N DE NEUTRALIZACION",
-        "NUMERO DE NEUTRALIZACION":         "N DE NEUTRALIZACION",
-        "NO DE NEUTRALIZACION":             "N DE NEUTRALIZACION",
-        "INDICE DE ACIDEZ":                 "N DE NEUTRALIZACION",
-        # ── Índice de refracción ─────────────────────────────────────────────
-        "INDICE DE REFRACCION 70C":         "INDICE DE REFRACCION 70C",
-        "INDICE DE REFRACCION":             "INDICE DE REFRACCION 70C",
-        "IR 70C":                           "INDICE DE REFRACCION 70C",
-        # ── Puntos físicos ───────────────────────────────────────────────────
-        "PUNTO DE VERTIDO":                 "PUNTO DE VERTIDO",
-        "PUNTO DE NIEBLA":                  "PUNTO DE NIEBLA",
-        "PUNTO DE CRISTALIZACION":          "PUNTO DE CRISTALIZACION",
-        "PUNTO DE ANILINA":                 "PUNTO DE ANILINA",
-        "PUNTO DE INFLAMACION":             "PUNTO DE INFLAMACION",
-        "PUNTO INICIAL DE EBULLICION":      "PUNTO INICIAL DE EBULLICION",
-        "PIE":                              "PUNTO INICIAL DE EBULLICION",
-        "IBP":                              "PUNTO INICIAL DE EBULLICION",
-        "PUNTO FINAL DE EBULLICION":        "PUNTO FINAL DE EBULLICION",
-        "PFE":                              "PUNTO FINAL DE EBULLICION",
-        "FBP":                              "PUNTO FINAL DE EBULLICION",
-        # ── PIONA ────────────────────────────────────────────────────────────
-        "PIONA (%VOL), N-PARAFINAS":        "PIONA N-PARAFINAS",
-        "PIONA (%VOL), I-PARAFINAS":        "PIONA I-PARAFINAS",
-        "PIONA (%VOL), NAFTENOS":           "PIONA NAFTENOS",
-        "PIONA (%VOL), POLINAFTENOS":       "PIONA POLINAFTENOS",
-        "PIONA (%VOL), AROMATICOS":         "PIONA AROMATICOS",
-        "PIONA (%VOL), OLEFINAS":           "PIONA OLEFINAS",
-        "PIONA (%VOL), SUPERIORES A 200C":  "PIONA SUPERIORES A 200C",
-        "PIONA (%VOL) N-PARAFINAS":         "PIONA N-PARAFINAS",
-        "PIONA (%VOL) I-PARAFINAS":         "PIONA I-PARAFINAS",
-        "PIONA (%VOL) NAFTENOS":            "PIONA NAFTENOS",
-        "PIONA (%VOL) POLINAFTENOS":        "PIONA POLINAFTENOS",
-        "PIONA (%VOL) AROMATICOS":          "PIONA AROMATICOS",
-        "PIONA (%VOL) OLEFINAS":            "PIONA OLEFINAS",
-        "PIONA (%VOL) SUPERIORES A 200C":   "PIONA SUPERIORES A 200C",
-        "PIONA N-PARAFINAS":                "PIONA N-PARAFINAS",
-        "PIONA I-PARAFINAS":                "PIONA I-PARAFINAS",
-        "PIONA NAFTENOS":                   "PIONA NAFTENOS",
-        "PIONA POLINAFTENOS":               "PIONA POLINAFTENOS",
-        "PIONA AROMATICOS":                 "PIONA AROMATICOS",
-        "PIONA OLEFINAS":                   "PIONA OLEFINAS",
-        "PIONA SUPERIORES A 200C":          "PIONA SUPERIORES A 200C",
-        "PIONA, N-PARAFINAS":               "PIONA N-PARAFINAS",
-        "PIONA, I-PARAFINAS":               "PIONA I-PARAFINAS",
-        "PIONA, NAFTENOS":                  "PIONA NAFTENOS",
-        "PIONA, POLINAFTENOS":              "PIONA POLINAFTENOS",
-        "PIONA, AROMATICOS":                "PIONA AROMATICOS",
-        "PIONA, OLEFINAS":                  "PIONA OLEFINAS",
-        "PIONA, SUPERIORES A 200C":         "PIONA SUPERIORES A 200C",
-        "N-PARAFINAS":                      "PIONA N-PARAFINAS",
-        "PARAFINAS NORMALES":               "PIONA N-PARAFINAS",
-        "N PARAFINAS":                      "PIONA N-PARAFINAS",
-        "I-PARAFINAS":                      "PIONA I-PARAFINAS",
-        "ISOPARAFINAS":                     "PIONA I-PARAFINAS",
-        "I PARAFINAS":                      "PIONA I-PARAFINAS",
-        "NAFTENOS":                         "PIONA NAFTENOS",
-        "NAFTENICOS":                       "PIONA NAFTENOS",
-        "POLINAFTENOS":                     "PIONA POLINAFTENOS",
-        "AROMATICOS":                       "PIONA AROMATICOS",
-        "AROMATICS":                        "PIONA AROMATICOS",
-        "OLEFINAS":                         "PIONA OLEFINAS",
-        "SUPERIORES A 200C":                "PIONA SUPERIORES A 200C",
-        # ── Nitrógeno ────────────────────────────────────────────────────────
-        "NITROGENO":                        "NITROGENO",
-        "NITROGENO TOTAL":                  "NITROGENO",
-        "NITROGENO BASICO":                 "NITROGENO BASICO",
-        # ── Residuo de carbono ───────────────────────────────────────────────
-        "RESIDUO DE CARBON":                "RESIDUO DE CARBON",
-        "CARBONO CONRADSON":                "RESIDUO DE CARBON",
-        "CONRADSON":                        "RESIDUO DE CARBON",
-        "CCR":                              "RESIDUO DE CARBON",
-        "MCRT":                             "RESIDUO DE CARBON",
-        # ── Asfaltenos y aromáticos ──────────────────────────────────────────
-        "ASFALTENOS":                       "ASFALTENOS",
-        "MONOAROMATICOS":                   "MONOAROMATICOS",
-        "DIAROMATICOS":                     "DIAROMATICOS",
-        "TRIAROMATICOS Y SUPERIORES":       "TRIAROMATICOS",
-        "TRIAROMATICOS":                    "TRIAROMATICOS",
-        # ── Gases ligeros ─────────────────────────────────────────────────────
-        "CONTENIDO EN C2":                  "CONTENIDO EN C2",
-        "C2":                               "CONTENIDO EN C2",
-        "CONTENIDO EN C3":                  "CONTENIDO EN C3",
-        "C3":                               "CONTENIDO EN C3",
-        "CONTENIDO EN IC4":                 "CONTENIDO EN IC4",
-        "IC4":                              "CONTENIDO EN IC4",
-        "CONTENIDO EN NC4":                 "CONTENIDO EN NC4",
-        "NC4":                              "CONTENIDO EN NC4",
-        # ── Metales ──────────────────────────────────────────────────────────
-        "NIQUEL":                           "NIQUEL",
-        "NI":                               "NIQUEL",
-        "VANADIO":                          "VANADIO",
-        "V":                                "VANADIO",
-        "SILICIO":                          "SILICIO",
-        "SI":                               "SILICIO",
-    }
+_ALIAS_RAW: Dict[str, str] = {
+    # ── Peso ─────────────────────────────────────────────────────────────
+    "PESO":                             "PESO",
+    "PESO ACUMULADO":                   "PESO ACUMULADO",
+    "RENDIMIENTO":                      "PESO",
+    "RENDIMIENTO ACUMULADO":            "PESO ACUMULADO",
+    "% DESTILADO":                      "PESO",
+    "% VOL":                            "PESO",
+    "% EN PESO":                        "PESO",
+    # ── Densidad ─────────────────────────────────────────────────────────
+    "DENSIDAD":                         "DENSIDAD",
+    "DENSIDAD A 15C":                   "DENSIDAD",
+    "DENSIDAD A 15":                    "DENSIDAD",
+    "DENSIDAD 15C":                     "DENSIDAD",
+    "DENSIDAD RELATIVA":                "DENSIDAD",
+    "DENSIDAD RELATIVA 15/4":           "DENSIDAD",
+    "DENSIDAD A 15/4":                  "DENSIDAD",
+    "D15":                              "DENSIDAD",
+    "GRAVEDAD ESPECIFICA":              "DENSIDAD",
+    # ── Viscosidad ───────────────────────────────────────────────────────
+    "VISCOSIDAD 50":                    "VISCOSIDAD 50",
+    "VISCOSIDAD 50C":                   "VISCOSIDAD 50",
+    "VISCOSIDAD A 50C":                 "VISCOSIDAD 50",
+    "VISCOSIDAD CINEMATICA 50":         "VISCOSIDAD 50",
+    "VISCOSIDAD CINEMATICA 50C":        "VISCOSIDAD 50",
+    "VISCOSIDAD DINAMICA 50":           "VISCOSIDAD 50",
+    "VISCOSIDAD DINAMICA 50C":          "VISCOSIDAD 50",
+    "VIS 50":                           "VISCOSIDAD 50",
+    "VISCOSIDAD 100":                   "VISCOSIDAD 100",
+    "VISCOSIDAD 100C":                  "VISCOSIDAD 100",
+    "VISCOSIDAD A 100C":                "VISCOSIDAD 100",
+    "VISCOSIDAD CINEMATICA 100":        "VISCOSIDAD 100",
+    "VISCOSIDAD CINEMATICA 100C":       "VISCOSIDAD 100",
+    "VIS 100":                          "VISCOSIDAD 100",
+    # ── Azufre ───────────────────────────────────────────────────────────
+    "AZUFRE":                           "AZUFRE",
+    "AZUFRE TOTAL":                     "AZUFRE",
+    "AZUFRE MERCAPTANO":                "AZUFRE MERCAPTANO",
+    "S MERCAPTANO":                     "AZUFRE MERCAPTANO",
+    # ── Octanaje ─────────────────────────────────────────────────────────
+    "RON":                              "RON",
+    "NOR":                              "RON",
+    "NOR CLARO":                        "RON",
+    "N O R CLARO":                      "RON",
+    "NUMERO DE OCTANO INVESTIGACION":   "RON",
+    "MON":                              "MON",
+    "NOM":                              "MON",
+    "NOM CLARO":                        "MON",
+    "N O M CLARO":                      "MON",
+    "NUMERO DE OCTANO MOTOR":           "MON",
+    # ── Índice de neutralización ─────────────────────────────────────────
+    "N DE NEUTRALIZACION":              "N DE NEUTRALIZACION",
+    "NUMERO DE NEUTRALIZACION":         "N DE NEUTRALIZACION",
+    "NO DE NEUTRALIZACION":             "N DE NEUTRALIZACION",
+    "INDICE DE ACIDEZ":                 "N DE NEUTRALIZACION",
+    # ── Índice de refracción ─────────────────────────────────────────────
+    "INDICE DE REFRACCION 70C":         "INDICE DE REFRACCION 70C",
+    "INDICE DE REFRACCION":             "INDICE DE REFRACCION 70C",
+    "IR 70C":                           "INDICE DE REFRACCION 70C",
+    # ── Puntos físicos ───────────────────────────────────────────────────
+    "PUNTO DE VERTIDO":                 "PUNTO DE VERTIDO",
+    "PUNTO DE NIEBLA":                  "PUNTO DE NIEBLA",
+    "PUNTO DE CRISTALIZACION":          "PUNTO DE CRISTALIZACION",
+    "PUNTO DE ANILINA":                 "PUNTO DE ANILINA",
+    "PUNTO DE INFLAMACION":             "PUNTO DE INFLAMACION",
+    "PUNTO INICIAL DE EBULLICION":      "PUNTO INICIAL DE EBULLICION",
+    "PIE":                              "PUNTO INICIAL DE EBULLICION",
+    "IBP":                              "PUNTO INICIAL DE EBULLICION",
+    "PUNTO FINAL DE EBULLICION":        "PUNTO FINAL DE EBULLICION",
+    "PFE":                              "PUNTO FINAL DE EBULLICION",
+    "FBP":                              "PUNTO FINAL DE EBULLICION",
+    # ── PIONA ────────────────────────────────────────────────────────────
+    "PIONA (%VOL), N-PARAFINAS":        "PIONA N-PARAFINAS",
+    "PIONA (%VOL), I-PARAFINAS":        "PIONA I-PARAFINAS",
+    "PIONA (%VOL), NAFTENOS":           "PIONA NAFTENOS",
+    "PIONA (%VOL), POLINAFTENOS":       "PIONA POLINAFTENOS",
+    "PIONA (%VOL), AROMATICOS":         "PIONA AROMATICOS",
+    "PIONA (%VOL), OLEFINAS":           "PIONA OLEFINAS",
+    "PIONA (%VOL), SUPERIORES A 200C":  "PIONA SUPERIORES A 200C",
+    "PIONA (%VOL) N-PARAFINAS":         "PIONA N-PARAFINAS",
+    "PIONA (%VOL) I-PARAFINAS":         "PIONA I-PARAFINAS",
+    "PIONA (%VOL) NAFTENOS":            "PIONA NAFTENOS",
+    "PIONA (%VOL) POLINAFTENOS":        "PIONA POLINAFTENOS",
+    "PIONA (%VOL) AROMATICOS":          "PIONA AROMATICOS",
+    "PIONA (%VOL) OLEFINAS":            "PIONA OLEFINAS",
+    "PIONA (%VOL) SUPERIORES A 200C":   "PIONA SUPERIORES A 200C",
+    "PIONA N-PARAFINAS":                "PIONA N-PARAFINAS",
+    "PIONA I-PARAFINAS":                "PIONA I-PARAFINAS",
+    "PIONA NAFTENOS":                   "PIONA NAFTENOS",
+    "PIONA POLINAFTENOS":               "PIONA POLINAFTENOS",
+    "PIONA AROMATICOS":                 "PIONA AROMATICOS",
+    "PIONA OLEFINAS":                   "PIONA OLEFINAS",
+    "PIONA SUPERIORES A 200C":          "PIONA SUPERIORES A 200C",
+    "PIONA, N-PARAFINAS":               "PIONA N-PARAFINAS",
+    "PIONA, I-PARAFINAS":               "PIONA I-PARAFINAS",
+    "PIONA, NAFTENOS":                  "PIONA NAFTENOS",
+    "PIONA, POLINAFTENOS":              "PIONA POLINAFTENOS",
+    "PIONA, AROMATICOS":                "PIONA AROMATICOS",
+    "PIONA, OLEFINAS":                  "PIONA OLEFINAS",
+    "PIONA, SUPERIORES A 200C":         "PIONA SUPERIORES A 200C",
+    "N-PARAFINAS":                      "PIONA N-PARAFINAS",
+    "PARAFINAS NORMALES":               "PIONA N-PARAFINAS",
+    "N PARAFINAS":                      "PIONA N-PARAFINAS",
+    "I-PARAFINAS":                      "PIONA I-PARAFINAS",
+    "ISOPARAFINAS":                     "PIONA I-PARAFINAS",
+    "I PARAFINAS":                      "PIONA I-PARAFINAS",
+    "NAFTENOS":                         "PIONA NAFTENOS",
+    "NAFTENICOS":                       "PIONA NAFTENOS",
+    "POLINAFTENOS":                     "PIONA POLINAFTENOS",
+    "AROMATICOS":                       "PIONA AROMATICOS",
+    "AROMATICS":                        "PIONA AROMATICOS",
+    "OLEFINAS":                         "PIONA OLEFINAS",
+    "SUPERIORES A 200C":                "PIONA SUPERIORES A 200C",
+    # ── Nitrógeno ────────────────────────────────────────────────────────
+    "NITROGENO":                        "NITROGENO",
+    "NITROGENO TOTAL":                  "NITROGENO",
+    "NITROGENO BASICO":                 "NITROGENO BASICO",
+    # ── Residuo de carbono ───────────────────────────────────────────────
+    "RESIDUO DE CARBON":                "RESIDUO DE CARBON",
+    "CARBONO CONRADSON":                "RESIDUO DE CARBON",
+    "CONRADSON":                        "RESIDUO DE CARBON",
+    "CCR":                              "RESIDUO DE CARBON",
+    "MCRT":                             "RESIDUO DE CARBON",
+    # ── Asfaltenos y aromáticos ──────────────────────────────────────────
+    "ASFALTENOS":                       "ASFALTENOS",
+    "MONOAROMATICOS":                   "MONOAROMATICOS",
+    "DIAROMATICOS":                     "DIAROMATICOS",
+    "TRIAROMATICOS Y SUPERIORES":       "TRIAROMATICOS",
+    "TRIAROMATICOS":                    "TRIAROMATICOS",
+    # ── Gases ligeros ─────────────────────────────────────────────────────
+    "CONTENIDO EN C2":                  "CONTENIDO EN C2",
+    "C2":                               "CONTENIDO EN C2",
+    "CONTENIDO EN C3":                  "CONTENIDO EN C3",
+    "C3":                               "CONTENIDO EN C3",
+    "CONTENIDO EN IC4":                 "CONTENIDO EN IC4",
+    "IC4":                              "CONTENIDO EN IC4",
+    "CONTENIDO EN NC4":                 "CONTENIDO EN NC4",
+    "NC4":                              "CONTENIDO EN NC4",
+    # ── Metales ──────────────────────────────────────────────────────────
+    "NIQUEL":                           "NIQUEL",
+    "NI":                               "NIQUEL",
+    "VANADIO":                          "VANADIO",
+    "V":                                "VANADIO",
+    "SILICIO":                          "SILICIO",
+    "SI":                               "SILICIO",
+}
+
+ENV_ALIAS_FILE = "VALIDADOR_ALIAS_FILE"
+
+
+def _compilar_alias(raw: Mapping[str, str]) -> Dict[str, str]:
     out: Dict[str, str] = {}
     for k, v in raw.items():
         nk = _canon_prop_norm(k)
@@ -383,6 +589,86 @@ def crear_semantica_alias() -> Dict[str, str]:
     return out
 
 
+_ALIAS_BASE: Mapping[str, str] = MappingProxyType(_compilar_alias(_ALIAS_RAW))
+
+
+def _leer_alias_externo(ruta: Path, datos: bytes) -> Dict[str, str]:
+    """Parsea un archivo de alias YAML / JSON / CSV: {variante: propiedad canónica}."""
+    ext = ruta.suffix.lower()
+    try:
+        texto = datos.decode("utf-8-sig")
+        if ext == ".json":
+            raw = json.loads(texto)
+        elif ext in (".yaml", ".yml"):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ValueError("Leer alias en YAML requiere PyYAML (pip install pyyaml).") from e
+            try:
+                raw = yaml.safe_load(texto) or {}
+            except yaml.YAMLError as e:
+                raise ValueError(str(e)) from e
+        elif ext == ".csv":
+            filas = [f for f in csv.reader(io.StringIO(texto)) if f and any(c.strip() for c in f)]
+            if filas and [c.strip().lower() for c in filas[0][:2]] == ["alias", "propiedad"]:
+                filas = filas[1:]
+            if any(len(f) < 2 for f in filas):
+                raise ValueError("cada fila debe tener dos columnas: alias,propiedad")
+            raw = {f[0]: f[1] for f in filas}
+        else:
+            raise ValueError(f"extensión no soportada '{ext}' (usa .json, .yaml, .yml o .csv)")
+    except (ValueError, csv.Error) as e:
+        raise ValueError(f"Archivo de alias '{ruta.name}' no válido: {e}") from e
+    if not isinstance(raw, dict) or not all(isinstance(v, str) for v in raw.values()):
+        raise ValueError(f"Archivo de alias '{ruta.name}' no válido: se espera un mapeo alias → propiedad.")
+    return _compilar_alias({str(k): v for k, v in raw.items()})
+
+
+# ruta → (mtime_ns, tamaño, sha256, alias compilados)
+_ALIAS_EXTERNOS: Dict[Path, Tuple[int, int, str, Mapping[str, str]]] = {}
+_ALIAS_LOCK = threading.Lock()
+
+
+def alias_propiedades(ruta: Optional[os.PathLike] = None) -> Mapping[str, str]:
+    """
+    Tabla de alias compilada e inmutable, compartida por todo el proceso.
+
+    Si se indica `ruta` (o la variable de entorno VALIDADOR_ALIAS_FILE), sus
+    entradas se añaden a los alias del código, con prioridad sobre ellos.
+    El archivo solo se vuelve a leer cuando cambia su mtime o su tamaño, y
+    solo se recompila si además cambia su contenido.
+    """
+    if ruta is None:
+        ruta = os.environ.get(ENV_ALIAS_FILE, "").strip() or None
+    if ruta is None:
+        return _ALIAS_BASE
+
+    ruta = Path(ruta)
+    try:
+        st = ruta.stat()
+    except OSError as e:
+        raise ValueError(f"No se puede leer el archivo de alias '{ruta}': {e}") from e
+
+    with _ALIAS_LOCK:
+        previo = _ALIAS_EXTERNOS.get(ruta)
+        if previo and previo[:2] == (st.st_mtime_ns, st.st_size):
+            return previo[3]
+        datos = ruta.read_bytes()
+        digest = hashlib.sha256(datos).hexdigest()
+        if previo and previo[2] == digest:
+            alias = previo[3]
+        else:
+            alias = MappingProxyType({**_ALIAS_BASE, **_leer_alias_externo(ruta, datos)})
+            logger.info("Alias de propiedades cargados de '%s' (%d entradas)", ruta, len(alias))
+        _ALIAS_EXTERNOS[ruta] = (st.st_mtime_ns, st.st_size, digest, alias)
+        return alias
+
+
+def crear_semantica_alias() -> Dict[str, str]:
+    """Copia mutable de la tabla de alias (ver alias_propiedades)."""
+    return dict(alias_propiedades())
+
+
 # ---------------------------------------------------------------------------
 # 4. Reglas de evaluación
 # ---------------------------------------------------------------------------
@@ -404,10 +690,12 @@ def es_corte_pesado(corte: str) -> bool:
     return False
 
 
+# Propiedades que, sin umbral propio para un corte, usan el de otra propiedad
+_FALLBACK_UMBRAL = {"PESO ACUMULADO": "PESO"}
+
+
 def _prop_base_para_umbral(prop_canon: str) -> str:
-    if prop_canon == "PESO ACUMULADO":
-        return "PESO"
-    return prop_canon
+    return _FALLBACK_UMBRAL.get(prop_canon, prop_canon)
 
 
 def _buscar_umbrales(
@@ -442,30 +730,163 @@ def _buscar_umbral(
     return repro if repro is not None else admis
 
 
-def _clasificar_corte(
-    v: float,
-    repro: Optional[float],
-    admis: Optional[float],
-) -> str:
+# Códigos de estado por corte usados por la clasificación en lote
+ESTADO_NO_NUMERICO = 0
+ESTADO_SIN_UMBRAL  = 1
+ESTADO_VERDE       = 2
+ESTADO_AMARILLO    = 3
+ESTADO_ROJO        = 4
+
+ESTADO_TEXTO = {
+    ESTADO_NO_NUMERICO: "(no numérico)",
+    ESTADO_SIN_UMBRAL:  "(sin umbral)",
+    ESTADO_VERDE:       "VERDE",
+    ESTADO_AMARILLO:    "AMARILLO",
+    ESTADO_ROJO:        "ROJO",
+}
+
+
+@dataclass
+class ClasificacionLote:
     """
-    Clasifica el error de un corte individual.
+    Resultado de `clasificar_matriz` para P propiedades × C cortes.
 
-      repro y admis disponibles → verde / amarillo / rojo
-      solo repro                → verde / rojo
-      solo admis                → amarillo / rojo
+    Los índices de `corte_peor` son posiciones de columna (-1 si no hay peor
+    corte); `error_peor` y `umbral_peor` valen NaN en ese caso.
     """
-    if repro is not None and admis is not None:
-        if v < repro:
-            return "VERDE"
-        elif v < admis:
-            return "AMARILLO"
-        else:
-            return "ROJO"
-    elif repro is not None:
-        return "VERDE" if v < repro else "ROJO"
-    elif admis is not None:
-        return "AMARILLO" if v < admis else "ROJO"
-    return "(sin umbral)"
+    estados:     np.ndarray   # (P, C) códigos ESTADO_*
+    n_verde:     np.ndarray   # (P,)
+    n_amarillo:  np.ndarray   # (P,)
+    n_rojo:      np.ndarray   # (P,)
+    n_validos:   np.ndarray   # (P,) cortes con valor y umbral
+    n_con_valor: np.ndarray   # (P,) cortes con valor numérico
+    semaforos:   List[str]    # (P,) "", "NA", "VERDE", "AMARILLO" o "ROJO"
+    corte_peor:  np.ndarray   # (P,)
+    error_peor:  np.ndarray   # (P,)
+    ratio_peor:  np.ndarray   # (P,) -1.0 si no hay peor corte
+    umbral_peor: np.ndarray   # (P,)
+
+
+def _semaforos_por_conteo(
+    n_verde: np.ndarray,
+    n_rojo: np.ndarray,
+    n_validos: np.ndarray,
+    n_con_valor: np.ndarray,
+    tiene_umbral_prop: np.ndarray,
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+) -> List[str]:
+    """Semáforo global de cada propiedad a partir de sus conteos de cortes."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        verde_pct = n_verde / n_validos
+        rojo_pct  = n_rojo  / n_validos
+    sem = np.select(
+        [
+            n_con_valor == 0,
+            ~tiene_umbral_prop | (n_validos == 0),
+            rojo_pct > pct_rojo_rojo,
+            verde_pct >= pct_ok_amarillo,
+        ],
+        ["", "NA", "ROJO", "VERDE"],
+        default="AMARILLO",
+    )
+    return sem.tolist()
+
+
+def clasificar_matriz(
+    errores: np.ndarray,
+    repro: np.ndarray,
+    admis: np.ndarray,
+    tiene_umbral_prop: np.ndarray,
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+) -> ClasificacionLote:
+    """
+    Clasifica de una vez todos los cortes de todas las propiedades de un crudo.
+
+    Args:
+        errores:  (P, C) errores absolutos; NaN = sin valor numérico.
+        repro:    (P, C) umbral REPRO alineado con `errores`; NaN = no definido.
+        admis:    (P, C) umbral ADMISIBLE alineado con `errores`; NaN = no definido.
+        tiene_umbral_prop: (P,) si la propiedad tiene algún umbral en la matriz.
+
+    Reglas por corte: ver cabecera del módulo. Peor corte: mayor ratio
+    error / REPRO (o / ADMISIBLE si no hay REPRO); el primero en caso de empate.
+    """
+    errores = np.asarray(errores, dtype=float)
+    repro   = np.asarray(repro,   dtype=float)
+    admis   = np.asarray(admis,   dtype=float)
+    tiene_umbral_prop = np.asarray(tiene_umbral_prop, dtype=bool)
+
+    con_valor = ~np.isnan(errores)
+    tiene_r   = ~np.isnan(repro)
+    tiene_a   = ~np.isnan(admis)
+    validos   = con_valor & (tiene_r | tiene_a)
+
+    verde    = validos & tiene_r & (errores < repro)
+    amarillo = validos & ~verde & tiene_a & (errores < admis)
+    rojo     = validos & ~verde & ~amarillo
+
+    estados = np.full(errores.shape, ESTADO_NO_NUMERICO, dtype=np.int8)
+    estados[con_valor] = ESTADO_SIN_UMBRAL
+    estados[verde]     = ESTADO_VERDE
+    estados[amarillo]  = ESTADO_AMARILLO
+    estados[rojo]      = ESTADO_ROJO
+
+    n_verde     = verde.sum(axis=1)
+    n_amarillo  = amarillo.sum(axis=1)
+    n_rojo      = rojo.sum(axis=1)
+    n_validos   = validos.sum(axis=1)
+    n_con_valor = con_valor.sum(axis=1)
+
+    # Peor corte: mayor ratio error / umbral de referencia (REPRO > 0, si no ADMISIBLE > 0)
+    denom = np.where(tiene_r & (repro > 0), repro, np.where(tiene_a & (admis > 0), admis, np.nan))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.where(np.isnan(denom), np.inf, errores / denom)
+    ratio = np.where(validos & ~np.isnan(ratio), ratio, -np.inf)
+
+    n_props = errores.shape[0]
+    corte_peor  = np.full(n_props, -1, dtype=int)
+    error_peor  = np.full(n_props, np.nan)
+    ratio_peor  = np.full(n_props, -1.0)
+    umbral_peor = np.full(n_props, np.nan)
+    if errores.shape[1] > 0:
+        j_max = ratio.argmax(axis=1)
+        filas = np.arange(n_props)
+        r_max = ratio[filas, j_max]
+        hay = r_max > -1.0
+        corte_peor[hay]  = j_max[hay]
+        error_peor[hay]  = errores[filas, j_max][hay]
+        ratio_peor[hay]  = r_max[hay]
+        umbral_ref = np.where(tiene_r, repro, admis)
+        umbral_peor[hay] = umbral_ref[filas, j_max][hay]
+
+    semaforos = _semaforos_por_conteo(
+        n_verde, n_rojo, n_validos, n_con_valor, tiene_umbral_prop,
+        pct_ok_amarillo, pct_rojo_rojo,
+    )
+
+    return ClasificacionLote(
+        estados=estados,
+        n_verde=n_verde,
+        n_amarillo=n_amarillo,
+        n_rojo=n_rojo,
+        n_validos=n_validos,
+        n_con_valor=n_con_valor,
+        semaforos=semaforos,
+        corte_peor=corte_peor,
+        error_peor=error_peor,
+        ratio_peor=ratio_peor,
+        umbral_peor=umbral_peor,
+    )
+
+
+def _nan_si_none(x: Optional[float]) -> float:
+    return np.nan if x is None else float(x)
+
+
+def _none_si_nan(x: float) -> Optional[float]:
+    return None if np.isnan(x) else float(x)
 
 
 def clasificar_propiedad(
@@ -481,91 +902,49 @@ def clasificar_propiedad(
     """
     Clasifica una propiedad completa (todos sus cortes).
 
+    Envoltorio de `clasificar_matriz` para una sola fila.
+
     Returns:
         (semáforo_global, estados_por_corte, corte_peor, error_peor,
          ratio_peor, umbral_repro_peor)
     """
-    estados: Dict[str, str] = {}
-    total_con_valor = 0
-    total_valid = 0
-    n_verde = n_amarillo = n_rojo = 0
-
-    corte_peor: Optional[str] = None
-    error_peor: Optional[float] = None
-    umbral_peor: Optional[float] = None
-    ratio_peor = -1.0
-
-    base_prop = _prop_base_para_umbral(prop_canon)
-    tiene_umbral_prop = any(k[0] == base_prop for k in umbrales.keys())
-
-    for corte, valor in errores_fila.items():
-        if valor is None or (isinstance(valor, float) and pd.isna(valor)):
-            estados[corte] = "(no numérico)"
-            continue
-        try:
-            v = float(str(valor).replace(",", "."))
-        except Exception:
-            estados[corte] = "(no numérico)"
-            continue
-
-        total_con_valor += 1
+    indice = compilar_umbrales(umbrales)
+    fila_repro, fila_admis = indice.filas(prop_canon)
 
-        # Buscar REPRO y ADMISIBLE para este corte
-        cc = canon_corte(corte)
-        repro, admis = _buscar_umbrales(umbrales, prop_canon, cc)
-        # Segundo intento sin canonizar (robustez ante cortes ya canonizados)
-        if repro is None and admis is None:
-            repro, admis = _buscar_umbrales(umbrales, prop_canon, corte)
+    cortes = list(errores_fila.keys())
+    errores = np.full((1, len(cortes)), np.nan)
+    repro   = np.full((1, len(cortes)), np.nan)
+    admis   = np.full((1, len(cortes)), np.nan)
 
-        if repro is None and admis is None:
-            estados[corte] = "(sin umbral)"
+    for j, corte in enumerate(cortes):
+        v = _float_or_none(errores_fila[corte])
+        if v is None:
             continue
-
-        total_valid += 1
-
-        estado = _clasificar_corte(v, repro, admis)
-        estados[corte] = estado
-
-        if estado == "VERDE":
-            n_verde += 1
-        elif estado == "AMARILLO":
-            n_amarillo += 1
-        else:
-            n_rojo += 1
-
-        # Corte peor: mayor ratio error / umbral_referencia
-        # Usamos repro como denominador preferente; si no existe, admis
-        denom = repro if (repro is not None and repro > 0) else (admis if admis and admis > 0 else None)
-        try:
-            ratio = v / denom if denom else float("inf")
-        except ZeroDivisionError:
-            ratio = float("inf")
-
-        if ratio > ratio_peor:
-            ratio_peor = ratio
-            corte_peor = corte
-            error_peor = v
-            # umbral_peor muestra REPRO preferentemente, sino ADMISIBLE
-            umbral_peor = repro if repro is not None else admis
-
-    # --- Semáforo global de la propiedad ---
-    if total_con_valor == 0:
-        return "", estados, corte_peor, error_peor, ratio_peor, umbral_peor
-
-    if not tiene_umbral_prop or total_valid == 0:
-        return "NA", estados, corte_peor, error_peor, ratio_peor, umbral_peor
-
-    verde_pct = n_verde / total_valid
-    rojo_pct  = n_rojo  / total_valid
-
-    if rojo_pct > pct_rojo_rojo:
-        sem = "ROJO"
-    elif verde_pct >= pct_ok_amarillo:
-        sem = "VERDE"
-    else:
-        sem = "AMARILLO"
-
-    return sem, estados, corte_peor, error_peor, ratio_peor, umbral_peor
+        errores[0, j] = v
+        # Corte canonizado; segundo intento sin canonizar (cortes ya canonizados)
+        for clave in (canon_corte(corte), corte):
+            pos = indice.pos_corte.get(clave)
+            if pos is not None and not (np.isnan(fila_repro[pos]) and np.isnan(fila_admis[pos])):
+                repro[0, j] = fila_repro[pos]
+                admis[0, j] = fila_admis[pos]
+                break
+
+    tiene_umbral_prop = np.array([indice.tiene_umbral(prop_canon)])
+
+    lote = clasificar_matriz(errores, repro, admis, tiene_umbral_prop, pct_ok_amarillo, pct_rojo_rojo)
+
+    estados = {corte: ESTADO_TEXTO[int(e)] for corte, e in zip(cortes, lote.estados[0])}
+    j_peor = int(lote.corte_peor[0])
+    if j_peor < 0:
+        return lote.semaforos[0], estados, None, None, -1.0, None
+    return (
+        lote.semaforos[0],
+        estados,
+        cortes[j_peor],
+        float(lote.error_peor[0]),
+        float(lote.ratio_peor[0]),
+        _none_si_nan(lote.umbral_peor[0]),
+    )
 
 
 # ---------------------------------------------------------------------------
@@ -598,7 +977,7 @@ def _sem_global_por_crudo(
 
 
 # ---------------------------------------------------------------------------
-# 6. Lectura de archivos (en memoria, sin disco)
+# 6. Lectura de archivos (en memoria; los grandes, mmap de un temporal)
 # ---------------------------------------------------------------------------
 
 def _get_extension(filename: str) -> str:
@@ -606,44 +985,378 @@ def _get_extension(filename: str) -> str:
     return match.group(1) if match else ""
 
 
-def _read_csv_mem(data: io.BytesIO, filename: str) -> pd.DataFrame:
-    for sep in [";", ",", "\t", "|"]:
-        data.seek(0)
+# Firmas de contenedor: xlsx es un ZIP (OOXML), xls un compuesto OLE2 (BIFF8).
+# Los exports de LIMS a menudo llevan la extensión cambiada.
+_FIRMAS_ZIP  = (b"PK\x03\x04", b"PK\x05\x06")
+_FIRMA_OLE2  = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+_LEN_FIRMA   = len(_FIRMA_OLE2)
+
+
+def detectar_formato(cabeza: bytes, ext: str) -> str:
+    """
+    Formato real ('.xlsx', '.xls' o '.csv') según los primeros bytes.
+
+    ZIP → openpyxl, OLE2 → xlrd. Sin firma reconocible se respeta la
+    extensión: un .xlsx/.xls que no es un libro falla al leerlo, y un .xls
+    sin OLE2 puede ser un BIFF antiguo que xlrd sí entiende.
+    """
+    if cabeza.startswith(_FIRMAS_ZIP):
+        return ".xlsx"
+    if cabeza.startswith(_FIRMA_OLE2):
+        return ".xls"
+    return ext
+
+
+def _formato_fuente(fuente: FuenteArchivo, filename: str) -> str:
+    ext = _get_extension(filename)
+    formato = detectar_formato(fuente.cabeza(_LEN_FIRMA), ext)
+    if formato != ext:
+        logger.info("'%s' tiene contenido %s; se lee como tal.", filename, formato)
+    return formato
+
+
+_CSV_SEPARADORES  = (";", ",", "\t", "|")
+_CSV_MUESTRA      = 64 * 1024
+_CSV_ENCODINGS    = ("utf-8-sig", "cp1252", "latin-1")
+_RE_DECIMAL_COMA  = re.compile(r"^[+-]?(?:\d{1,3}(?:\.\d{3})+|\d+),\d+$")
+_RE_DECIMAL_PUNTO = re.compile(r"^[+-]?\d*\.\d+(?:[eE][+-]?\d+)?$")
+_RE_MILES_PUNTO   = re.compile(r"^[+-]?\d{1,3}(?:\.\d{3})+$")
+
+
+@dataclass(frozen=True)
+class DialectoCSV:
+    """Formato de un CSV detectado sobre una muestra de cabecera."""
+    sep: str
+    decimal: str
+    thousands: Optional[str]
+    encoding: str
+
+
+def detectar_dialecto_csv(muestra: bytes) -> DialectoCSV:
+    """
+    Detecta separador, separador decimal, de miles y encoding a partir de las
+    primeras líneas de un CSV.
+
+    - Encoding: utf-8 (con o sin BOM); si no decodifica, cp1252 / latin-1.
+    - Separador: el primero de ; , TAB | que da más de una columna en la
+      cabecera sin que ninguna fila de la muestra tenga más campos que ella;
+      si ninguno encaja, csv.Sniffer.
+    - Decimal: coma (miles con punto) salvo que la muestra solo contenga
+      números con punto decimal.
+    """
+    encoding, texto = _CSV_ENCODINGS[-1], ""
+    for enc in _CSV_ENCODINGS:
         try:
-            df = pd.read_csv(data, sep=sep, decimal=",", thousands=".", encoding="utf-8-sig")
-            if df.shape[1] > 1:
-                return df
-        except Exception:
+            texto = muestra.decode(enc)
+            encoding = enc
+            break
+        except UnicodeDecodeError:
             continue
-    data.seek(0)
+
+    sep, filas = None, []
+    for cand in _CSV_SEPARADORES:
+        try:
+            filas = [f for f in csv.reader(io.StringIO(texto), delimiter=cand) if f]
+        except csv.Error:
+            continue
+        if filas and len(filas[0]) > 1 and all(len(f) <= len(filas[0]) for f in filas):
+            sep = cand
+            break
+    if sep is None:
+        try:
+            sep = csv.Sniffer().sniff(texto, delimiters=";,\t| :").delimiter
+        except csv.Error:
+            sep = ","
+        filas = [f for f in csv.reader(io.StringIO(texto), delimiter=sep) if f]
+
+    campos = [c.strip() for f in filas[1:] for c in f]
+    hay_coma  = any(_RE_DECIMAL_COMA.match(c) for c in campos)
+    hay_punto = any(_RE_DECIMAL_PUNTO.match(c) and not _RE_MILES_PUNTO.match(c) for c in campos)
+    if hay_punto and not hay_coma:
+        return DialectoCSV(sep=sep, decimal=".", thousands=None, encoding=encoding)
+    return DialectoCSV(sep=sep, decimal=",", thousands=".", encoding=encoding)
+
+
+def _muestra_csv(fuente: FuenteArchivo) -> bytes:
+    """Primeros bytes del archivo, cortados en el último salto de línea completo."""
+    muestra = fuente.cabeza(_CSV_MUESTRA)
+    if len(muestra) == _CSV_MUESTRA:
+        corte = muestra.rfind(b"\n")
+        if corte > 0:
+            muestra = muestra[:corte + 1]
+    return muestra
+
+
+@dataclass(frozen=True)
+class ProyeccionColumnas:
+    """
+    Columnas que la validación necesita de un archivo ISA/RAMS: 'Propiedad'
+    y las columnas de corte (todas, o solo las de `cortes` canónicos).
+
+    Las demás (Unidad, Validación, cortes que no se comparan…) no se parsean.
+    Los nombres de las columnas conservadas son los mismos que tendrían
+    leyendo el archivo completo (incluidos 'X.1' y 'Unnamed: n').
+    """
+    cortes: Optional[frozenset] = None
+
+    def incluye(self, nombre: Any) -> bool:
+        n = str(nombre)
+        if n == "Propiedad":
+            return True
+        if n.strip().lower() in _COLUMNAS_META:
+            return False
+        cc = canon_corte(n)
+        return bool(cc) and (self.cortes is None or cc in self.cortes)
+
+    def posiciones(self, nombres: Iterable[Any]) -> List[int]:
+        return [i for i, n in enumerate(nombres) if self.incluye(n)]
+
+
+def _read_csv_mem(
+    fuente: FuenteArchivo,
+    filename: str,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> pd.DataFrame:
+    """
+    Lee un CSV en memoria: detecta el dialecto sobre una muestra y hace un
+    único parseo completo con el motor C (solo de las columnas de
+    `proyeccion`, si se indica). El dialecto queda en df.attrs["dialecto_csv"].
+    """
+    dialecto = detectar_dialecto_csv(_muestra_csv(fuente))
+    opciones = dict(
+        sep=dialecto.sep,
+        decimal=dialecto.decimal,
+        thousands=dialecto.thousands,
+        encoding=dialecto.encoding,
+        engine="c",
+    )
     try:
-        return pd.read_csv(data, sep=None, engine="python", decimal=",", encoding="utf-8-sig")
+        nombres = None
+        if proyeccion is not None:
+            nombres = pd.read_csv(fuente.abrir(), nrows=0, **opciones).columns
+            opciones["usecols"] = proyeccion.posiciones(nombres)
+        df = pd.read_csv(fuente.abrir(), **opciones)
     except Exception as e:
         raise ValueError(f"No se pudo parsear CSV '{filename}': {e}") from e
+    if nombres is not None:
+        df.columns = nombres[opciones["usecols"]]
+    df.attrs["dialecto_csv"] = asdict(dialecto)
+    return df
+
+
+# Lectores Excel ligeros para ISA/RAMS. Devuelven exactamente el mismo
+# DataFrame que pd.read_excel (mismo TextParser, mismas conversiones de celda),
+# pero openpyxl itera en modo read_only/values_only sin crear objetos Cell ni
+# estilos, y xlrd carga solo la hoja pedida (on_demand). Con una proyección,
+# las celdas de columnas descartadas ni se convierten ni se guardan.
+
+@lru_cache(maxsize=_TAM_CACHE_PLANTILLAS)
+def _nombres_cabecera_memo(clave: Tuple[Tuple[type, Any], ...]) -> Tuple[Any, ...]:
+    cabecera = [v for _t, v in clave]
+    return tuple(TextParser([cabecera], header=0, skip_blank_lines=False).read().columns)
+
+
+def _nombres_cabecera(cabecera: List[Any]) -> List[Any]:
+    """Nombres de columna que TextParser asigna a una fila de cabecera completa."""
+    # Memoizado: los archivos de un mismo lote suelen compartir cabecera. El
+    # tipo va en la clave porque 1 == 1.0 == True y darían nombres distintos.
+    try:
+        return list(_nombres_cabecera_memo(tuple((type(v), v) for v in cabecera)))
+    except TypeError:                   # celda no hashable
+        return list(TextParser([cabecera], header=0, skip_blank_lines=False).read().columns)
+
+
+_CACHES_CANON["nombres_cabecera"] = _nombres_cabecera_memo
+
+
+def _filas_a_df(filas: List[List[Any]], nombres: Optional[List[Any]] = None) -> pd.DataFrame:
+    if not filas:
+        return pd.DataFrame()
+    df = TextParser(filas, header=0, skip_blank_lines=False).read()
+    if nombres is not None:
+        df.columns = pd.Index(nombres, dtype=df.columns.dtype if len(nombres) else object)
+    return df
+
+
+def _celda_xlsx(v: Any) -> Any:
+    """Misma conversión de celda que el lector openpyxl de pandas."""
+    if v is None:
+        return ""
+    if type(v) is float:
+        return int(v) if math.isfinite(v) and int(v) == v else v
+    if isinstance(v, str) and v in _ERRORES_EXCEL:
+        return np.nan
+    return v
+
+
+def _longitud_util(fila: Tuple[Any, ...]) -> int:
+    """Longitud de la fila sin las celdas vacías del final."""
+    n = len(fila)
+    while n and (fila[n - 1] is None or fila[n - 1] == ""):
+        n -= 1
+    return n
+
+
+def _leer_hoja_xlsx(ws: Any, proyeccion: Optional[ProyeccionColumnas] = None) -> pd.DataFrame:
+    """Una hoja de un libro openpyxl abierto en modo read_only."""
+    ws.reset_dimensions()
+    filas = ws.iter_rows(values_only=True)
+    primera = next(filas, None)
+    if primera is None:
+        return pd.DataFrame()
+
+    cabecera = [_celda_xlsx(v) for v in primera[:_longitud_util(primera)]]
+    h = len(cabecera)
+    # Columnas < h: se decide ya con su nombre definitivo (la deduplicación
+    # de nombres no cambia columnas anteriores). Las >= h solo existen si
+    # alguna fila es más ancha que la cabecera: se guardan y se deciden al final.
+    if proyeccion is None:
+        pos = list(range(h))
+    else:
+        pos = proyeccion.posiciones(_nombres_cabecera(cabecera)) if h else []
+
+    datos: List[List[Any]] = []
+    ancho, ultima_con_datos = h, (0 if h else -1)
+    for fila in filas:
+        n = _longitud_util(fila)
+        if n:
+            ultima_con_datos = len(datos) + 1
+            ancho = max(ancho, n)
+        conv = [_celda_xlsx(fila[i]) if i < n else "" for i in pos]
+        if n > h:
+            conv.extend(_celda_xlsx(v) for v in fila[h:n])
+        datos.append(conv)
+
+    if ultima_con_datos < 0:
+        return pd.DataFrame()
+    datos = datos[:ultima_con_datos]
+
+    cabecera_completa = cabecera + [""] * (ancho - h)
+    nombres = _nombres_cabecera(cabecera_completa)
+    extra = list(range(h, ancho))
+    if proyeccion is not None:
+        extra = [i for i in extra if proyeccion.incluye(nombres[i])]
+    finales = pos + extra
+
+    # Fila i: [celdas de pos] + [celdas h..n) de esa fila; se reordena a `finales`
+    ancho_pos = len(pos)
+    filas_out = [[cabecera_completa[i] for i in finales]]
+    for conv in datos:
+        resto = conv[ancho_pos:]
+        filas_out.append(conv[:ancho_pos] + [resto[i - h] if i - h < len(resto) else "" for i in extra])
+    return _filas_a_df(filas_out, [nombres[i] for i in finales])
+
+
+def _abrir_xlsx(fuente: FuenteArchivo) -> Any:
+    return openpyxl.load_workbook(fuente.abrir(), read_only=True, data_only=True, keep_links=False)
+
+
+def _leer_xlsx_streaming(
+    fuente: FuenteArchivo,
+    hoja: Any = 0,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> pd.DataFrame:
+    wb = _abrir_xlsx(fuente)
+    try:
+        ws = wb.worksheets[hoja] if isinstance(hoja, int) else wb[hoja]
+        return _leer_hoja_xlsx(ws, proyeccion)
+    finally:
+        wb.close()
+
+
+def _abrir_xls(fuente: FuenteArchivo) -> Any:
+    import xlrd
+
+    # xlrd necesita bytes (o una ruta, que mapea él mismo): sin copia si ya lo son
+    if fuente.ruta is not None:
+        return xlrd.open_workbook(fuente.ruta, on_demand=True)
+    return xlrd.open_workbook(file_contents=fuente.como_bytes(), on_demand=True)
+
+
+def _conversor_xls(epoch1904: int) -> Callable[[Any, int], Any]:
+    """Conversión de celda (valor, tipo) de xlrd idéntica a la de pandas."""
+    from xlrd import XL_CELL_BOOLEAN, XL_CELL_DATE, XL_CELL_ERROR, XL_CELL_NUMBER, xldate
+
+    def _celda(v: Any, tipo: int) -> Any:
+        if tipo == XL_CELL_NUMBER:
+            if math.isfinite(v) and int(v) == v:
+                return int(v)
+            return v
+        if tipo == XL_CELL_DATE:
+            try:
+                d = xldate.xldate_as_datetime(v, epoch1904)
+            except OverflowError:
+                return v
+            if d.timetuple()[:3] == ((1904, 1, 1) if epoch1904 else (1899, 12, 31)):
+                return dt_time(d.hour, d.minute, d.second, d.microsecond)
+            return d
+        if tipo == XL_CELL_ERROR:
+            return np.nan
+        if tipo == XL_CELL_BOOLEAN:
+            return bool(v)
+        return v
+
+    return _celda
+
+
+def _leer_hoja_xls(
+    sh: Any,
+    epoch1904: int,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> pd.DataFrame:
+    """Una hoja de un libro xlrd, con la conversión de celdas de pandas."""
+    _celda = _conversor_xls(epoch1904)
+    if sh.nrows == 0:
+        return pd.DataFrame()
+    cabecera = [_celda(v, t) for v, t in zip(sh.row_values(0), sh.row_types(0))]
+    nombres = _nombres_cabecera(cabecera)
+    pos = list(range(len(cabecera))) if proyeccion is None else proyeccion.posiciones(nombres)
+    filas = [[cabecera[j] for j in pos]]
+    for i in range(1, sh.nrows):
+        valores, tipos = sh.row_values(i), sh.row_types(i)
+        filas.append([_celda(valores[j], tipos[j]) for j in pos])
+    return _filas_a_df(filas, [nombres[j] for j in pos])
+
+
+def _leer_xls(
+    fuente: FuenteArchivo,
+    hoja: Any = 0,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> pd.DataFrame:
+    libro = _abrir_xls(fuente)
+    try:
+        sh = libro.sheet_by_index(hoja) if isinstance(hoja, int) else libro.sheet_by_name(hoja)
+        return _leer_hoja_xls(sh, libro.datemode, proyeccion)
+    finally:
+        libro.release_resources()
+
 
+def read_file(
+    file_obj: IO[bytes],
+    filename: str,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> pd.DataFrame:
+    """
+    Lee un archivo (FuenteArchivo, buffer o stream) a DataFrame. Soporta xlsx, xls, csv.
 
-def read_file(file_obj: IO[bytes], filename: str) -> pd.DataFrame:
-    """Lee un archivo en memoria (BytesIO) a DataFrame. Soporta xlsx, xls, csv."""
+    El motor se elige por el contenido (ver detectar_formato), no solo por la
+    extensión. Con `proyeccion` solo se parsean las columnas que la
+    validación necesita.
+    """
     ext = _get_extension(filename)
     if ext not in SUPPORTED_EXTENSIONS:
         raise ValueError(f"Formato no soportado: '{ext}'. Use: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
 
-    data = io.BytesIO(file_obj.read() if hasattr(file_obj, "read") else file_obj)
-
-    if ext == ".csv":
-        return _read_csv_mem(data, filename)
-    elif ext == ".xlsx":
-        try:
-            return pd.read_excel(data, engine="openpyxl")
-        except Exception as e:
-            raise ValueError(f"Error leyendo '{filename}': {e}") from e
-    elif ext == ".xls":
+    with abrir_fuente(file_obj, filename) as fuente:
+        formato = _formato_fuente(fuente, filename)
+        if formato == ".csv":
+            return _read_csv_mem(fuente, filename, proyeccion)
         try:
-            return pd.read_excel(data, engine="xlrd")
+            if formato == ".xlsx":
+                return _leer_xlsx_streaming(fuente, proyeccion=proyeccion)
+            return _leer_xls(fuente, proyeccion=proyeccion)
         except Exception as e:
             raise ValueError(f"Error leyendo '{filename}': {e}") from e
-    else:
-        raise ValueError(f"Extensión inesperada: {ext}")
 
 
 def read_file_with_sheet(
@@ -653,101 +1366,987 @@ def read_file_with_sheet(
 ) -> pd.DataFrame:
     """Lee un archivo Excel con soporte para seleccionar hoja específica."""
     ext = _get_extension(filename)
-    data = io.BytesIO(file_obj.read() if hasattr(file_obj, "read") else file_obj)
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Formato no soportado: '{ext}'")
 
-    if ext == ".csv":
-        return _read_csv_mem(data, filename)
-    elif ext in (".xlsx", ".xls"):
-        engine = "openpyxl" if ext == ".xlsx" else "xlrd"
-        sheet = sheet_hint or 0
+    with abrir_fuente(file_obj, filename) as fuente:
+        formato = _formato_fuente(fuente, filename)
+        if formato == ".csv":
+            return _read_csv_mem(fuente, filename)
+        engine = "openpyxl" if formato == ".xlsx" else "xlrd"
         try:
-            return pd.read_excel(data, sheet_name=sheet, engine=engine)
-        except Exception:
-            data.seek(0)
-            alt_engine = "xlrd" if engine == "openpyxl" else "openpyxl"
-            try:
-                return pd.read_excel(data, sheet_name=sheet, engine=alt_engine)
-            except Exception as e:
-                raise ValueError(f"No se pudo leer '{filename}': {e}") from e
-    else:
-        raise ValueError(f"Formato no soportado: '{ext}'")
+            return pd.read_excel(fuente.abrir(), sheet_name=sheet_hint or 0, engine=engine)
+        except Exception as e:
+            raise ValueError(f"No se pudo leer '{filename}': {e}") from e
 
 
-# ---------------------------------------------------------------------------
-# 7. Detectar cortes en DataFrame
-# ---------------------------------------------------------------------------
+class _LibroAbierto:
+    """Libro .xlsx (openpyxl, read_only) o .xls (xlrd, on_demand) abierto para leer hojas sueltas."""
 
-def detectar_cortes_en_df(df: pd.DataFrame) -> List[Tuple[str, str]]:
-    cortes = []
-    META = {"propiedad", "unidad", "validacion", "validación", "validacion auto", "validación auto"}
-    for c in df.columns:
-        if str(c).strip().lower() in META:
-            continue
-        cc = canon_corte(str(c))
-        if cc:
-            cortes.append((str(c), cc))
-    return cortes
+    def __init__(self, fuente: FuenteArchivo, formato: str) -> None:
+        self._xlsx = formato == ".xlsx"
+        self._libro = _abrir_xlsx(fuente) if self._xlsx else _abrir_xls(fuente)
 
+    def hojas(self) -> List[str]:
+        return list(self._libro.sheetnames if self._xlsx else self._libro.sheet_names())
 
-# ---------------------------------------------------------------------------
-# 8. Helpers de índices
-# ---------------------------------------------------------------------------
+    def leer(self, hoja: str, proyeccion: Optional[ProyeccionColumnas] = None) -> pd.DataFrame:
+        if self._xlsx:
+            return _leer_hoja_xlsx(self._libro[hoja], proyeccion)
+        try:
+            return _leer_hoja_xls(self._libro.sheet_by_name(hoja), self._libro.datemode, proyeccion)
+        finally:
+            self._libro.unload_sheet(hoja)
 
-def _indice_prop(df: pd.DataFrame, alias_prop: Dict[str, str]) -> Dict[str, int]:
-    idx: Dict[str, int] = {}
-    if "Propiedad" not in df.columns:
-        return idx
-    for i, v in enumerate(df["Propiedad"].tolist()):
-        p = canon_prop(v, alias_prop)
-        if p:
-            idx[p] = i
-    return idx
+    def cerrar(self) -> None:
+        if self._xlsx:
+            self._libro.close()
+        else:
+            self._libro.release_resources()
 
 
-def _mapa_cortes(df: pd.DataFrame) -> Dict[str, str]:
-    out: Dict[str, str] = {}
-    META = {"propiedad", "unidad", "validacion", "validación", "validacion auto", "validación auto"}
-    for c in df.columns:
-        cc = canon_corte(str(c))
-        if cc and str(c).strip().lower() not in META:
-            out[cc] = str(c)
-    return out
+def leer_libro(
+    file_obj: IO[bytes],
+    filename: str,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+    min_hojas: int = 1,
+) -> Optional[Dict[str, pd.DataFrame]]:
+    """
+    Lee todas las hojas de un libro Excel abriéndolo una sola vez: {hoja → DataFrame}.
 
+    Las hojas vacías se omiten. Si el libro tiene menos de `min_hojas` hojas
+    devuelve None sin leer ninguna (solo se ha cargado el índice del libro).
+    """
+    ext = _get_extension(filename)
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Formato no soportado: '{ext}'. Use: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
 
-def _float_or_none(x: Any) -> Optional[float]:
-    if x is None:
-        return None
-    try:
-        s = str(x).strip()
-        if s == "":
-            return None
-        return float(s.replace(",", "."))
-    except Exception:
-        return None
+    with abrir_fuente(file_obj, filename) as fuente:
+        formato = _formato_fuente(fuente, filename)
+        if formato == ".csv":
+            raise ValueError(f"'{filename}' no es un libro Excel.")
+        hojas: Dict[str, pd.DataFrame] = {}
+        try:
+            libro = _LibroAbierto(fuente, formato)
+            try:
+                nombres = libro.hojas()
+                if len(nombres) < min_hojas:
+                    return None
+                for nombre in nombres:
+                    hojas[nombre] = libro.leer(nombre, proyeccion)
+            finally:
+                libro.cerrar()
+        except Exception as e:
+            raise ValueError(f"Error leyendo '{filename}': {e}") from e
+    return {nombre: df for nombre, df in hojas.items() if not df.empty}
+
+
+# Cabeceras para la comprobación previa: nombres de columna (los mismos que
+# daría read_file) y valores de la columna Propiedad, sin convertir el resto
+# de celdas ni construir DataFrames.
+
+@dataclass(frozen=True)
+class CabeceraArchivo:
+    columnas: Tuple[Any, ...]
+    propiedades: Optional[Tuple[Any, ...]]      # None = no hay columna 'Propiedad'
+    con_datos: bool = True
+    hoja: Optional[str] = None
+
+
+def _columna_propiedad(nombres: List[Any]) -> Optional[int]:
+    return nombres.index("Propiedad") if "Propiedad" in nombres else None
+
+
+def _valores_propiedad(celdas: List[Any]) -> Tuple[Any, ...]:
+    """Celdas de la columna Propiedad tal como quedan en read_file (mismo TextParser: ''/'NA' → NaN)."""
+    if not celdas:
+        return ()
+    return tuple(TextParser([["Propiedad"], *([v] for v in celdas)], header=0, skip_blank_lines=False)
+                 .read().iloc[:, 0].tolist())
+
+
+def _cabecera_hoja_xlsx(ws: Any) -> CabeceraArchivo:
+    ws.reset_dimensions()
+    filas = ws.iter_rows(values_only=True)
+    primera = next(filas, None)
+    if primera is None:
+        return CabeceraArchivo((), None, con_datos=False, hoja=ws.title)
+    cabecera = [_celda_xlsx(v) for v in primera[:_longitud_util(primera)]]
+    idx = _columna_propiedad(_nombres_cabecera(cabecera))
+
+    # Filas más anchas que la cabecera añaden columnas 'Unnamed: n' (como en read_file)
+    # (las filas vacías del final se descartan, también como en read_file)
+    ancho, filas_con_datos = len(cabecera), 0
+    propiedades: List[Any] = []
+    for i, fila in enumerate(filas, start=1):
+        n = _longitud_util(fila)
+        if n:
+            filas_con_datos = i
+            ancho = max(ancho, n)
+        if idx is not None:
+            propiedades.append(_celda_xlsx(fila[idx]) if idx < n else "")
+    con_datos = filas_con_datos > 0
+    del propiedades[filas_con_datos:]
+    nombres = _nombres_cabecera(cabecera + [""] * (ancho - len(cabecera))) if cabecera or ancho else []
+    return CabeceraArchivo(
+        tuple(nombres),
+        None if idx is None else _valores_propiedad(propiedades),
+        con_datos=con_datos,
+        hoja=ws.title,
+    )
 
 
-def _nombre_base_crudo(fname: str) -> str:
-    """Extrae nombre de crudo del nombre de archivo."""
-    base = re.sub(r"\.[^.]+$", "", fname)
-    m = re.search(r"([A-Za-z]{3}-\d{4}-\d+)", base)
-    if m:
-        return m.group(1).upper()
-    base = re.sub(r"^(?:ISA|RAMS)[_\-]+", "", base, flags=re.IGNORECASE)
-    base = re.sub(r"([_\-])(ISA|RAMS)(?:([_\-]?v?\d{1,3})?)$", "", base, flags=re.IGNORECASE)
-    base = re.sub(r"([_\-])(ISA|RAMS)(?:[_\-].*)?$", "", base, flags=re.IGNORECASE)
-    return base.strip("_- ")
+def _cabecera_hoja_rapida(hoja: HojaXlsx) -> CabeceraArchivo:
+    """Como _cabecera_hoja_xlsx, pero leyendo solo la fila 1 y la columna Propiedad del XML."""
+    primera = hoja.fila(1)
+    h = _longitud_util(primera)
+    ancho = hoja.ancho_declarado()
+    if ancho is None or ancho > h:
+        # Puede haber filas más anchas que la cabecera ('Unnamed: n'): solo openpyxl lo sabe
+        raise FormatoNoSoportado(f"Rango usado de '{hoja.nombre}' más ancho que la cabecera.")
+    cabecera = [_celda_xlsx(v) for v in primera[:h]]
+    nombres = _nombres_cabecera(cabecera) if cabecera else []
+    idx = _columna_propiedad(nombres)
+    ultima = hoja.ultima_fila()
+    propiedades = None
+    if idx is not None:
+        propiedades = _valores_propiedad([_celda_xlsx(v) for v in hoja.columna(idx, 2, ultima)])
+    return CabeceraArchivo(tuple(nombres), propiedades, con_datos=ultima > 1, hoja=hoja.nombre)
+
+
+def _cabecera_hoja_xls(sh: Any, epoch1904: int) -> CabeceraArchivo:
+    if sh.nrows == 0:
+        return CabeceraArchivo((), None, con_datos=False, hoja=sh.name)
+    _celda = _conversor_xls(epoch1904)
+    nombres = _nombres_cabecera([_celda(v, t) for v, t in zip(sh.row_values(0), sh.row_types(0))])
+    idx = _columna_propiedad(nombres)
+    propiedades = None
+    if idx is not None:
+        propiedades = _valores_propiedad(
+            [_celda(v, t) for v, t in zip(sh.col_values(idx, 1), sh.col_types(idx, 1))]
+        )
+    return CabeceraArchivo(tuple(nombres), propiedades, con_datos=sh.nrows > 1, hoja=sh.name)
 
 
-# ---------------------------------------------------------------------------
+def _cabecera_csv(fuente: FuenteArchivo, filename: str) -> CabeceraArchivo:
+    dialecto = detectar_dialecto_csv(_muestra_csv(fuente))
+    opciones = dict(
+        sep=dialecto.sep,
+        decimal=dialecto.decimal,
+        thousands=dialecto.thousands,
+        encoding=dialecto.encoding,
+        engine="c",
+    )
+    try:
+        nombres = list(pd.read_csv(fuente.abrir(), nrows=0, **opciones).columns)
+        idx = _columna_propiedad(nombres)
+        if idx is None:
+            return CabeceraArchivo(tuple(nombres), None)
+        props = pd.read_csv(fuente.abrir(), usecols=[idx], **opciones).iloc[:, 0]
+    except Exception as e:
+        raise ValueError(f"No se pudo parsear CSV '{filename}': {e}") from e
+    return CabeceraArchivo(tuple(nombres), tuple(props.tolist()), con_datos=len(props) > 0)
+
+
+def leer_cabeceras(
+    file_obj: IO[bytes],
+    filename: str,
+    todas_las_hojas: bool = False,
+) -> List[CabeceraArchivo]:
+    """
+    Cabecera y columna Propiedad de la primera hoja o, con `todas_las_hojas`,
+    de cada hoja de un libro Excel (abierto una sola vez). Los CSV tienen una.
+
+    Los .xlsx se leen directamente del XML (core.cabecera_xlsx), sin parsear
+    el resto de celdas; si el archivo no tiene la forma habitual, o alguna
+    fila puede ser más ancha que la cabecera, se recurre a openpyxl.
+    """
+    ext = _get_extension(filename)
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise ValueError(f"Formato no soportado: '{ext}'. Use: {', '.join(sorted(SUPPORTED_EXTENSIONS))}")
+
+    with abrir_fuente(file_obj, filename) as fuente:
+        formato = _formato_fuente(fuente, filename)
+        if formato == ".csv":
+            return [_cabecera_csv(fuente, filename)]
+        if formato == ".xlsx":
+            try:
+                with LibroXlsx(fuente.abrir()) as libro:
+                    n = len(libro.hojas) if todas_las_hojas else min(1, len(libro.hojas))
+                    return [_cabecera_hoja_rapida(libro.hoja(i)) for i in range(n)]
+            except Exception as e:
+                logger.debug("'%s': cabecera vía openpyxl (%s)", filename, e)
+        try:
+            if formato == ".xlsx":
+                wb = _abrir_xlsx(fuente)
+                try:
+                    hojas = wb.worksheets if todas_las_hojas else wb.worksheets[:1]
+                    return [_cabecera_hoja_xlsx(ws) for ws in hojas]
+                finally:
+                    wb.close()
+            libro = _abrir_xls(fuente)
+            try:
+                hojas = libro.sheet_names() if todas_las_hojas else libro.sheet_names()[:1]
+                out = []
+                for nombre in hojas:
+                    out.append(_cabecera_hoja_xls(libro.sheet_by_name(nombre), libro.datemode))
+                    libro.unload_sheet(nombre)
+                return out
+            finally:
+                libro.release_resources()
+        except Exception as e:
+            raise ValueError(f"Error leyendo '{filename}': {e}") from e
+
+
+# Lectura en paralelo (pool de procesos). read_excel es CPU-bound y retiene el
+# GIL, así que los hilos no ayudan. Los DataFrames vuelven del worker como
+# Arrow IPC si pyarrow está instalado y las columnas lo permiten sin pérdida
+# (también el texto object de pandas 2.x, ver frames_cache.apto_arrow); si no,
+# por pickle.
+
+def _serializar_df(df: pd.DataFrame) -> Tuple[str, Any]:
+    pa = cargar_pyarrow()
+    if pa is not None and apto_arrow(df):
+        try:
+            tabla = tabla_arrow(df)
+            sink = pa.BufferOutputStream()
+            with pa.ipc.new_stream(sink, tabla.schema) as writer:
+                writer.write_table(tabla)
+            return "arrow", sink.getvalue().to_pybytes()
+        except Exception:
+            pass
+    return "pickle", df
+
+
+def _deserializar_df(formato: str, payload: Any, attrs: Dict[str, Any]) -> pd.DataFrame:
+    if formato == "arrow":
+        df = df_desde_arrow(cargar_pyarrow().ipc.open_stream(payload).read_all())
+    else:
+        df = payload
+    df.attrs.update(attrs)
+    return df
+
+
+def _proyeccion_rams(df_isa: pd.DataFrame) -> ProyeccionColumnas:
+    """Del RAMS solo se comparan los cortes presentes en el ISA del mismo par."""
+    return ProyeccionColumnas(cortes=frozenset(cc for _n, cc in detectar_cortes_en_df(df_isa)))
+
+
+# Caché de DataFrames parseados (opcional): clave = hash del contenido +
+# extensión + proyección, así que renombrar un archivo no invalida su entrada.
+
+_VERSION_FRAMES = "frames-v1"
+
+
+def clave_cache_frame(
+    fuente: FuenteArchivo,
+    filename: str,
+    proyeccion: Optional[ProyeccionColumnas],
+    hoja: Optional[str] = None,
+) -> str:
+    """
+    Clave de caché de un archivo leído: BLAKE2 del contenido + opciones de
+    lectura (+ la hoja, si es una hoja de un libro multihoja).
+    """
+    cortes = None if proyeccion is None or proyeccion.cortes is None else sorted(proyeccion.cortes)
+    partes = [_VERSION_FRAMES, _get_extension(filename), repr(proyeccion is not None), repr(cortes)]
+    if hoja is not None:
+        partes.append(repr(hoja))
+    h = hashlib.blake2b(digest_size=32)
+    for parte in partes:
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    h.update(fuente.huella())
+    return h.hexdigest()
+
+
+def _clave_frame(fuente: Any, nombre: str, proyeccion: ProyeccionColumnas) -> str:
+    """clave_cache_frame de un archivo abierto o de una hoja de un libro multihoja."""
+    if isinstance(fuente, HojaLibro):
+        return clave_cache_frame(fuente.libro.abrir(), fuente.libro.nombre, proyeccion, fuente.hoja)
+    return clave_cache_frame(fuente, nombre, proyeccion)
+
+
+def _leer_seguro(
+    fuente: FuenteArchivo,
+    nombre: str,
+    proyeccion: Optional[ProyeccionColumnas] = None,
+) -> Any:
+    """read_file (o HojaLibro.leer) en el proceso actual; devuelve la excepción en lugar de lanzarla."""
+    try:
+        if isinstance(fuente, HojaLibro):
+            return fuente.leer(proyeccion)
+        return read_file(fuente, nombre, proyeccion)
+    except Exception as e:
+        return e
+
+
+def _leer_cacheado(
+    fuente: FuenteArchivo,
+    nombre: str,
+    proyeccion: ProyeccionColumnas,
+    cache: Optional[CacheDataFrames],
+) -> Any:
+    """_leer_seguro pasando antes por la caché de DataFrames (los errores no se guardan)."""
+    if cache is None:
+        return _leer_seguro(fuente, nombre, proyeccion)
+    clave = _clave_frame(fuente, nombre, proyeccion)
+    df = cache.obtener(clave)
+    if df is None:
+        df = _leer_seguro(fuente, nombre, proyeccion)
+        if isinstance(df, pd.DataFrame):
+            cache.guardar(clave, df)
+    return df
+
+
+def _leer_par(
+    isa_fuente: FuenteArchivo, isa_fname: str,
+    rams_fuente: FuenteArchivo, rams_fname: str,
+    cache: Optional[CacheDataFrames] = None,
+) -> Tuple[Any, Any]:
+    """
+    Lee el ISA (todos sus cortes se muestran) y después el RAMS proyectado a
+    los cortes de ese ISA. Si el ISA falla, el RAMS no se lee (None).
+    """
+    df_isa = _leer_cacheado(isa_fuente, isa_fname, ProyeccionColumnas(), cache)
+    if isinstance(df_isa, Exception):
+        return df_isa, None
+    return df_isa, _leer_cacheado(rams_fuente, rams_fname, _proyeccion_rams(df_isa), cache)
+
+
+def _par_en_cache(
+    isa_fuente: FuenteArchivo, isa_fname: str,
+    rams_fuente: FuenteArchivo, rams_fname: str,
+    cache: CacheDataFrames,
+) -> Optional[Tuple[pd.DataFrame, pd.DataFrame]]:
+    """(df_isa, df_rams) si ambos están en caché; si no, None."""
+    df_isa = cache.obtener(_clave_frame(isa_fuente, isa_fname, ProyeccionColumnas()))
+    if df_isa is None:
+        return None
+    df_rams = cache.obtener(_clave_frame(rams_fuente, rams_fname, _proyeccion_rams(df_isa)))
+    return None if df_rams is None else (df_isa, df_rams)
+
+
+def _guardar_par(
+    isa_fuente: FuenteArchivo, isa_fname: str, df_isa: Any,
+    rams_fuente: FuenteArchivo, rams_fname: str, df_rams: Any,
+    cache: CacheDataFrames,
+) -> None:
+    if not isinstance(df_isa, pd.DataFrame):
+        return
+    cache.guardar(_clave_frame(isa_fuente, isa_fname, ProyeccionColumnas()), df_isa)
+    if isinstance(df_rams, pd.DataFrame):
+        cache.guardar(_clave_frame(rams_fuente, rams_fname, _proyeccion_rams(df_isa)), df_rams)
+
+
+def _leer_par_worker(
+    isa_fname: str, isa_fuente: FuenteArchivo,
+    rams_fname: str, rams_fuente: FuenteArchivo,
+) -> Tuple[Any, Any]:
+    """
+    Ejecutado en el proceso hijo: _leer_par + serialización de los resultados.
+    Las fuentes volcadas a disco llegan como ruta y se mapean aquí.
+    """
+    def _empaquetar(df: Any) -> Any:
+        if not isinstance(df, pd.DataFrame):
+            return df
+        formato, payload = _serializar_df(df)
+        return formato, payload, dict(df.attrs)
+
+    try:
+        df_isa, df_rams = _leer_par(isa_fuente, isa_fname, rams_fuente, rams_fname)
+    finally:
+        isa_fuente.cerrar()
+        rams_fuente.cerrar()
+    return _empaquetar(df_isa), _empaquetar(df_rams)
+
+
+def _abrir_origen(origen: Any, nombre: str) -> Tuple[Any, bool]:
+    """
+    FuenteArchivo sobre el archivo entero (como el antiguo seek(0) + read()) y
+    si es propia (hay que cerrarla al terminar). Los miembros de ZIP se
+    descomprimen aquí. Una HojaLibro abre su libro y se devuelve tal cual:
+    al cerrarla se descuenta la hoja (ver LibroDiferido).
+    """
+    if isinstance(origen, FuenteArchivo):
+        return origen, False
+    if isinstance(origen, HojaLibro):
+        origen.libro.abrir()
+        return origen, True
+    if isinstance(origen, MiembroZip):
+        return origen.extraer(), True
+    if hasattr(origen, "seek"):
+        origen.seek(0)
+    return FuenteArchivo.desde(origen, nombre), True
+
+
+def _abrir_par(
+    isa_origen: Any, isa_fname: str,
+    rams_origen: Any, rams_fname: str,
+) -> Any:
+    """(isa, rams, propias) listos para leer, o la excepción al abrirlos."""
+    propias: List[Any] = []
+    try:
+        fuentes = []
+        for origen, nombre in ((isa_origen, isa_fname), (rams_origen, rams_fname)):
+            fuente, propia = _abrir_origen(origen, nombre)
+            if propia:
+                propias.append(fuente)
+            fuentes.append(fuente)
+        return fuentes[0], fuentes[1], propias
+    except Exception as e:
+        for fuente in propias:
+            fuente.cerrar()
+        return e
+
+
+def _cerrar_par(abierto: Any) -> None:
+    if not isinstance(abierto, Exception):
+        for fuente in abierto[2]:
+            fuente.cerrar()
+
+
+# Los pares se abren (y los miembros de ZIP se descomprimen) en hilos, hasta
+# _PREFETCH_PARES por delante del par que se está parseando: zlib libera el
+# GIL, así que la descompresión se solapa con el parseo. Cada par se cierra en
+# cuanto se ha leído, de modo que nunca hay más de unos pocos en memoria.
+
+_PREFETCH_PARES = 2
+
+
+def _pares_abiertos(
+    pares: List[Tuple[str, Tuple[str, str]]],
+    isa_files: Mapping[str, Any],
+    rams_files: Mapping[str, Any],
+    ventana: int,
+) -> Iterator[Tuple[str, str, str, Any]]:
+    """(crudo, isa_fname, rams_fname, _abrir_par(...)) en orden, abriendo por adelantado."""
+    pendientes: deque = deque()
+    siguientes = iter(pares)
+    with ThreadPoolExecutor(max_workers=max(1, ventana), thread_name_prefix="prefetch") as hilos:
+        def _lanzar() -> None:
+            for crude_name, (i, r) in siguientes:
+                pendientes.append((crude_name, i, r, hilos.submit(_abrir_par, isa_files[i], i, rams_files[r], r)))
+                return
+
+        try:
+            for _ in range(max(1, ventana)):
+                _lanzar()
+            while pendientes:
+                crude_name, i, r, futuro = pendientes.popleft()
+                _lanzar()
+                yield crude_name, i, r, futuro.result()
+        finally:
+            # Generador cerrado antes de tiempo: liberar lo ya abierto
+            for *_x, futuro in pendientes:
+                _cerrar_par(futuro.result())
+
+
+def _leer_pares(
+    pares: List[Tuple[str, Tuple[str, str]]],
+    isa_files: Mapping[str, Any],
+    rams_files: Mapping[str, Any],
+    workers: int,
+    cache: Optional[CacheDataFrames] = None,
+) -> Iterator[Tuple[str, str, str, Any, Any]]:
+    """
+    Lee ISA y RAMS de cada par, en el orden de `pares`.
+
+    Produce (crudo, isa_fname, rams_fname, df_isa, df_rams), donde cada df
+    puede ser la excepción que produjo su lectura (igual que en serie).
+    Los archivos (buffers, FuenteArchivo o MiembroZip) se abren sin copiar
+    sus bytes, por adelantado, y se liberan en cuanto se ha leído su par.
+    Con workers > 1 se parsean hasta 2 × workers pares a la vez en un pool de
+    procesos y se van entregando por orden a medida que terminan; los pares
+    que ya están en `cache` no se envían al pool.
+    """
+    if workers <= 1 or not pares:
+        for crude_name, i, r, abierto in _pares_abiertos(pares, isa_files, rams_files, _PREFETCH_PARES):
+            if isinstance(abierto, Exception):
+                yield crude_name, i, r, abierto, None
+                continue
+            try:
+                df_isa, df_rams = _leer_par(abierto[0], i, abierto[1], r, cache)
+            finally:
+                _cerrar_par(abierto)
+            yield crude_name, i, r, df_isa, df_rams
+        return
+
+    def _desempaquetar(res: Any) -> Any:
+        return _deserializar_df(*res) if isinstance(res, tuple) else res
+
+    def _recoger(futuro: Future, abierto: Any, i: str, r: str) -> Tuple[Any, Any]:
+        isa_f, rams_f, _propias = abierto
+        try:
+            df_isa, df_rams = futuro.result()
+            df_isa, df_rams = _desempaquetar(df_isa), _desempaquetar(df_rams)
+        except BrokenProcessPool:
+            logger.warning("Pool de lectura caído; se lee '%s' en el proceso principal", i)
+            return _leer_par(isa_f, i, rams_f, r, cache)
+        except Exception as e:
+            return e, None
+        if cache is not None:
+            _guardar_par(isa_f, i, df_isa, rams_f, r, df_rams, cache)
+        return df_isa, df_rams
+
+    en_curso = 2 * workers
+    abiertos = _pares_abiertos(pares, isa_files, rams_files, en_curso)
+    with ProcessPoolExecutor(max_workers=min(workers, len(pares))) as pool:
+        en_vuelo: deque = deque()
+
+        def _lanzar() -> None:
+            for crude_name, i, r, abierto in abiertos:
+                previo = futuro = None
+                if not isinstance(abierto, Exception):
+                    if cache is not None:
+                        previo = _par_en_cache(abierto[0], i, abierto[1], r, cache)
+                    if previo is None:
+                        futuro = pool.submit(_leer_par_worker, i, abierto[0], r, abierto[1])
+                en_vuelo.append((crude_name, i, r, abierto, previo, futuro))
+                return
+
+        try:
+            for _ in range(en_curso):
+                _lanzar()
+            while en_vuelo:
+                crude_name, i, r, abierto, previo, futuro = en_vuelo.popleft()
+                if isinstance(abierto, Exception):
+                    dfs = (abierto, None)
+                elif previo is not None:
+                    dfs = previo
+                else:
+                    dfs = _recoger(futuro, abierto, i, r)
+                _cerrar_par(abierto)
+                _lanzar()
+                yield (crude_name, i, r, *dfs)
+        finally:
+            for *_x, abierto, _previo, futuro in en_vuelo:
+                if futuro is not None:
+                    futuro.cancel()
+                    if not futuro.cancelled():
+                        futuro.exception()
+                _cerrar_par(abierto)
+            abiertos.close()
+
+
+def expandir_zips(archivos: Mapping[str, Any], pila: ExitStack) -> Dict[str, Any]:
+    """
+    Sustituye cada .zip de `archivos` por sus archivos ISA/RAMS soportados
+    ({nombre sin carpetas → MiembroZip}), sin descomprimirlos todavía.
+    El resto de entradas pasan tal cual. Los ZIP se cierran con `pila`.
+    """
+    out: Dict[str, Any] = {}
+    for nombre, origen in archivos.items():
+        if _get_extension(nombre) != ".zip":
+            out[nombre] = origen
+            continue
+        fuente, propia = _abrir_origen(origen, nombre)
+        if propia:
+            pila.callback(fuente.cerrar)
+        try:
+            zf = pila.enter_context(zipfile.ZipFile(fuente.abrir()))
+        except (zipfile.BadZipFile, OSError) as e:
+            raise ValueError(f"ZIP no válido '{nombre}': {e}") from e
+        miembros = miembros_zip(zf, SUPPORTED_EXTENSIONS)
+        logger.info("ZIP '%s': %d archivo(s)", nombre, len(miembros))
+        for miembro in miembros:
+            if miembro.nombre in archivos or miembro.nombre in out:
+                raise ValueError(f"Archivo repetido '{miembro.nombre}' (en '{nombre}').")
+            out[miembro.nombre] = miembro
+    return out
+
+
+_EXTENSIONES_LIBRO = (".xlsx", ".xls")
+
+
+def nombre_hoja(filename: str, hoja: str) -> str:
+    """Nombre de una hoja de un libro en el estilo de Excel: '[Libro.xlsx]Hoja'."""
+    return f"[{filename}]{hoja}"
+
+
+class LibroDiferido:
+    """
+    Libro multihoja cuyas hojas son crudos distintos (ver expandir_libros).
+
+    No se abre hasta que se consume el par de una de sus hojas; desde ahí el
+    libro queda abierto y cada hoja se parsea al leer su par (con la
+    proyección de ese par). Tras la última hoja se libera. Al pool de
+    procesos viaja solo la fuente: el hijo abre el libro para su hoja.
+    """
+
+    def __init__(self, origen: Any, nombre: str, hojas: int) -> None:
+        self.origen = origen
+        self.nombre = nombre
+        self.hojas = hojas
+        self._pendientes = hojas
+        self._fuente: Optional[FuenteArchivo] = None
+        self._propia = False
+        self._libro: Optional[_LibroAbierto] = None
+        self._huella: Optional[bytes] = None
+        self._lock = threading.RLock()
+
+    def __reduce__(self):
+        return (LibroDiferido._en_proceso, (self.abrir(), self.nombre))
+
+    @classmethod
+    def _en_proceso(cls, fuente: FuenteArchivo, nombre: str) -> "LibroDiferido":
+        libro = cls(fuente, nombre, 1)
+        libro._fuente, libro._propia = fuente, True
+        return libro
+
+    def abrir(self) -> FuenteArchivo:
+        """FuenteArchivo del libro (un miembro de ZIP se descomprime aquí, una vez)."""
+        with self._lock:
+            if self._fuente is None:
+                self._fuente, self._propia = _abrir_origen(self.origen, self.nombre)
+            return self._fuente
+
+    def leer(self, hoja: str, proyeccion: Optional[ProyeccionColumnas] = None) -> pd.DataFrame:
+        with self._lock:
+            try:
+                if self._libro is None:
+                    fuente = self.abrir()
+                    self._libro = _LibroAbierto(fuente, _formato_fuente(fuente, self.nombre))
+                return self._libro.leer(hoja, proyeccion)
+            except Exception as e:
+                raise ValueError(f"Error leyendo '{nombre_hoja(self.nombre, hoja)}': {e}") from e
+
+    def huella(self) -> bytes:
+        """BLAKE2b del libro; si aún no está abierto, se abre solo para calcularla."""
+        with self._lock:
+            if self._huella is None and self._fuente is not None:
+                self._huella = self._fuente.huella()
+            elif self._huella is None:
+                fuente, propia = _abrir_origen(self.origen, self.nombre)
+                try:
+                    self._huella = fuente.huella()
+                finally:
+                    if propia:
+                        fuente.cerrar()
+            return self._huella
+
+    def soltar(self) -> None:
+        """Una hoja menos por leer; tras la última se cierra el libro."""
+        with self._lock:
+            self._pendientes -= 1
+            if self._pendientes <= 0:
+                self.cerrar()
+
+    def cerrar(self) -> None:
+        """Libera el libro abierto y su fuente. Idempotente."""
+        with self._lock:
+            if self._libro is not None:
+                self._libro.cerrar()
+                self._libro = None
+            if self._fuente is not None and self._propia:
+                self._fuente.cerrar()
+            self._fuente = None
+
+
+@dataclass(frozen=True)
+class HojaLibro:
+    """Entrada de expandir_libros: una hoja de un LibroDiferido, sin leer todavía."""
+    libro: LibroDiferido
+    hoja: str
+
+    def leer(self, proyeccion: Optional[ProyeccionColumnas] = None) -> pd.DataFrame:
+        return self.libro.leer(self.hoja, proyeccion)
+
+    def cerrar(self) -> None:
+        self.libro.soltar()
+
+
+def expandir_libros(archivos: Mapping[str, Any], pila: ExitStack) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    """
+    Sustituye cada libro Excel con dos o más hojas con datos por una entrada
+    por hoja ({nombre_hoja(...) → HojaLibro}); cada hoja es un crudo.
+
+    Aquí solo se lee el índice de cada libro (sus hojas y cuáles tienen
+    datos, con leer_cabeceras); las hojas se parsean al leer su par, con el
+    libro abierto una sola vez (ver LibroDiferido). Los libros que aún
+    tengan hojas sin leer se cierran con `pila`.
+    Los libros de una sola hoja, los CSV y los que no se pueden leer pasan
+    tal cual (el error, si lo hay, aparece al leer su par).
+    Devuelve (archivos, {entrada → nombre de la hoja}) para pair_files.
+    """
+    out: Dict[str, Any] = {}
+    hojas_por_entrada: Dict[str, str] = {}
+    for nombre, origen in archivos.items():
+        if _get_extension(nombre) not in _EXTENSIONES_LIBRO:
+            out[nombre] = origen
+            continue
+        fuente, propia = _abrir_origen(origen, nombre)
+        try:
+            cabeceras = leer_cabeceras(fuente, nombre, todas_las_hojas=True)
+        except ValueError as e:
+            logger.warning("No se pudieron leer las hojas de '%s': %s", nombre, e)
+            cabeceras = []
+        finally:
+            if propia:
+                fuente.cerrar()
+        con_datos = [c.hoja for c in cabeceras if c.con_datos]
+        if len(con_datos) < 2:
+            out[nombre] = origen
+            continue
+        logger.info("Libro '%s': %d hojas con datos", nombre, len(con_datos))
+        libro = LibroDiferido(origen, nombre, len(con_datos))
+        pila.callback(libro.cerrar)
+        for hoja in con_datos:
+            clave = nombre_hoja(nombre, hoja)
+            out[clave] = HojaLibro(libro, hoja)
+            hojas_por_entrada[clave] = hoja
+    return out, hojas_por_entrada
+
+
+# ---------------------------------------------------------------------------
+# 7. Detectar cortes en DataFrame
+# ---------------------------------------------------------------------------
+
+_COLUMNAS_META = {"propiedad", "unidad", "validacion", "validación", "validacion auto", "validación auto"}
+
+
+def detectar_cortes_en_df(df: pd.DataFrame) -> List[Tuple[str, str]]:
+    return _detectar_cortes(df.columns)
+
+
+def _detectar_cortes(columnas: Iterable[Any]) -> List[Tuple[str, str]]:
+    """(nombre de columna, corte canónico) de las columnas de corte."""
+    return list(_cortes_cabecera(tuple(str(c) for c in columnas)))
+
+
+@lru_cache(maxsize=_TAM_CACHE_PLANTILLAS)
+def _cortes_cabecera(nombres: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(
+        (n, cc)
+        for n, cc in zip(nombres, canon_corte_index(nombres))
+        if cc and n.strip().lower() not in _COLUMNAS_META
+    )
+
+
+# ---------------------------------------------------------------------------
+# 8. Helpers de índices
+# ---------------------------------------------------------------------------
+
+@dataclass(frozen=True)
+class PlantillaArchivo:
+    """
+    Mapeos de cortes y propiedades de un archivo ISA/RAMS, que dependen solo
+    de su cabecera y de su columna Propiedad (ver plantilla_archivo).
+
+        cortes:       (columna, corte canónico) como detectar_cortes_en_df
+        mapa_cortes:  corte canónico → columna (la última si se repite)
+        propiedades:  propiedad canónica de cada fila ("" = fila sin propiedad)
+        indice_prop:  propiedad canónica → fila (la última si se repite)
+    """
+    cortes: Tuple[Tuple[str, str], ...]
+    mapa_cortes: Mapping[str, str]
+    propiedades: Tuple[str, ...]
+    indice_prop: Mapping[str, int]
+
+
+class _PorIdentidad:
+    """Clave de caché que compara por identidad (la tabla de alias no es hashable)."""
+
+    __slots__ = ("obj",)
+
+    def __init__(self, obj: Any) -> None:
+        self.obj = obj
+
+    def __hash__(self) -> int:
+        return id(self.obj)
+
+    def __eq__(self, otro: object) -> bool:
+        return isinstance(otro, _PorIdentidad) and otro.obj is self.obj
+
+
+@lru_cache(maxsize=_TAM_CACHE_PLANTILLAS)
+def _plantilla_memo(
+    nombres: Tuple[str, ...],
+    propiedades: Tuple[Optional[str], ...],
+    alias: _PorIdentidad,
+) -> PlantillaArchivo:
+    cortes = _cortes_cabecera(nombres)
+    canon = tuple(canon_prop_series(pd.Series(propiedades, dtype=object), alias.obj).tolist())
+    return PlantillaArchivo(
+        cortes=cortes,
+        mapa_cortes=MappingProxyType({cc: n for n, cc in cortes}),
+        propiedades=canon,
+        indice_prop=MappingProxyType({p: i for i, p in enumerate(canon) if p}),
+    )
+
+
+def plantilla_archivo(df: pd.DataFrame, alias_prop: Optional[Mapping[str, str]]) -> PlantillaArchivo:
+    """
+    Mapeos de cortes y propiedades de `df`, compartidos entre archivos de la misma plantilla.
+
+    La huella es la cabecera más la columna Propiedad como texto (lo único
+    que miran canon_corte y canon_prop), así que cientos de archivos de una
+    misma plantilla ISA o RAMS calculan los mapeos una sola vez. La tabla de
+    alias se compara por identidad: alias_propiedades() devuelve siempre el
+    mismo objeto inmutable.
+    """
+    propiedades: Tuple[Optional[str], ...] = ()
+    if "Propiedad" in df.columns:
+        propiedades = tuple(None if v is None else str(v) for v in df["Propiedad"].tolist())
+    return _plantilla_memo(tuple(str(c) for c in df.columns), propiedades, _PorIdentidad(alias_prop))
+
+
+_CACHES_CANON.update({"cortes_cabecera": _cortes_cabecera, "plantilla": _plantilla_memo})
+
+
+def _indice_prop(df: pd.DataFrame, alias_prop: Dict[str, str]) -> Dict[str, int]:
+    if "Propiedad" not in df.columns:
+        return {}
+    return dict(plantilla_archivo(df, alias_prop).indice_prop)
+
+
+def _mapa_cortes(df: pd.DataFrame) -> Dict[str, str]:
+    return {cc: n for n, cc in _detectar_cortes(df.columns)}
+
+
+def _float_or_none(x: Any) -> Optional[float]:
+    if x is None:
+        return None
+    try:
+        s = str(x).strip()
+        if s == "":
+            return None
+        return float(s.replace(",", "."))
+    except Exception:
+        return None
+
+
+# Textos que float() acepta como NaN: no cuentan como "no numérico" sino como NaN.
+_NAN_TEXTOS = {"nan", "+nan", "-nan"}
+
+
+def _posicion_columna(df: pd.DataFrame, label: Any) -> int:
+    """Posición de la columna `label` en df, o -1 si no existe o está duplicada."""
+    if label is None or label not in df.columns:
+        return -1
+    pos = df.columns.get_loc(label)
+    return pos if isinstance(pos, int) else -1
+
+
+def _columna_float(col: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Versión vectorizada de `_float_or_none` para una columna completa.
+
+    Devuelve (valores, nulo): `valores` es float64 (NaN donde no hay número) y
+    `nulo` marca las celdas en las que `_float_or_none` devolvería None
+    (None, texto vacío o no convertible). Un NaN de origen conserva NaN.
+    """
+    n = len(col)
+    if pd.api.types.is_numeric_dtype(col.dtype) and not pd.api.types.is_bool_dtype(col.dtype):
+        return col.to_numpy(dtype=float, na_value=np.nan), np.zeros(n, dtype=bool)
+
+    texto = col.astype(object).map(str).str.strip().str.replace(",", ".", regex=False)
+    # to_numeric solo decide qué celdas son convertibles; el valor se obtiene con
+    # la conversión de NumPy, que redondea igual que float() (to_numeric no).
+    convertible = (
+        pd.to_numeric(texto, errors="coerce").notna().to_numpy()
+        | texto.str.lower().isin(_NAN_TEXTOS).to_numpy()
+    )
+    objetos = col.to_numpy(dtype=object)
+    vacia = col.isna().to_numpy() & ~convertible
+    for i in np.flatnonzero(vacia):
+        vacia[i] = objetos[i] is not None
+    valores = np.full(n, np.nan)
+    if convertible.any():
+        valores[convertible] = texto.to_numpy(dtype=object)[convertible].astype(str).astype(float)
+    return valores, ~(convertible | vacia)
+
+
+def _matriz_float(
+    df: pd.DataFrame,
+    posiciones: List[int],
+    filas: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extrae df[filas, posiciones] como matriz float64 más su máscara de nulos.
+
+    Las posiciones -1 (columna ausente) se rellenan como nulas.
+    """
+    valores = np.full((len(filas), len(posiciones)), np.nan)
+    nulo    = np.ones((len(filas), len(posiciones)), dtype=bool)
+    if len(filas) == 0:
+        return valores, nulo
+    for j, pos in enumerate(posiciones):
+        if pos < 0:
+            continue
+        v, m = _columna_float(df.iloc[filas, pos])
+        valores[:, j] = v
+        nulo[:, j]    = m
+    return valores, nulo
+
+
+def _columna_errores(valores: np.ndarray, nulo: np.ndarray) -> Any:
+    """Columna de errores para df_out: float64 si no hay nulos, si no objetos con None."""
+    if not nulo.any():
+        return valores
+    col = valores.astype(object)
+    col[nulo] = None
+    return col
+
+
+def _df_desde_columnas(columnas: List[Tuple[str, Any]]) -> pd.DataFrame:
+    """
+    Construye un DataFrame de una sola vez a partir de (nombre, valores) por columna.
+
+    Las columnas con algún None (o sin filas) quedan como object, conservando
+    None en lugar de convertirlo a NaN; el resto se infiere por columna.
+    Admite nombres de columna repetidos.
+    """
+    series: List[pd.Series] = []
+    for _nombre, valores in columnas:
+        if len(valores) == 0 or (isinstance(valores, np.ndarray) and valores.dtype == object):
+            series.append(pd.Series(valores, dtype=object))
+        elif isinstance(valores, np.ndarray):
+            series.append(pd.Series(valores))
+        elif any(v is None for v in valores):
+            series.append(pd.Series(valores, dtype=object))
+        else:
+            series.append(pd.Series(valores, dtype=object).infer_objects())
+    if not series:
+        return pd.DataFrame()
+    df = pd.concat(series, axis=1, ignore_index=True)
+    df.columns = [nombre for nombre, _ in columnas]
+    return df
+
+
+def _nombre_base_crudo(fname: str, con_extension: bool = True) -> str:
+    """Extrae nombre de crudo del nombre de archivo (o de hoja, con con_extension=False)."""
+    base = re.sub(r"\.[^.]+$", "", fname) if con_extension else fname
+    m = re.search(r"([A-Za-z]{3}-\d{4}-\d+)", base)
+    if m:
+        return m.group(1).upper()
+    base = re.sub(r"^(?:ISA|RAMS)[_\-]+", "", base, flags=re.IGNORECASE)
+    base = re.sub(r"([_\-])(ISA|RAMS)(?:([_\-]?v?\d{1,3})?)$", "", base, flags=re.IGNORECASE)
+    base = re.sub(r"([_\-])(ISA|RAMS)(?:[_\-].*)?$", "", base, flags=re.IGNORECASE)
+    return base.strip("_- ")
+
+
+# ---------------------------------------------------------------------------
 # 9. Emparejamiento de archivos
 # ---------------------------------------------------------------------------
 
 def pair_files(
     isa_names: List[str],
     rams_names: List[str],
+    hojas: Optional[Mapping[str, str]] = None,
 ) -> Tuple[Dict[str, Tuple[str, str]], List[str], List[str]]:
-    isa_map:  Dict[str, str] = {_nombre_base_crudo(n): n for n in isa_names}
-    rams_map: Dict[str, str] = {_nombre_base_crudo(n): n for n in rams_names}
+    """
+    Empareja ISA y RAMS por nombre de crudo. Las entradas de `hojas`
+    ({entrada → nombre de hoja}, ver expandir_libros) se emparejan por el
+    nombre de su hoja en lugar del nombre del archivo.
+    """
+    hojas = hojas or {}
+
+    def _base(n: str) -> str:
+        return _nombre_base_crudo(hojas[n], con_extension=False) if n in hojas else _nombre_base_crudo(n)
+
+    isa_map:  Dict[str, str] = {_base(n): n for n in isa_names}
+    rams_map: Dict[str, str] = {_base(n): n for n in rams_names}
 
     paired = {base: (isa_map[base], rams_map[base]) for base in isa_map if base in rams_map}
     unpaired_isa  = [isa_map[b]  for b in isa_map  if b not in rams_map]
@@ -776,91 +2375,375 @@ def calcular_errores_crudo_df(
     crude_name: str,
     tol: float = DEFAULT_TOL,
     tol_pesados: float = DEFAULT_TOL_PESADOS,
-) -> Tuple[pd.DataFrame, List[str], List[str]]:
+    conteos: Optional[List[ConteoCortes]] = None,
+    detail: str = "full",
+) -> Tuple[Optional[pd.DataFrame], List[str], List[str]]:
     """
     Calcula errores absolutos |ISA − RAMS| y semáforos para un par de archivos.
 
     Devuelve (df_out, columnas_cortes_visibles, orden_props_local).
     df_out: Propiedad | Semaforo | Corte_peor | Error_peor | Umbral_peor | [cortes...]
+    Con detail="worst", df_out no lleva las columnas de corte (y no hay
+    cortes visibles); con "none" no se construye (None): solo se rellenan
+    `hoja_resumen` y `conteos`.
+    Si se pasa `conteos`, se le añade un ConteoCortes por fila de df_out.
     """
     if "Propiedad" not in df_isa.columns:
         raise ValueError("El archivo ISA no tiene columna 'Propiedad'.")
     if "Propiedad" not in df_rams.columns:
         raise ValueError("El archivo RAMS no tiene columna 'Propiedad'.")
 
-    cortes_isa = detectar_cortes_en_df(df_isa)
+    plantilla_isa  = plantilla_archivo(df_isa, alias_prop)
+    plantilla_rams = plantilla_archivo(df_rams, alias_prop)
+    cortes_isa = plantilla_isa.cortes
     if not cortes_isa:
         raise ValueError("El archivo ISA no contiene cortes reconocibles.")
 
-    idx_rams        = _indice_prop(df_rams, alias_prop)
-    cortes_map_rams = _mapa_cortes(df_rams)
+    idx_rams        = plantilla_rams.indice_prop
+    cortes_map_rams = plantilla_rams.mapa_cortes
 
     columnas_cortes_visibles = [cname for (cname, _cc) in cortes_isa]
-    df_out_cols = (
-        ["Propiedad", "Semaforo", "Corte_peor", "Error_peor", "Umbral_peor"]
-        + columnas_cortes_visibles
-    )
-    df_out = pd.DataFrame(columns=df_out_cols)
     orden_props_local: List[str] = []
 
-    for _, row_isa in df_isa.iterrows():
-        prop_raw   = row_isa.get("Propiedad")
-        prop_canon = canon_prop(prop_raw, alias_prop)
+    # Alineación ISA ↔ RAMS por (propiedad canónica, corte canónico)
+    props_raw = df_isa["Propiedad"].tolist()
+    filas_isa:  List[int] = []
+    filas_rams: List[int] = []
+    props_canon: List[str] = []
+    for i, prop_canon in enumerate(plantilla_isa.propiedades):
         if not prop_canon:
             continue
-
         orden_props_local.append(prop_canon)
-
         if prop_canon not in idx_rams:
             continue
+        filas_isa.append(i)
+        filas_rams.append(idx_rams[prop_canon])
+        props_canon.append(prop_canon)
+
+    pos_isa  = [_posicion_columna(df_isa, cname) for (cname, _cc) in cortes_isa]
+    pos_rams = [_posicion_columna(df_rams, cortes_map_rams.get(cc)) for (_cname, cc) in cortes_isa]
+
+    # Matriz completa de errores |ISA − RAMS| en una sola operación
+    isa_vals,  isa_nulo  = _matriz_float(df_isa,  pos_isa,  np.asarray(filas_isa,  dtype=int))
+    rams_vals, rams_nulo = _matriz_float(df_rams, pos_rams, np.asarray(filas_rams, dtype=int))
+    errores = np.abs(isa_vals - rams_vals)
+    errores_nulo = isa_nulo | rams_nulo
+
+    # Clasificación en lote. Como en el dict errores_fila original, un corte
+    # canónico repetido en ISA cuenta una vez (posición de su primera
+    # aparición, valor de la última).
+    pos_corte_canon: Dict[str, int] = {}
+    for j, (_cname, cc) in enumerate(cortes_isa):
+        pos_corte_canon[cc] = j
+    cortes_clasif = list(pos_corte_canon.keys())
+    cols_clasif   = list(pos_corte_canon.values())
+
+    errores_clasif = np.where(errores_nulo, np.nan, errores)[:, cols_clasif]
+    repro, admis, tiene_umbral_prop = compilar_umbrales(umbrales).matrices(props_canon, cortes_clasif)
+    lote = clasificar_matriz(
+        errores_clasif, repro, admis, tiene_umbral_prop, pct_ok_amarillo, pct_rojo_rojo
+    )
+
+    for prop_canon, sem in zip(props_canon, lote.semaforos):
+        hoja_resumen.setdefault(prop_canon, {})[crude_name] = sem
+    if conteos is not None:
+        conteos.extend(
+            ConteoCortes(prop_canon, v, a, r, n)
+            for prop_canon, v, a, r, n in zip(
+                props_canon, lote.n_verde.tolist(), lote.n_amarillo.tolist(),
+                lote.n_rojo.tolist(), lote.n_validos.tolist(),
+            )
+        )
+    if detail == "none":
+        return None, [], orden_props_local
+
+    hay_peor = lote.corte_peor >= 0
+    salida: Dict[str, List[Any]] = {
+        "Propiedad":   [str(props_raw[i]) for i in filas_isa],
+        "Semaforo":    lote.semaforos,
+        "Corte_peor":  [cortes_clasif[j] if j >= 0 else None for j in lote.corte_peor.tolist()],
+        "Error_peor":  [e if h else None for e, h in zip(lote.error_peor.tolist(), hay_peor.tolist())],
+        "Umbral_peor": [u if h else None for u, h in zip(lote.umbral_peor.tolist(), hay_peor.tolist())],
+    }
 
-        row_rams = df_rams.iloc[idx_rams[prop_canon]]
+    columnas: List[Tuple[str, Any]] = [(c, salida[c]) for c in salida]
+    if detail != "full":
+        return _df_desde_columnas(columnas), [], orden_props_local
 
-        # Calcular error absoluto |ISA − RAMS| por corte
-        errores_fila: Dict[str, Optional[float]] = {}
-        fila_out: Dict[str, Any] = {"Propiedad": str(prop_raw)}
+    # Columnas de corte directamente desde la matriz (si un nombre de columna
+    # se repite, todas sus copias muestran el último corte con ese nombre)
+    ultima_pos = {cname: j for j, (cname, _cc) in enumerate(cortes_isa)}
+    for cname in columnas_cortes_visibles:
+        j = ultima_pos[cname]
+        columnas.append((cname, _columna_errores(errores[:, j], errores_nulo[:, j])))
 
-        for (cname_isa, cc_isa) in cortes_isa:
-            col_rams = cortes_map_rams.get(cc_isa)
-            if col_rams is None:
-                fila_out[cname_isa]   = None
-                errores_fila[cc_isa] = None
-                continue
+    df_out = _df_desde_columnas(columnas)
+    return df_out, columnas_cortes_visibles, orden_props_local
+
+
+# Evaluación de crudos independiente: cada crudo produce su propio resultado
+# parcial (sin tocar la hoja resumen compartida) y run_validation los combina
+# por orden de nombre, así que el resultado no depende del orden en que
+# terminen los crudos ni del modo de evaluación.
+
+MODOS_EVALUACION = ("serie", "hilos", "procesos")
+
+# Detalle por crudo: "full" = semáforo, peor corte y error de cada corte;
+# "worst" = sin las columnas de corte; "none" = solo resumen (sin crudo_dataframes)
+NIVELES_DETALLE = ("none", "worst", "full")
+
+
+@dataclass(frozen=True)
+class _ContextoEvaluacion:
+    """Lo que necesita calcular_errores_crudo_df además del par de DataFrames."""
+    umbrales: UmbralesDict
+    alias_prop: Mapping[str, str]
+    pct_ok_amarillo: float
+    pct_rojo_rojo: float
+    tol: float
+    tol_pesados: float
+    detail: str = "full"
+
+    def __reduce__(self):
+        # La tabla de alias es un MappingProxyType (no serializable): viaja como dict
+        return (_ContextoEvaluacion, (
+            self.umbrales, dict(self.alias_prop), self.pct_ok_amarillo,
+            self.pct_rojo_rojo, self.tol, self.tol_pesados, self.detail,
+        ))
+
+
+@dataclass
+class _ParcialCrudo:
+    """Resultado de evaluar un crudo; `error` si no se pudo leer o calcular."""
+    crude_name: str
+    isa_fname: str
+    df_out: Optional[pd.DataFrame] = None
+    cortes_visibles: List[str] = field(default_factory=list)
+    orden_local: List[str] = field(default_factory=list)
+    semaforos: Dict[str, str] = field(default_factory=dict)
+    conteos: List[ConteoCortes] = field(default_factory=list)
+    dialectos: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    error: Optional[str] = None
+    segundos: float = 0.0
+
+
+def _evaluar_crudo(
+    crude_name: str,
+    isa_fname: str,
+    rams_fname: str,
+    df_isa: Any,
+    df_rams: Any,
+    contexto: _ContextoEvaluacion,
+) -> _ParcialCrudo:
+    parcial = _ParcialCrudo(crude_name, isa_fname)
+    inicio = time.perf_counter()
+    try:
+        logger.info("Procesando crudo: %s", crude_name)
+        for df in (df_isa, df_rams):
+            if isinstance(df, Exception):
+                raise df
+        for fname, df in ((isa_fname, df_isa), (rams_fname, df_rams)):
+            if "dialecto_csv" in df.attrs:
+                parcial.dialectos[fname] = df.attrs["dialecto_csv"]
+
+        hoja_resumen: Dict[str, Dict[str, str]] = {}
+        parcial.df_out, parcial.cortes_visibles, parcial.orden_local = calcular_errores_crudo_df(
+            df_isa=df_isa,
+            df_rams=df_rams,
+            umbrales=contexto.umbrales,
+            alias_prop=contexto.alias_prop,
+            pct_ok_amarillo=contexto.pct_ok_amarillo,
+            pct_rojo_rojo=contexto.pct_rojo_rojo,
+            hoja_resumen=hoja_resumen,
+            crude_name=crude_name,
+            tol=contexto.tol,
+            tol_pesados=contexto.tol_pesados,
+            conteos=parcial.conteos,
+            detail=contexto.detail,
+        )
+        parcial.semaforos = {prop: sems[crude_name] for prop, sems in hoja_resumen.items()}
+    except Exception as e:
+        logger.error("Error procesando '%s': %s", crude_name, e)
+        parcial.error = str(e)
+    parcial.segundos = time.perf_counter() - inicio
+    return parcial
 
-            isa_val  = _float_or_none(row_isa.get(cname_isa))
-            rams_val = _float_or_none(row_rams.get(col_rams))
 
-            err = abs(isa_val - rams_val) if (isa_val is not None and rams_val is not None) else None
+# Contexto de cada proceso del pool de evaluación (se envía una vez por proceso)
+_CONTEXTO_PROCESO: Optional[_ContextoEvaluacion] = None
 
-            errores_fila[cc_isa] = err
-            fila_out[cname_isa]  = err
 
-        # Clasificar
-        sem, _estados, corte_peor, error_peor, _ratio, umbral_peor = clasificar_propiedad(
-            errores_fila,
-            prop_canon,
-            umbrales,
-            pct_ok_amarillo=pct_ok_amarillo,
-            pct_rojo_rojo=pct_rojo_rojo,
-            tol=tol,
-            tol_pesados=tol_pesados,
+def _iniciar_proceso_evaluacion(contexto: _ContextoEvaluacion) -> None:
+    global _CONTEXTO_PROCESO
+    _CONTEXTO_PROCESO = contexto
+
+
+def _evaluar_crudo_worker(
+    crude_name: str, isa_fname: str, rams_fname: str, df_isa: Any, df_rams: Any,
+) -> _ParcialCrudo:
+    """Ejecutado en el proceso hijo con el contexto de _iniciar_proceso_evaluacion."""
+    return _evaluar_crudo(crude_name, isa_fname, rams_fname, df_isa, df_rams, _CONTEXTO_PROCESO)
+
+
+def _evaluar_crudos(
+    lecturas: Iterable[Tuple[str, str, str, Any, Any]],
+    contexto: _ContextoEvaluacion,
+    modo: str,
+    workers: int,
+) -> Iterator[Optional[_ParcialCrudo]]:
+    """
+    Evalúa cada par leído y produce su _ParcialCrudo a medida que termina
+    (en serie, en el orden de `lecturas`; en paralelo, en orden de llegada).
+    Tras cada lectura produce además None, antes de evaluarla o de esperar al
+    pool, para que quien consume pueda avisar de ella sin esperar.
+
+    En los modos "hilos" y "procesos" hay como mucho 2 × workers crudos en
+    vuelo, para no retener todos los DataFrames leídos. Los pares que no se
+    pudieron leer se resuelven aquí mismo, y si el pool de procesos cae, los
+    crudos pendientes se evalúan en el proceso principal.
+    """
+    if modo == "serie" or workers <= 1:
+        for lectura in lecturas:
+            yield None
+            yield _evaluar_crudo(*lectura, contexto)
+        return
+
+    if modo == "hilos":
+        pool: Any = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="evaluacion")
+        tarea, extra = _evaluar_crudo, (contexto,)
+    else:
+        pool = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_iniciar_proceso_evaluacion,
+            initargs=(contexto,),
         )
+        tarea, extra = _evaluar_crudo_worker, ()   # el contexto ya está en cada proceso
 
-        fila_out["Semaforo"]    = sem
-        fila_out["Corte_peor"]  = corte_peor
-        fila_out["Error_peor"]  = error_peor
-        fila_out["Umbral_peor"] = umbral_peor
+    def _lanzar(lectura: Tuple[str, str, str, Any, Any]) -> Future:
+        return pool.submit(tarea, *lectura, *extra)
 
-        hoja_resumen.setdefault(prop_canon, {})[crude_name] = sem
-        df_out.loc[len(df_out)] = fila_out
+    def _recoger(futuro: Future, lectura: Tuple[str, str, str, Any, Any]) -> _ParcialCrudo:
+        try:
+            return futuro.result()
+        except Exception as e:              # pool caído o par no serializable
+            logger.warning("Evaluación de '%s' fuera del pool (%s); se repite aquí", lectura[0], e)
+            return _evaluar_crudo(*lectura, contexto)
 
-    return df_out, columnas_cortes_visibles, orden_props_local
+    en_vuelo: Dict[Future, Tuple[str, str, str, Any, Any]] = {}
+    with pool:
+        try:
+            for lectura in lecturas:
+                yield None
+                if isinstance(lectura[3], Exception) or isinstance(lectura[4], Exception):
+                    yield _evaluar_crudo(*lectura, contexto)
+                    continue
+                en_vuelo[_lanzar(lectura)] = lectura
+                if len(en_vuelo) >= 2 * workers:
+                    hechos, _pendientes = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                    for futuro in hechos:
+                        yield _recoger(futuro, en_vuelo.pop(futuro))
+            while en_vuelo:
+                hechos, _pendientes = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    yield _recoger(futuro, en_vuelo.pop(futuro))
+        finally:
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+
+# Caché de resultados por crudo (opcional): clave = contenido de ISA y RAMS +
+# umbrales compilados + alias + tolerancias + detalle. Los porcentajes no
+# entran: al reutilizar un crudo se reagregan sus conteos. Cambiar la versión
+# al modificar calcular_errores_crudo_df invalida las entradas anteriores.
+
+_VERSION_CRUDOS = "crudos-v2"
+
+
+def _huella_origen(origen: Any, nombre: str) -> Optional[bytes]:
+    """BLAKE2b del contenido de un archivo (o de su libro + la hoja); None si no se puede abrir."""
+    if isinstance(origen, HojaLibro):
+        try:
+            huella = origen.libro.huella()
+        except Exception:
+            return None
+        return hashlib.blake2b(huella + origen.hoja.encode("utf-8"), digest_size=32).digest()
+    try:
+        fuente, propia = _abrir_origen(origen, nombre)
+    except Exception:
+        return None
+    try:
+        return fuente.huella()
+    finally:
+        if propia:
+            fuente.cerrar()
+
+
+def clave_cache_crudo(
+    crude_name: str,
+    isa_fname: str, huella_isa: bytes,
+    rams_fname: str, huella_rams: bytes,
+    contexto: _ContextoEvaluacion,
+) -> str:
+    """
+    Clave del resultado de un crudo: contenido de ISA y RAMS, umbrales
+    compilados, alias, tolerancias y nivel de detalle (no los porcentajes de
+    agregación).
+    Incluye los nombres del crudo y de los archivos, que aparecen en el
+    resultado (errores, formato de los CSV).
+    """
+    h = hashlib.blake2b(digest_size=32)
+    for parte in (
+        _VERSION_CRUDOS,
+        repr((crude_name, isa_fname, rams_fname)),
+        repr((contexto.tol, contexto.tol_pesados, contexto.detail)),
+        repr(sorted(contexto.alias_prop.items())),
+    ):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    umbrales = contexto.umbrales
+    h.update(umbrales.huella() if isinstance(umbrales, UmbralesCompilados) else compilar_umbrales(umbrales).huella())
+    h.update(huella_isa)
+    h.update(huella_rams)
+    return h.hexdigest()
+
+
+def _tamano_origen(origen: Any) -> int:
+    """Tamaño aproximado en bytes de un archivo subido (0 si no se conoce)."""
+    if isinstance(origen, (FuenteArchivo, MiembroZip)):
+        return origen.tamano
+    if isinstance(origen, HojaLibro):
+        return _tamano_origen(origen.libro.origen) // origen.libro.hojas
+    if isinstance(origen, (bytes, bytearray, memoryview)):
+        return len(origen)
+    if hasattr(origen, "getbuffer"):
+        with origen.getbuffer() as buffer:
+            return buffer.nbytes
+    return int(getattr(origen, "size", 0) or 0)
+
+
+def _mayores_primero(
+    pares: List[Tuple[str, Tuple[str, str]]],
+    isa_files: Mapping[str, Any],
+    rams_files: Mapping[str, Any],
+) -> List[Tuple[str, Tuple[str, str]]]:
+    """Pares ordenados de mayor a menor tamaño ISA + RAMS (empates: por nombre)."""
+    return sorted(
+        pares,
+        key=lambda par: -(_tamano_origen(isa_files[par[1][0]]) + _tamano_origen(rams_files[par[1][1]])),
+    )
 
 
 # ---------------------------------------------------------------------------
 # 11. Validación de parámetros
 # ---------------------------------------------------------------------------
 
+def _validar_detail(detail: str) -> None:
+    if detail not in NIVELES_DETALLE:
+        raise ValueError(
+            f"'detail' debe ser uno de {', '.join(NIVELES_DETALLE)} (recibido: {detail!r})."
+        )
+
+
 def validate_params(
     tol: float,
     tol_pesados: float,
@@ -879,79 +2762,627 @@ def validate_params(
 # 12. Pipeline completo
 # ---------------------------------------------------------------------------
 
-def run_validation(
-    isa_files: Dict[str, IO[bytes]],
-    rams_files: Dict[str, IO[bytes]],
+# Cambiar al modificar construir_umbrales / UmbralesCompilados: invalida la caché en disco
+_VERSION_UMBRALES = "umbrales-v2"
+
+
+def clave_cache_umbrales(
+    datos: Union[bytes, memoryview],
+    matriz_filename: str,
+    sheet_hint: Optional[str],
+    alias_prop: Dict[str, str],
+) -> str:
+    """Clave de caché: hash del contenido de la matriz + hoja + extensión + alias."""
+    h = hashlib.sha256()
+    for parte in (
+        _VERSION_UMBRALES,
+        _get_extension(matriz_filename),
+        repr(sheet_hint),
+        repr(sorted(alias_prop.items())),
+    ):
+        h.update(parte.encode("utf-8"))
+        h.update(b"\0")
+    h.update(datos)
+    return h.hexdigest()
+
+
+def cargar_umbrales(
     matriz_file: IO[bytes],
     matriz_filename: str,
+    alias_prop: Dict[str, str],
+    sheet_hint: Optional[str] = None,
+    cache: Optional[CacheUmbrales] = None,
+) -> UmbralesCompilados:
+    """
+    Lee y compila la Matriz de Umbrales.
+
+    Con `cache`, una matriz idéntica (mismos bytes, hoja y alias) se recupera
+    ya compilada sin volver a parsear el archivo.
+    """
+    if cache is None:
+        return construir_umbrales(read_file_with_sheet(matriz_file, matriz_filename, sheet_hint), alias_prop)
+
+    with abrir_fuente(matriz_file, matriz_filename) as fuente:
+        clave = clave_cache_umbrales(fuente.vista(), matriz_filename, sheet_hint, alias_prop)
+        umbrales = cache.obtener(clave)
+        if isinstance(umbrales, UmbralesCompilados):
+            logger.info("Umbrales recuperados de caché (%s…)", clave[:12])
+            return umbrales
+
+        umbrales = construir_umbrales(read_file_with_sheet(fuente, matriz_filename, sheet_hint), alias_prop)
+    cache.guardar(clave, umbrales)
+    return umbrales
+
+
+def run_validation(
+    isa_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    rams_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    matriz_file: Union[IO[bytes], FuenteArchivo],
+    matriz_filename: str,
     tol: float = DEFAULT_TOL,
     tol_pesados: float = DEFAULT_TOL_PESADOS,
     pct_ok_amarillo: float = DEFAULT_PCT_OK_AMARILLO,
     pct_rojo_rojo: float = DEFAULT_PCT_ROJO_ROJO,
     sheet_hint: Optional[str] = None,
+    cache_umbrales: Optional[CacheUmbrales] = None,
+    workers: Optional[int] = 1,
+    cache_frames: Optional[CacheDataFrames] = None,
+    multihoja: bool = False,
+    modo_evaluacion: str = "serie",
+    cache_crudos: Optional[CacheCrudos] = None,
+    detail: str = "full",
 ) -> ValidationResult:
-    """Pipeline completo: lee umbrales → empareja → calcula → construye ValidationResult."""
+    """
+    Pipeline completo: lee umbrales → empareja → calcula → construye ValidationResult.
+
+    Los archivos pueden ser buffers/streams o FuenteArchivo (sin copia); un
+    '*.zip' se sustituye por los ISA/RAMS que contiene, que se emparejan por
+    su nombre y se descomprimen de uno en uno al leerlos.
+    `cache_umbrales` (opcional) evita reparsear una Matriz de Umbrales ya vista;
+    `cache_frames` (opcional), los archivos ISA/RAMS ya leídos en otra ejecución.
+    `workers` > 1 parsea los archivos ISA/RAMS en un pool de procesos
+    (None = un proceso por CPU); el resultado es idéntico al de 1 (serie).
+    Con `multihoja`, cada libro ISA/RAMS con varias hojas aporta un crudo por
+    hoja, emparejado por el nombre de la hoja (ver expandir_libros).
+    `modo_evaluacion` "hilos" o "procesos" (con workers > 1) evalúa los
+    crudos en un pool de ese tipo, de mayor a menor; el resultado se combina
+    por nombre de crudo y es idéntico al de "serie".
+    `cache_crudos` (opcional) guarda el resultado de cada crudo: en la
+    siguiente ejecución, los pares cuyo ISA, RAMS, umbrales y parámetros no
+    han cambiado se reutilizan sin leerlos (ver crudos_reutilizados).
+    `detail` "worst" guarda en crudo_dataframes solo el semáforo y el peor
+    corte de cada propiedad; "none", nada (solo resumen_raw y summary), para
+    lotes grandes en los que basta la hoja Resumen. Ver NIVELES_DETALLE.
+    """
+    fin = deque(iter_validation(
+        isa_files=isa_files,
+        rams_files=rams_files,
+        matriz_file=matriz_file,
+        matriz_filename=matriz_filename,
+        tol=tol,
+        tol_pesados=tol_pesados,
+        pct_ok_amarillo=pct_ok_amarillo,
+        pct_rojo_rojo=pct_rojo_rojo,
+        sheet_hint=sheet_hint,
+        cache_umbrales=cache_umbrales,
+        workers=workers,
+        cache_frames=cache_frames,
+        multihoja=multihoja,
+        modo_evaluacion=modo_evaluacion,
+        cache_crudos=cache_crudos,
+        detail=detail,
+    ), maxlen=1)
+    return fin[0].resultado
+
+
+def iter_validation(
+    isa_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    rams_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    matriz_file: Union[IO[bytes], FuenteArchivo],
+    matriz_filename: str,
+    tol: float = DEFAULT_TOL,
+    tol_pesados: float = DEFAULT_TOL_PESADOS,
+    pct_ok_amarillo: float = DEFAULT_PCT_OK_AMARILLO,
+    pct_rojo_rojo: float = DEFAULT_PCT_ROJO_ROJO,
+    sheet_hint: Optional[str] = None,
+    cache_umbrales: Optional[CacheUmbrales] = None,
+    workers: Optional[int] = 1,
+    cache_frames: Optional[CacheDataFrames] = None,
+    multihoja: bool = False,
+    modo_evaluacion: str = "serie",
+    cache_crudos: Optional[CacheCrudos] = None,
+    detail: str = "full",
+) -> Iterator[EventoValidacion]:
+    """
+    run_validation paso a paso: produce un EventoValidacion por etapa
+    ("umbrales", "emparejado"), por crudo ("leido", y "evaluado" o "fallido")
+    a medida que terminan, y al final "fin" con el ValidationResult, idéntico
+    al de run_validation con los mismos argumentos.
+
+    Los parámetros se comprueban al llamar (ValueError inmediato); el trabajo
+    empieza al pedir el primer evento. Cerrar el generador antes del final
+    libera archivos, ZIP y pools.
+    """
     validate_params(tol, tol_pesados, pct_ok_amarillo, pct_rojo_rojo)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"'workers' debe ser ≥ 1 (recibido: {workers}).")
+    if modo_evaluacion not in MODOS_EVALUACION:
+        raise ValueError(
+            f"'modo_evaluacion' debe ser uno de {', '.join(MODOS_EVALUACION)} (recibido: {modo_evaluacion!r})."
+        )
+    _validar_detail(detail)
+
+    return _iter_validation(
+        isa_files,
+        rams_files,
+        matriz_file,
+        matriz_filename,
+        tol,
+        tol_pesados,
+        pct_ok_amarillo,
+        pct_rojo_rojo,
+        sheet_hint,
+        cache_umbrales,
+        workers,
+        cache_frames,
+        multihoja,
+        modo_evaluacion,
+        cache_crudos,
+        detail,
+    )
 
-    alias_prop = crear_semantica_alias()
-    df_matriz  = read_file_with_sheet(matriz_file, matriz_filename, sheet_hint)
-    umbrales   = construir_umbrales(df_matriz, alias_prop)
+
+def _iter_validation(
+    isa_files: Mapping[str, Any],
+    rams_files: Mapping[str, Any],
+    matriz_file: Any,
+    matriz_filename: str,
+    tol: float,
+    tol_pesados: float,
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+    sheet_hint: Optional[str],
+    cache_umbrales: Optional[CacheUmbrales],
+    workers: int,
+    cache_frames: Optional[CacheDataFrames],
+    multihoja: bool,
+    modo_evaluacion: str,
+    cache_crudos: Optional[CacheCrudos],
+    detail: str,
+) -> Iterator[EventoValidacion]:
+    inicio = time.perf_counter()
+    alias_prop = alias_propiedades()
+    umbrales   = cargar_umbrales(matriz_file, matriz_filename, alias_prop, sheet_hint, cache_umbrales)
     logger.info("Umbrales cargados: %d claves (prop × corte)", len(umbrales))
+    yield EventoValidacion(
+        "umbrales",
+        segundos=time.perf_counter() - inicio,
+        mensaje=f"{len(umbrales)} claves (propiedad × corte)",
+    )
+    contexto = _ContextoEvaluacion(umbrales, alias_prop, pct_ok_amarillo, pct_rojo_rojo, tol, tol_pesados, detail)
+
+    with ExitStack() as pila:
+        etapa = time.perf_counter()
+        isa_files  = expandir_zips(isa_files, pila)
+        rams_files = expandir_zips(rams_files, pila)
+        hojas: Dict[str, str] = {}
+        if multihoja:
+            isa_files, hojas_isa   = expandir_libros(isa_files, pila)
+            rams_files, hojas_rams = expandir_libros(rams_files, pila)
+            hojas = {**hojas_isa, **hojas_rams}
+        paired_map, unpaired_isa, unpaired_rams = pair_files(
+            list(isa_files.keys()), list(rams_files.keys()), hojas
+        )
 
-    paired_map, unpaired_isa, unpaired_rams = pair_files(
-        list(isa_files.keys()), list(rams_files.keys())
+        pares = sorted(paired_map.items())
+        reutilizados: Dict[str, _ParcialCrudo] = {}
+        claves: Dict[str, str] = {}
+        if cache_crudos is not None:
+            reutilizados, claves = _consultar_cache_crudos(pares, isa_files, rams_files, contexto, cache_crudos)
+            pares = [par for par in pares if par[0] not in reutilizados]
+        if modo_evaluacion != "serie" and workers > 1:
+            # Los crudos grandes primero: el pool no se queda esperando al último
+            pares = _mayores_primero(pares, isa_files, rams_files)
+        total = len(pares) + len(reutilizados)
+        completados = 0
+        mensaje = f"{total} par(es); {len(unpaired_isa)} ISA y {len(unpaired_rams)} RAMS sin par"
+        if reutilizados:
+            mensaje += f"; {len(reutilizados)} sin cambios"
+        yield EventoValidacion(
+            "emparejado",
+            total=total,
+            segundos=time.perf_counter() - etapa,
+            mensaje=mensaje,
+        )
+
+        parciales: Dict[str, _ParcialCrudo] = {}
+        for crude_name, parcial in reutilizados.items():
+            parciales[crude_name] = parcial
+            completados += 1
+            yield _evento_evaluado(parcial, completados, total, pct_ok_amarillo, pct_rojo_rojo, reutilizado=True)
+
+        # Eventos "leido": los anota _cronometrar al llegar cada lectura y se
+        # entregan en cuanto _evaluar_crudos devuelve el control (None), antes
+        # de evaluar ese par o de esperar al pool
+        leidos: deque = deque()
+
+        def _cronometrar(lecturas: Iterator[Tuple[str, str, str, Any, Any]]):
+            espera = time.perf_counter()
+            for lectura in lecturas:
+                if not isinstance(lectura[3], Exception) and not isinstance(lectura[4], Exception):
+                    leidos.append(EventoValidacion(
+                        "leido", crudo=lectura[0], completados=completados, total=total,
+                        segundos=time.perf_counter() - espera,
+                    ))
+                yield lectura
+                espera = time.perf_counter()
+
+        lecturas = _cronometrar(_leer_pares(pares, isa_files, rams_files, workers, cache_frames))
+        for parcial in _evaluar_crudos(lecturas, contexto, modo_evaluacion, workers):
+            while leidos:
+                yield leidos.popleft()
+            if parcial is None:
+                continue
+            parciales[parcial.crude_name] = parcial
+            completados += 1
+            if parcial.error is not None:
+                yield EventoValidacion(
+                    "fallido", crudo=parcial.crude_name, completados=completados, total=total,
+                    segundos=parcial.segundos, mensaje=parcial.error,
+                )
+                continue
+            if parcial.crude_name in claves:
+                # Copia superficial, como al reutilizarlo: el df_out de esta
+                # ejecución acaba en result.crudo_dataframes y se puede modificar
+                cache_crudos.guardar(claves[parcial.crude_name], replace(
+                    parcial,
+                    df_out=None if parcial.df_out is None else parcial.df_out.copy(deep=False),
+                    cortes_visibles=list(parcial.cortes_visibles),
+                    orden_local=list(parcial.orden_local),
+                ))
+            yield _evento_evaluado(parcial, completados, total, pct_ok_amarillo, pct_rojo_rojo)
+
+    result = _combinar_parciales(parciales, unpaired_isa, unpaired_rams, pct_ok_amarillo, pct_rojo_rojo)
+    result.detail = detail
+    result.crudos_reutilizados = sorted(reutilizados)
+    result.crudos_recalculados = sorted(set(parciales) - set(reutilizados))
+    _log_caches(cache_frames, cache_crudos)
+    yield EventoValidacion(
+        "fin", completados=completados, total=total,
+        segundos=time.perf_counter() - inicio, resultado=result,
     )
 
-    result = ValidationResult(unpaired_isa=unpaired_isa, unpaired_rams=unpaired_rams)
-    resumen: Dict[str, Dict[str, str]] = {}
-    orden_propiedades: List[str] = []
 
-    for crude_name, (isa_fname, rams_fname) in sorted(paired_map.items()):
-        try:
-            logger.info("Procesando crudo: %s", crude_name)
-            isa_files[isa_fname].seek(0)
-            rams_files[rams_fname].seek(0)
-
-            df_isa  = read_file(isa_files[isa_fname],  isa_fname)
-            df_rams = read_file(rams_files[rams_fname], rams_fname)
-
-            df_out, cortes_visibles, orden_local = calcular_errores_crudo_df(
-                df_isa=df_isa,
-                df_rams=df_rams,
-                umbrales=umbrales,
-                alias_prop=alias_prop,
-                pct_ok_amarillo=pct_ok_amarillo,
-                pct_rojo_rojo=pct_rojo_rojo,
-                hoja_resumen=resumen,
-                crude_name=crude_name,
-                tol=tol,
-                tol_pesados=tol_pesados,
-            )
+def _consultar_cache_crudos(
+    pares: List[Tuple[str, Tuple[str, str]]],
+    isa_files: Mapping[str, Any],
+    rams_files: Mapping[str, Any],
+    contexto: _ContextoEvaluacion,
+    cache_crudos: CacheCrudos,
+) -> Tuple[Dict[str, _ParcialCrudo], Dict[str, str]]:
+    """
+    ({crudo → resultado reutilizado}, {crudo → clave} de los que hay que
+    evaluar). Los pares cuyo contenido no se puede leer quedan fuera de ambos:
+    se evalúan y su error aparece como siempre.
+    """
+    reutilizados: Dict[str, _ParcialCrudo] = {}
+    claves: Dict[str, str] = {}
+    for crude_name, (isa_fname, rams_fname) in pares:
+        huella_isa  = _huella_origen(isa_files[isa_fname], isa_fname)
+        huella_rams = _huella_origen(rams_files[rams_fname], rams_fname)
+        if huella_isa is None or huella_rams is None:
+            continue
+        clave = clave_cache_crudo(crude_name, isa_fname, huella_isa, rams_fname, huella_rams, contexto)
+        previo = cache_crudos.obtener(clave)
+        if previo is None:
+            claves[crude_name] = clave
+            continue
+        # Reagregado con los porcentajes de esta ejecución, sobre una copia
+        # superficial: el llamante puede añadir columnas sin tocar la caché
+        df_out, semaforos = _reagregar_crudo(
+            previo.df_out, previo.conteos, previo.semaforos,
+            contexto.pct_ok_amarillo, contexto.pct_rojo_rojo,
+        )
+        if df_out is not None and df_out is previo.df_out:
+            df_out = df_out.copy(deep=False)
+        reutilizados[crude_name] = replace(
+            previo,
+            df_out=df_out,
+            cortes_visibles=list(previo.cortes_visibles),
+            orden_local=list(previo.orden_local),
+            semaforos=previo.semaforos if semaforos is None else semaforos,
+            segundos=0.0,
+        )
+    return reutilizados, claves
 
-            result.paired_names.append(crude_name)
-            result.crudo_dataframes[crude_name] = df_out
-            result.cortes_visibles[crude_name]  = cortes_visibles
 
-            if not orden_propiedades:
-                orden_propiedades = orden_local
+def _evento_evaluado(
+    parcial: _ParcialCrudo,
+    completados: int,
+    total: int,
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+    reutilizado: bool = False,
+) -> EventoValidacion:
+    semaforo = _sem_global_por_crudo(
+        {prop: {parcial.crude_name: sem} for prop, sem in parcial.semaforos.items()},
+        pct_ok_amarillo, pct_rojo_rojo,
+    ).get(parcial.crude_name, "")
+    return EventoValidacion(
+        "evaluado", crudo=parcial.crude_name, completados=completados, total=total,
+        segundos=parcial.segundos, semaforo=semaforo,
+        df_out=parcial.df_out, cortes_visibles=parcial.cortes_visibles,
+        reutilizado=reutilizado,
+    )
 
-        except Exception as e:
-            logger.error("Error procesando '%s': %s", crude_name, e)
-            result.unpaired_isa.append(f"{isa_fname} [ERROR: {e}]")
+
+def _combinar_parciales(
+    parciales: Mapping[str, _ParcialCrudo],
+    unpaired_isa: List[str],
+    unpaired_rams: List[str],
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+) -> ValidationResult:
+    """ValidationResult a partir de los crudos evaluados, por orden de nombre (igual que en serie)."""
+    result = ValidationResult(unpaired_isa=unpaired_isa, unpaired_rams=unpaired_rams)
+    resumen: Dict[str, Dict[str, str]] = {}
+    orden_propiedades: List[str] = []
+    for crude_name in sorted(parciales):
+        parcial = parciales[crude_name]
+        result.dialectos_csv.update(parcial.dialectos)
+        if parcial.error is not None:
+            result.unpaired_isa.append(f"{parcial.isa_fname} [ERROR: {parcial.error}]")
+            continue
+        result.paired_names.append(crude_name)
+        if parcial.df_out is not None:
+            result.crudo_dataframes[crude_name] = parcial.df_out
+            result.cortes_visibles[crude_name]  = parcial.cortes_visibles
+        result.conteos_cortes[crude_name]   = parcial.conteos
+        for prop, sem in parcial.semaforos.items():
+            resumen.setdefault(prop, {})[crude_name] = sem
+        if not orden_propiedades:
+            orden_propiedades = parcial.orden_local
 
     result.resumen_raw       = resumen
     result.orden_propiedades = orden_propiedades
     result.pct_ok_amarillo   = pct_ok_amarillo
     result.pct_rojo_rojo     = pct_rojo_rojo
     result.summary = _build_summary_df(resumen, orden_propiedades, pct_ok_amarillo, pct_rojo_rojo)
-
     return result
 
 
+def _log_caches(cache_frames: Optional[CacheDataFrames], cache_crudos: Optional[CacheCrudos] = None) -> None:
+    stats = estadisticas_canonizacion()
+    logger.info(
+        "Caché de canonización: canon_prop %.0f%% aciertos, canon_corte %.0f%% aciertos, "
+        "plantillas %.0f%% aciertos",
+        100 * stats["canon_prop"]["hit_rate"],
+        100 * stats["canon_corte"]["hit_rate"],
+        100 * stats["plantilla"]["hit_rate"],
+    )
+    if cache_frames is not None:
+        stats = cache_frames.estadisticas()
+        logger.info(
+            "Caché de DataFrames: %d aciertos (%d en disco), %d fallos, %d expulsiones, %.1f MB en memoria",
+            stats["hits"] + stats["hits_disco"], stats["hits_disco"], stats["misses"],
+            stats["evictions"], stats["bytes"] / 1e6,
+        )
+    if cache_crudos is not None:
+        stats = cache_crudos.estadisticas()
+        logger.info(
+            "Caché de crudos: %d reutilizados, %d evaluados, %d/%d entradas",
+            stats["hits"], stats["misses"], stats["size"], stats["max_entradas"],
+        )
+
+
+def _cabeceras_entradas(
+    archivos: Mapping[str, Any],
+    multihoja: bool,
+    report: PreflightReport,
+) -> Tuple[Dict[str, CabeceraArchivo], Dict[str, str]]:
+    """
+    {entrada → CabeceraArchivo} con las mismas entradas que usaría
+    run_validation (una por hoja en los libros multihoja, como expandir_libros)
+    y {entrada → hoja} para pair_files. Los errores van a `report`.
+    """
+    out: Dict[str, CabeceraArchivo] = {}
+    hojas: Dict[str, str] = {}
+    for nombre, origen in archivos.items():
+        fuente, propia = _abrir_origen(origen, nombre)
+        try:
+            cabeceras = leer_cabeceras(
+                fuente, nombre, todas_las_hojas=multihoja and _get_extension(nombre) in _EXTENSIONES_LIBRO,
+            )
+        except ValueError as e:
+            report.errores_lectura[nombre] = str(e)
+            cabeceras = [CabeceraArchivo((), None)]
+        finally:
+            if propia:
+                fuente.cerrar()
+        cabeceras = cabeceras or [CabeceraArchivo((), None, con_datos=False)]
+        con_datos = [c for c in cabeceras if c.con_datos]
+        if len(cabeceras) < 2 or len(con_datos) < 2:
+            out[nombre] = cabeceras[0]
+            continue
+        for cabecera in con_datos:
+            clave = nombre_hoja(nombre, cabecera.hoja)
+            out[clave] = cabecera
+            hojas[clave] = cabecera.hoja
+    return out, hojas
+
+
+def _comprobar_par(
+    isa: CabeceraArchivo, isa_fname: str,
+    rams: CabeceraArchivo, rams_fname: str,
+    umbrales: UmbralesCompilados,
+    alias_prop: Mapping[str, str],
+    errores_lectura: Mapping[str, str],
+) -> PreflightCrudo:
+    """Mismas comprobaciones que calcular_errores_crudo_df, sobre las cabeceras."""
+    crudo = PreflightCrudo(isa=isa_fname, rams=rams_fname)
+    for fname in (isa_fname, rams_fname):
+        if fname in errores_lectura:
+            crudo.errores.append(f"No se pudo leer '{fname}'")
+    if crudo.errores:
+        return crudo
+    if isa.propiedades is None:
+        crudo.errores.append("El archivo ISA no tiene columna 'Propiedad'.")
+    if rams.propiedades is None:
+        crudo.errores.append("El archivo RAMS no tiene columna 'Propiedad'.")
+
+    cortes_isa = _detectar_cortes(isa.columnas)
+    if not cortes_isa:
+        crudo.errores.append("El archivo ISA no contiene cortes reconocibles.")
+    cortes_rams = {cc for _n, cc in _detectar_cortes(rams.columnas)}
+    crudo.cortes = [n for n, _cc in cortes_isa]
+    crudo.cortes_sin_umbral = [n for n, cc in cortes_isa if cc not in umbrales.pos_corte]
+    crudo.cortes_sin_rams = [n for n, cc in cortes_isa if cc not in cortes_rams]
+    if isa.propiedades is None or rams.propiedades is None:
+        return crudo
+
+    props_isa = [p for p in canon_prop_series(pd.Series(isa.propiedades, dtype=object), alias_prop) if p]
+    props_rams = set(canon_prop_series(pd.Series(rams.propiedades, dtype=object), alias_prop))
+    crudo.n_propiedades = len(props_isa)
+    crudo.propiedades_sin_umbral = [p for p in props_isa if not umbrales.tiene_umbral(p)]
+    crudo.propiedades_sin_rams = [p for p in props_isa if p not in props_rams]
+    return crudo
+
+
+def preflight(
+    isa_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    rams_files: Dict[str, Union[IO[bytes], FuenteArchivo]],
+    matriz_file: Union[IO[bytes], FuenteArchivo],
+    matriz_filename: str,
+    sheet_hint: Optional[str] = None,
+    cache_umbrales: Optional[CacheUmbrales] = None,
+    multihoja: bool = False,
+) -> PreflightReport:
+    """
+    Comprobación previa a run_validation (mismos argumentos de entrada):
+    emparejamiento, cortes detectados, cortes y propiedades sin umbral o sin
+    RAMS, y archivos sin columna 'Propiedad' o ilegibles.
+
+    De cada ISA/RAMS solo se leen la cabecera y la columna Propiedad; la
+    Matriz de Umbrales se carga completa (y se reutiliza de `cache_umbrales`).
+    """
+    inicio = time.perf_counter()
+    alias_prop = alias_propiedades()
+    umbrales = compilar_umbrales(
+        cargar_umbrales(matriz_file, matriz_filename, alias_prop, sheet_hint, cache_umbrales)
+    )
+
+    report = PreflightReport()
+    with ExitStack() as pila:
+        cab_isa, hojas_isa   = _cabeceras_entradas(expandir_zips(isa_files, pila), multihoja, report)
+        cab_rams, hojas_rams = _cabeceras_entradas(expandir_zips(rams_files, pila), multihoja, report)
+
+    paired_map, report.unpaired_isa, report.unpaired_rams = pair_files(
+        list(cab_isa.keys()), list(cab_rams.keys()), {**hojas_isa, **hojas_rams}
+    )
+    for crude_name, (isa_fname, rams_fname) in sorted(paired_map.items()):
+        report.crudos[crude_name] = _comprobar_par(
+            cab_isa[isa_fname], isa_fname, cab_rams[rams_fname], rams_fname,
+            umbrales, alias_prop, report.errores_lectura,
+        )
+
+    report.segundos = time.perf_counter() - inicio
+    logger.info(
+        "Comprobación previa: %d pares, %d con errores, %d archivos ilegibles (%.2f s)",
+        report.total_pairs, sum(not c.ok for c in report.crudos.values()),
+        len(report.errores_lectura), report.segundos,
+    )
+    return report
+
+
 # ---------------------------------------------------------------------------
 # 13. DataFrame resumen
 # ---------------------------------------------------------------------------
 
+_SEMAFOROS_AGREGABLES = {"VERDE", "AMARILLO", "ROJO"}
+
+
+def _reagregar_crudo(
+    df_out: Optional[pd.DataFrame],
+    conteos: List[ConteoCortes],
+    semaforos_prop: Mapping[str, str],
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+) -> Tuple[Optional[pd.DataFrame], Optional[Dict[str, str]]]:
+    """
+    (df_out con la columna Semaforo recalculada, {propiedad canónica →
+    semáforo}) a partir de los conteos de cada fila. "" y "NA" no dependen de
+    los porcentajes y se conservan. Si ningún semáforo cambia se devuelve el
+    mismo df_out; si no, una copia superficial. Sin detalle (df_out None) los
+    semáforos actuales salen de `semaforos_prop`. Sin conteos que casen con
+    df_out devuelve (df_out, None).
+    """
+    if df_out is None:
+        actuales = [semaforos_prop.get(c.propiedad, "") for c in conteos]
+    elif len(df_out) == 0 or len(conteos) != len(df_out):
+        return df_out, None
+    else:
+        actuales = df_out["Semaforo"].tolist()
+    if not conteos:
+        return df_out, None
+    nuevos = _semaforos_por_conteo(
+        np.array([c.verde for c in conteos]),
+        np.array([c.rojo for c in conteos]),
+        np.array([c.validos for c in conteos]),
+        np.array([c.validos for c in conteos]),
+        np.ones(len(conteos), dtype=bool),
+        pct_ok_amarillo, pct_rojo_rojo,
+    )
+    semaforos_fila = [
+        nuevo if actual in _SEMAFOROS_AGREGABLES else actual
+        for actual, nuevo in zip(actuales, nuevos)
+    ]
+    # Si una propiedad se repite, manda la última fila (como en hoja_resumen)
+    semaforos = {c.propiedad: sem for c, sem in zip(conteos, semaforos_fila)}
+    if df_out is None or semaforos_fila == actuales:
+        return df_out, semaforos
+    df_nuevo = df_out.copy(deep=False)
+    df_nuevo["Semaforo"] = pd.Series(semaforos_fila, index=df_out.index, dtype=df_out["Semaforo"].dtype)
+    return df_nuevo, semaforos
+
+
+def reaggregate(
+    result: ValidationResult,
+    pct_ok_amarillo: float,
+    pct_rojo_rojo: float,
+) -> ValidationResult:
+    """
+    Nuevo ValidationResult con los semáforos de propiedad y GLOBAL
+    recalculados para otros porcentajes, sin leer archivos ni recalcular
+    errores: se parte de `result.conteos_cortes`. El resultado es idéntico al
+    de run_validation con esos porcentajes; `result` no se modifica.
+    """
+    validate_params(DEFAULT_TOL, DEFAULT_TOL_PESADOS, pct_ok_amarillo, pct_rojo_rojo)
+    resumen = {prop: dict(sems) for prop, sems in result.resumen_raw.items()}
+    crudo_dataframes: Dict[str, pd.DataFrame] = {}
+    for crude_name in result.paired_names:
+        df_nuevo, semaforos = _reagregar_crudo(
+            result.crudo_dataframes.get(crude_name),
+            result.conteos_cortes.get(crude_name, []),
+            {prop: sems[crude_name] for prop, sems in result.resumen_raw.items() if crude_name in sems},
+            pct_ok_amarillo, pct_rojo_rojo,
+        )
+        if df_nuevo is not None:
+            crudo_dataframes[crude_name] = df_nuevo
+        for prop, sem in (semaforos or {}).items():
+            resumen.setdefault(prop, {})[crude_name] = sem
+
+    return replace(
+        result,
+        crudo_dataframes=crudo_dataframes,
+        resumen_raw=resumen,
+        summary=_build_summary_df(resumen, result.orden_propiedades, pct_ok_amarillo, pct_rojo_rojo),
+        pct_ok_amarillo=pct_ok_amarillo,
+        pct_rojo_rojo=pct_rojo_rojo,
+    )
+
+
 def _build_summary_df(
     resumen: Dict[str, Dict[str, str]],
     orden_propiedades: List[str],
@@ -1008,7 +3439,22 @@ def _escribir_hoja_df(ws, df: pd.DataFrame) -> None:
         ws.column_dimensions[col[0].column_letter].width = min(max(10, max_len + 2), 45)
 
 
-def build_excel(result: ValidationResult) -> bytes:
+_COLUMNAS_PEOR = ["Propiedad", "Semaforo", "Corte_peor", "Error_peor", "Umbral_peor"]
+
+
+def build_excel(result: ValidationResult, detail: Optional[str] = None) -> bytes:
+    """
+    Informe Excel: hoja Resumen y, según `detail` (por defecto el de
+    `result`), una hoja por crudo con todo su detalle ("full"), una sola
+    hoja "Peor corte" con el semáforo y peor corte de cada propiedad de todos
+    los crudos ("worst") o nada más ("none").
+    """
+    detail = result.detail if detail is None else detail
+    _validar_detail(detail)
+    if NIVELES_DETALLE.index(detail) > NIVELES_DETALLE.index(result.detail):
+        raise ValueError(
+            f"El resultado se calculó con detail={result.detail!r}: no se puede exportar con detail={detail!r}."
+        )
     wb  = Workbook()
     ws0 = wb.active
     ws0.title = "Resumen"
@@ -1022,12 +3468,25 @@ def build_excel(result: ValidationResult) -> bytes:
         for j in range(2, 2 + len(todos_crudos)):
             add_conditional_formatting_text(ws0, f"{get_column_letter(j)}2:{get_column_letter(j)}{end_row}")
 
-    for crude_name in result.paired_names:
-        df_out = result.crudo_dataframes.get(crude_name, pd.DataFrame())
-        ws = wb.create_sheet(title=crude_name[:31])
-        _escribir_hoja_df(ws, df_out)
-        if df_out.shape[0] > 0:
-            add_conditional_formatting_text(ws, f"B2:B{df_out.shape[0] + 1}")
+    if detail == "worst":
+        peores = []
+        for crude_name in result.paired_names:
+            df_out = result.crudo_dataframes.get(crude_name)
+            if df_out is not None and len(df_out) > 0:
+                peores.append(df_out[_COLUMNAS_PEOR].assign(Crudo=crude_name)[["Crudo", *_COLUMNAS_PEOR]])
+        df_peor = pd.concat(peores, ignore_index=True) if peores else pd.DataFrame(columns=["Crudo", *_COLUMNAS_PEOR])
+        ws = wb.create_sheet(title="Peor corte")
+        _escribir_hoja_df(ws, df_peor)
+        if df_peor.shape[0] > 0:
+            add_conditional_formatting_text(ws, f"C2:C{df_peor.shape[0] + 1}")
+
+    if detail == "full":
+        for crude_name in result.paired_names:
+            df_out = result.crudo_dataframes.get(crude_name, pd.DataFrame())
+            ws = wb.create_sheet(title=crude_name[:31])
+            _escribir_hoja_df(ws, df_out)
+            if df_out.shape[0] > 0:
+                add_conditional_formatting_text(ws, f"B2:B{df_out.shape[0] + 1}")
 
     buf = io.BytesIO()
     wb.save(buf)
@@ -0,0 +1,151 @@
+"""
+tests/test_cabecera_xlsx.py
+===========================
+Tests de la lectura mínima de .xlsx (cabecera + una columna) frente a openpyxl.
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import io
+import zipfile
+
+import openpyxl
+import pytest
+
+from core.cabecera_xlsx import FormatoNoSoportado, LibroXlsx
+
+_CONTENT_TYPES = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">\n'
+    b'<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>\n'
+    b'<Default Extension="xml" ContentType="application/xml"/>\n'
+    b'<Override PartName="/xl/workbook.xml"'
+    b' ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>\n'
+    b'<Override PartName="/xl/worksheets/sheet1.xml"'
+    b' ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>\n'
+    b'<Override PartName="/xl/worksheets/sheet2.xml"'
+    b' ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>\n'
+    b'<Override PartName="/xl/sharedStrings.xml"'
+    b' ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sharedStrings+xml"/>\n'
+    b'</Types>'
+)
+
+_RELS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\n'
+    b'<Relationship Id="rId1"'
+    b' Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"'
+    b' Target="xl/workbook.xml"/>\n'
+    b'</Relationships>'
+)
+
+_WORKBOOK = b"""<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+ xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="Maya" sheetId="1" r:id="rId1"/><sheet name="Brent &amp; Co" sheetId="2" r:id="rId2"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = (
+    b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    b'<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">\n'
+    b'<Relationship Id="rId1"'
+    b' Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"'
+    b' Target="worksheets/sheet1.xml"/>\n'
+    b'<Relationship Id="rId2"'
+    b' Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"'
+    b' Target="/xl/worksheets/sheet2.xml"/>\n'
+    b'<Relationship Id="rId3"'
+    b' Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/sharedStrings"'
+    b' Target="sharedStrings.xml"/>\n'
+    b'</Relationships>'
+)
+
+# Como las escribe Excel: texto enriquecido en varios runs y lectura fonética
+_CADENAS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<sst xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" count="5" uniqueCount="5">
+<si><t>Propiedad</t></si>
+<si><t>150-200</t></si>
+<si><r><rPr><b/></rPr><t>Densi</t></r><r><t xml:space="preserve">dad </t></r></si>
+<si><t>Azufre &amp; Na</t><rPh sb="0" eb="1"><t>ア</t></rPh></si>
+<si><t>Viscosidad ñ</t></si>
+</sst>""".encode("utf-8")
+
+
+def _hoja(filas: str, dimension: str = "A1:D5") -> bytes:
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        f'<dimension ref="{dimension}"/><sheetData>{filas}</sheetData></worksheet>'
+    ).encode("utf-8")
+
+
+def _libro(hoja1: bytes, hoja2: bytes = b"") -> bytes:
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as zf:
+        zf.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        zf.writestr("_rels/.rels", _RELS)
+        zf.writestr("xl/workbook.xml", _WORKBOOK)
+        zf.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        zf.writestr("xl/sharedStrings.xml", _CADENAS)
+        zf.writestr("xl/worksheets/sheet1.xml", hoja1)
+        zf.writestr("xl/worksheets/sheet2.xml", hoja2 or _hoja("", "A1"))
+    return buf.getvalue()
+
+
+_FILAS = (
+    '<row r="1"><c r="A1" t="s"><v>0</v></c><c r="B1" t="s"><v>1</v></c>'
+    '<c r="C1"><v>350</v></c><c r="D1" t="b"><v>1</v></c></row>'
+    '<row r="2"><c r="A2" t="s"><v>2</v></c><c r="B2"><v>850.5</v></c><c r="C2" t="e"><v>#DIV/0!</v></c></row>'
+    '<row r="3"><c r="A3" t="s" s="1"><v>3</v></c><c r="B3"><f>B2*2</f><v>1701</v></c></row>'
+    '<row r="4"><c r="A4" t="str"><f>"Visc"&amp;"osidad"</f><v>Viscosidad</v></c></row>'
+    '<row r="5"><c r="A5" s="2"/><c r="B5" t="inlineStr"><is><t>x &lt; 1</t></is></c></row>'
+    '<row r="6"><c r="A6" s="2"/></row>'
+)
+
+
+def _openpyxl(datos: bytes, hoja: int = 0):
+    wb = openpyxl.load_workbook(io.BytesIO(datos), read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[hoja]
+        ws.reset_dimensions()
+        return [list(f) for f in ws.iter_rows(values_only=True)]
+    finally:
+        wb.close()
+
+
+class TestLibroXlsx:
+
+    def test_hojas(self):
+        with LibroXlsx(io.BytesIO(_libro(_hoja(_FILAS)))) as libro:
+            assert [n for n, _r in libro.hojas] == ["Maya", "Brent & Co"]
+            assert [r for _n, r in libro.hojas] == ["xl/worksheets/sheet1.xml", "xl/worksheets/sheet2.xml"]
+
+    def test_igual_que_openpyxl(self):
+        datos = _libro(_hoja(_FILAS))
+        filas = _openpyxl(datos)
+        with LibroXlsx(io.BytesIO(datos)) as libro:
+            hoja = libro.hoja(0)
+            assert hoja.fila(1) == filas[0]
+            assert hoja.ultima_fila() == 5
+            assert hoja.ancho_declarado() == 4
+            assert hoja.columna(0) == [f[0] for f in filas[1:5]]
+            assert hoja.columna(1, desde=1) == [f[1] if len(f) > 1 else None for f in filas[:5]]
+        assert filas[1][0] == "Densidad " and filas[2][0] == "Azufre & Na"
+
+    def test_hoja_vacia(self):
+        with LibroXlsx(io.BytesIO(_libro(_hoja(_FILAS)))) as libro:
+            hoja = libro.hoja(1)
+            assert hoja.fila(1) == [] and hoja.ultima_fila() == 0 and hoja.columna(0) == []
+
+    def test_celdas_sin_referencia_no_soportadas(self):
+        datos = _libro(_hoja('<row><c t="s"><v>0</v></c></row>'))
+        with LibroXlsx(io.BytesIO(datos)) as libro:
+            with pytest.raises(FormatoNoSoportado):
+                libro.hoja(0)
+
+    def test_paquete_sin_libro(self):
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("otro.txt", b"x")
+        with pytest.raises(FormatoNoSoportado):
+            LibroXlsx(io.BytesIO(buf.getvalue()))
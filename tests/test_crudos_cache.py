@@ -0,0 +1,45 @@
+"""
+tests/test_crudos_cache.py
+==========================
+Tests de la caché de resultados por crudo (revalidación incremental).
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import pytest
+
+from core.crudos_cache import CacheCrudos
+
+
+class TestCacheCrudos:
+
+    def test_acierto_y_fallo(self):
+        cache = CacheCrudos()
+        assert cache.obtener("a") is None
+        valor = object()
+        cache.guardar("a", valor)
+        assert cache.obtener("a") is valor
+        stats = cache.estadisticas()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_expulsion_lru(self):
+        cache = CacheCrudos(max_entradas=2)
+        cache.guardar("a", 1)
+        cache.guardar("b", 2)
+        cache.obtener("a")                      # "a" pasa a ser la más reciente
+        cache.guardar("c", 3)
+        assert cache.obtener("b") is None
+        assert cache.obtener("a") == 1 and cache.obtener("c") == 3
+        assert cache.estadisticas()["evictions"] == 1 and len(cache) == 2
+
+    def test_limpiar(self):
+        cache = CacheCrudos()
+        cache.guardar("a", 1)
+        cache.obtener("a")
+        cache.limpiar()
+        assert len(cache) == 0 and cache.estadisticas()["hits"] == 0
+
+    def test_max_entradas_invalido(self):
+        with pytest.raises(ValueError):
+            CacheCrudos(max_entradas=0)
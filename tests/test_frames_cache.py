@@ -0,0 +1,155 @@
+"""
+tests/test_frames_cache.py
+==========================
+Tests de la caché de DataFrames parseados (memoria + disco Arrow).
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.frames_cache import (
+    CacheDataFrames,
+    CacheFeather,
+    apto_arrow,
+    directorio_frames_por_defecto,
+    ENV_CACHE_FRAMES_DIR,
+)
+from core.fuente_archivo import FuenteArchivo
+from core.validator_core import ProyeccionColumnas, clave_cache_frame
+
+
+def _clave(n: int) -> str:
+    return f"{n:064x}"
+
+
+def _df(n: int = 100) -> pd.DataFrame:
+    return pd.DataFrame({"Propiedad": [f"P{i}" for i in range(n)], "150-200": [float(i) for i in range(n)]})
+
+
+class TestCacheDataFrames:
+
+    def test_acierto_y_fallo(self):
+        cache = CacheDataFrames()
+        assert cache.obtener(_clave(1)) is None
+        df = _df()
+        df.attrs["dialecto_csv"] = {"sep": ";"}
+        cache.guardar(_clave(1), df)
+        recuperado = cache.obtener(_clave(1))
+        pd.testing.assert_frame_equal(recuperado, df)
+        assert recuperado is not df and recuperado.attrs == df.attrs
+        stats = cache.estadisticas()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+        assert stats["hit_rate"] == 0.5
+
+    def test_expulsion_lru_por_bytes(self):
+        tam = int(_df().memory_usage(index=True, deep=True).sum())
+        cache = CacheDataFrames(max_bytes=2 * tam)
+        cache.guardar(_clave(1), _df())
+        cache.guardar(_clave(2), _df())
+        cache.obtener(_clave(1))                # 1 pasa a ser la más reciente
+        cache.guardar(_clave(3), _df())
+        assert cache.obtener(_clave(2)) is None
+        assert cache.obtener(_clave(1)) is not None and cache.obtener(_clave(3)) is not None
+        stats = cache.estadisticas()
+        assert stats["evictions"] == 1 and stats["bytes"] <= stats["max_bytes"]
+
+    def test_demasiado_grande_no_se_guarda_en_memoria(self):
+        cache = CacheDataFrames(max_bytes=10)
+        cache.guardar(_clave(1), _df())
+        assert len(cache) == 0 and cache.estadisticas()["evictions"] == 0
+
+    def test_max_bytes_invalido(self):
+        with pytest.raises(ValueError):
+            CacheDataFrames(max_bytes=0)
+
+    def test_limpiar(self):
+        cache = CacheDataFrames()
+        cache.guardar(_clave(1), _df())
+        cache.obtener(_clave(1))
+        cache.limpiar()
+        assert len(cache) == 0 and cache.estadisticas()["hits"] == 0
+
+
+class TestCacheFeather:
+
+    def test_nivel_en_disco(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        df = _df()
+        df.attrs["dialecto_csv"] = {"sep": ";", "decimal": ","}
+        CacheDataFrames(disco=CacheFeather(tmp_path)).guardar(_clave(1), df)
+        assert list(tmp_path.glob("*.arrow"))
+
+        nueva = CacheDataFrames(disco=CacheFeather(tmp_path))     # otra sesión: memoria vacía
+        recuperado = nueva.obtener(_clave(1))
+        pd.testing.assert_frame_equal(recuperado, df)
+        assert recuperado.attrs == df.attrs
+        assert nueva.estadisticas()["hits_disco"] == 1
+        nueva.obtener(_clave(1))
+        assert nueva.estadisticas()["hits"] == 1                  # ya promovido a memoria
+
+    @pytest.mark.parametrize("nulo", [None, np.nan])
+    def test_texto_object_a_disco(self, tmp_path, nulo):
+        """pandas 2.x lee el texto como object: también va a disco y vuelve igual."""
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({
+            "Propiedad": pd.Series(["Densidad", nulo, "Azufre"], dtype=object),
+            "Unidad":    pd.Series([nulo] * 3, dtype=object),
+            "150-200":   [1.0, 2.0, 3.0],
+        })
+        assert apto_arrow(df)
+        CacheDataFrames(disco=CacheFeather(tmp_path)).guardar(_clave(1), df)
+        assert list(tmp_path.glob("*.arrow"))
+        recuperado = CacheDataFrames(disco=CacheFeather(tmp_path)).obtener(_clave(1))
+        pd.testing.assert_frame_equal(recuperado, df)
+        celda = recuperado["Propiedad"].iloc[1]
+        assert celda is nulo or (nulo is not None and np.isnan(celda))
+
+    def test_nulos_mezclados_no_arrow(self):
+        df = pd.DataFrame({"Propiedad": pd.Series(["Densidad", None, np.nan], dtype=object)})
+        assert not apto_arrow(df)
+
+    def test_no_arrow_solo_en_memoria(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({"Propiedad": ["Densidad", 1, None], 150: [1.0, 2.0, 3.0]})
+        assert not apto_arrow(df)
+        cache = CacheDataFrames(disco=CacheFeather(tmp_path))
+        cache.guardar(_clave(1), df)
+        assert not list(tmp_path.glob("*.arrow"))
+        assert cache.obtener(_clave(1)) is not None
+
+    def test_entrada_corrupta_es_fallo(self, tmp_path):
+        pytest.importorskip("pyarrow")
+        (tmp_path / f"{_clave(1)}.arrow").write_bytes(b"no es arrow")
+        cache = CacheDataFrames(disco=CacheFeather(tmp_path))
+        assert cache.obtener(_clave(1)) is None
+        assert not list(tmp_path.glob("*.arrow"))
+
+    def test_directorio_por_env(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(ENV_CACHE_FRAMES_DIR, str(tmp_path))
+        assert directorio_frames_por_defecto() == tmp_path
+
+
+class TestClaveCacheFrame:
+
+    def test_depende_del_contenido_no_del_nombre(self):
+        a, b = FuenteArchivo.desde(b"Propiedad;150\nX;1\n"), FuenteArchivo.desde(b"Propiedad;150\nX;2\n")
+        proy = ProyeccionColumnas()
+        assert clave_cache_frame(a, "ISA_A.csv", proy) == clave_cache_frame(a, "ISA_B.csv", proy)
+        assert clave_cache_frame(a, "ISA_A.csv", proy) != clave_cache_frame(b, "ISA_A.csv", proy)
+
+    def test_depende_de_las_opciones(self):
+        f = FuenteArchivo.desde(io.BytesIO(b"Propiedad;150\nX;1\n"))
+        claves = {
+            clave_cache_frame(f, "a.csv", None),
+            clave_cache_frame(f, "a.csv", ProyeccionColumnas()),
+            clave_cache_frame(f, "a.csv", ProyeccionColumnas(cortes=frozenset({"150"}))),
+            clave_cache_frame(f, "a.xls", ProyeccionColumnas()),
+        }
+        assert len(claves) == 4
+        assert clave_cache_frame(f, "a.csv", ProyeccionColumnas(cortes=frozenset({"150", "200"}))) == \
+               clave_cache_frame(f, "a.csv", ProyeccionColumnas(cortes=frozenset({"200", "150"})))
@@ -0,0 +1,189 @@
+"""
+tests/test_fuente_archivo.py
+============================
+Tests del acceso sin copias a los archivos subidos (memoria / spool a disco).
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import io
+import os
+import pickle
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pytest
+
+from core.fuente_archivo import FuenteArchivo, abrir_fuente, miembros_zip
+from core.validator_core import read_file, read_file_with_sheet, run_validation
+
+
+class TestFuenteArchivo:
+
+    def test_bytesio_sin_copia(self):
+        buf = io.BytesIO(b"cabecera;datos")
+        buf.seek(9)
+        fuente = FuenteArchivo.desde(buf, "a.csv")
+        assert fuente.ruta is None
+        assert bytes(fuente.vista()) == b"datos"
+        with pytest.raises(BufferError):
+            buf.write(b"x" * 100)           # la vista comparte el buffer original
+        fuente.cerrar()
+        buf.write(b"x" * 100)               # liberado al cerrar
+        assert fuente.cerrada
+
+    def test_bytes_sin_copia(self):
+        datos = b"abc" * 10
+        fuente = FuenteArchivo.desde(datos, "a.csv")
+        assert fuente.como_bytes() is datos
+        assert fuente.cabeza(4) == b"abca"
+
+    def test_lectores_independientes(self):
+        fuente = FuenteArchivo.desde(b"0123456789")
+        a, b = fuente.abrir(), fuente.abrir()
+        assert a.read(3) == b"012"
+        assert b.read() == b"0123456789"
+        a.seek(-2, io.SEEK_END)
+        assert a.read(10) == b"89"
+        destino = bytearray(4)
+        b.seek(1)
+        assert b.readinto(destino) == 4 and destino == b"1234"
+        with pytest.raises(OSError):
+            a.seek(-20, io.SEEK_END)
+
+    def test_lector_mantiene_viva_la_fuente(self):
+        lector = FuenteArchivo.desde(b"abc").abrir()
+        assert lector.read() == b"abc"
+
+    def test_stream_grande_a_disco(self):
+        fuente = FuenteArchivo.desde(io.BufferedReader(io.BytesIO(b"x" * 100)), "g.csv", umbral_spool=10)
+        ruta = fuente.ruta
+        assert ruta is not None and os.path.exists(ruta)
+        assert fuente.tamano == 100 and fuente.abrir().read(3) == b"xxx"
+        fuente.cerrar()
+        assert not os.path.exists(ruta)
+
+    def test_stream_pequeno_en_memoria(self):
+        fuente = FuenteArchivo.desde(io.BufferedReader(io.BytesIO(b"x" * 10)), umbral_spool=10)
+        assert fuente.ruta is None and fuente.tamano == 10
+
+    def test_pickle_en_disco_viaja_como_ruta(self):
+        fuente = FuenteArchivo.desde(io.BufferedReader(io.BytesIO(b"y" * 50)), "g.csv", umbral_spool=10)
+        datos = pickle.dumps(fuente)
+        assert len(datos) < 50 + 100 and fuente.ruta.encode() in datos
+        copia = pickle.loads(datos)
+        assert copia.abrir().read() == b"y" * 50
+        copia.cerrar()                      # la copia no borra el temporal
+        assert os.path.exists(fuente.ruta)
+        fuente.cerrar()
+
+    def test_pickle_en_memoria(self):
+        copia = pickle.loads(pickle.dumps(FuenteArchivo.desde(b"abc", "m.csv")))
+        assert copia.nombre == "m.csv" and copia.abrir().read() == b"abc"
+
+    def test_abrir_fuente_no_cierra_ajenas(self):
+        fuente = FuenteArchivo.desde(b"abc")
+        with abrir_fuente(fuente) as f:
+            assert f is fuente
+        assert not fuente.cerrada
+        with abrir_fuente(b"abc") as f:
+            pass
+        assert f.cerrada
+
+
+class TestMiembrosZip:
+
+    @staticmethod
+    def _zip(miembros) -> zipfile.ZipFile:
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for nombre, datos in miembros.items():
+                zf.writestr(nombre, datos)
+        return zipfile.ZipFile(FuenteArchivo.desde(buf.getvalue()).abrir())
+
+    def test_filtra_y_quita_carpetas(self):
+        zf = self._zip({
+            "lote/ISA_Maya.xlsx": b"a",
+            "lote/sub/RAMS_Maya.CSV": b"b",
+            "lote/leeme.txt": b"c",
+            "__MACOSX/lote/._ISA_Maya.xlsx": b"d",
+            "lote/.oculto.csv": b"e",
+        })
+        miembros = miembros_zip(zf, {".xlsx", ".xls", ".csv"})
+        assert [m.nombre for m in miembros] == ["ISA_Maya.xlsx", "RAMS_Maya.CSV"]
+        assert miembros[1].ruta_en_zip == "lote/sub/RAMS_Maya.CSV"
+
+    def test_extraer_a_memoria_o_disco(self):
+        zf = self._zip({"a.csv": b"x" * 100})
+        miembro = miembros_zip(zf, {".csv"})[0]
+        with miembro.extraer() as fuente:
+            assert fuente.ruta is None and fuente.abrir().read() == b"x" * 100
+        with miembro.extraer(umbral_spool=10) as fuente:
+            assert fuente.ruta is not None and fuente.tamano == 100
+
+    def test_extraccion_concurrente(self):
+        contenidos = {f"f{i}.csv": os.urandom(1000) * 50 for i in range(8)}
+        miembros = miembros_zip(self._zip(contenidos), {".csv"})
+        with ThreadPoolExecutor(4) as hilos:
+            fuentes = list(hilos.map(lambda m: m.extraer(), miembros))
+        assert {f.nombre: f.como_bytes() for f in fuentes} == contenidos
+
+
+class TestLecturaDesdeFuente:
+
+    @pytest.fixture
+    def df(self) -> pd.DataFrame:
+        return pd.DataFrame({"Propiedad": ["Densidad", "Azufre"], "150-200": [850.0, 0.1]})
+
+    @pytest.mark.parametrize("spool", [False, True])
+    def test_xlsx_y_csv(self, df, spool):
+        buf = io.BytesIO()
+        df.to_excel(buf, index=False)
+        csv = df.to_csv(index=False, sep=";", decimal=",").encode()
+        for nombre, datos in (("a.xlsx", buf.getvalue()), ("a.csv", csv)):
+            umbral = 1 if spool else len(datos)
+            with FuenteArchivo.desde(io.BufferedReader(io.BytesIO(datos)), nombre, umbral) as fuente:
+                assert (fuente.ruta is not None) == spool
+                pd.testing.assert_frame_equal(read_file(fuente, nombre), df)
+                pd.testing.assert_frame_equal(read_file_with_sheet(fuente, nombre), df)
+
+    def test_xls_desde_disco(self, df):
+        xlwt = pytest.importorskip("xlwt")
+        libro = xlwt.Workbook()
+        hoja = libro.add_sheet("a")
+        for j, c in enumerate(df.columns):
+            hoja.write(0, j, c)
+            for i, v in enumerate(df[c], start=1):
+                hoja.write(i, j, v)
+        buf = io.BytesIO()
+        libro.save(buf)
+        with FuenteArchivo.desde(io.BufferedReader(io.BytesIO(buf.getvalue())), "a.xls", 1) as fuente:
+            pd.testing.assert_frame_equal(read_file(fuente, "a.xls"), df)
+
+    def test_pipeline_con_fuentes_paralelo(self, df):
+        buf = io.BytesIO()
+        df.to_excel(buf, index=False)
+        matriz = pd.DataFrame({
+            "Propiedad": ["DENSIDAD", "DENSIDAD"],
+            "Tipo": ["Reproductibilidad", "Admisible"],
+            "150-200": [2.0, 4.0],
+        })
+        buf_m = io.BytesIO()
+        matriz.to_excel(buf_m, index=False)
+
+        def _ejecutar(workers):
+            with FuenteArchivo.desde(io.BufferedReader(io.BytesIO(buf.getvalue())), "ISA_Maya.xlsx", 1) as isa:
+                result = run_validation(
+                    isa_files={"ISA_Maya.xlsx": isa},
+                    rams_files={"RAMS_Maya.xlsx": FuenteArchivo.desde(buf.getvalue())},
+                    matriz_file=FuenteArchivo.desde(buf_m.getvalue()),
+                    matriz_filename="m.xlsx",
+                    workers=workers,
+                )
+                assert not isa.cerrada      # las fuentes del llamante no se cierran
+            return result
+
+        serie, paralelo = _ejecutar(1), _ejecutar(2)
+        assert serie.paired_names == paralelo.paired_names == ["Maya"]
+        pd.testing.assert_frame_equal(serie.crudo_dataframes["Maya"], paralelo.crudo_dataframes["Maya"])
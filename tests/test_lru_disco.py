@@ -0,0 +1,52 @@
+"""
+tests/test_lru_disco.py
+=======================
+Tests de la caché LRU en disco común a las cachés de umbrales y de DataFrames.
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import pytest
+
+from core.frames_cache import CacheFeather
+from core.lru_disco import LRUDisco
+from core.umbrales_cache import CacheUmbrales
+
+
+class _Texto(LRUDisco):
+    sufijo = ".txt"
+
+    def _volcar(self, valor, fh):
+        fh.write(valor.encode("utf-8"))
+
+    def _cargar(self, fh):
+        return fh.read().decode("utf-8")
+
+
+def _clave(n: int) -> str:
+    return f"{n:064x}"
+
+
+class TestLRUDisco:
+
+    def test_formato_de_la_subclase(self, tmp_path):
+        cache = _Texto(tmp_path, max_entradas=2, max_bytes=1024)
+        cache.guardar(_clave(1), "hola")
+        assert cache.obtener(_clave(1)) == "hola"
+        assert (tmp_path / f"{_clave(1)}.txt").read_text() == "hola"
+
+    def test_expulsion_por_entradas(self, tmp_path):
+        cache = _Texto(tmp_path, max_entradas=2, max_bytes=1024)
+        for n in range(3):
+            cache.guardar(_clave(n), str(n))
+        assert len(cache) == 2
+
+    def test_limites_invalidos(self, tmp_path):
+        with pytest.raises(ValueError):
+            _Texto(tmp_path, max_entradas=0, max_bytes=1)
+        with pytest.raises(ValueError):
+            _Texto(tmp_path, max_entradas=1, max_bytes=0)
+
+    def test_umbrales_y_frames_no_dependen_entre_si(self):
+        assert issubclass(CacheUmbrales, LRUDisco) and issubclass(CacheFeather, LRUDisco)
+        assert not issubclass(CacheFeather, CacheUmbrales)
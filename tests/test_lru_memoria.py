@@ -0,0 +1,46 @@
+"""
+tests/test_lru_memoria.py
+=========================
+Tests del LRU en memoria común a las cachés de DataFrames y de crudos.
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+from core.lru_memoria import LRUMemoria
+
+
+class _PorLongitud(LRUMemoria):
+    def _peso(self, valor):
+        return len(valor)
+
+
+class TestLRUMemoria:
+
+    def test_por_numero_de_entradas(self):
+        cache = LRUMemoria(2)
+        for clave in "abc":
+            cache.guardar(clave, clave.upper())
+        assert cache.obtener("a") is None and cache.obtener("c") == "C"
+        stats = cache.estadisticas()
+        assert (stats["hits"], stats["misses"], stats["evictions"], stats["size"]) == (1, 1, 1, 2)
+
+    def test_por_peso(self):
+        cache = _PorLongitud(5)
+        cache.guardar("a", "xx")
+        cache.guardar("b", "xxx")
+        cache.obtener("a")                      # "a" pasa a ser la más reciente
+        cache.guardar("c", "x")
+        assert cache.obtener("b") is None and len(cache) == 2
+
+    def test_reemplazar_descuenta_el_peso_anterior(self):
+        cache = _PorLongitud(5)
+        cache.guardar("a", "xxxx")
+        cache.guardar("a", "x")
+        cache.guardar("b", "xxxx")
+        assert cache.obtener("a") == "x" and cache.estadisticas()["evictions"] == 0
+
+    def test_no_cabe_sola(self):
+        cache = _PorLongitud(3)
+        cache.guardar("a", "x")
+        cache.guardar("b", "xxxx")
+        assert cache.obtener("b") is None and cache.obtener("a") == "x"
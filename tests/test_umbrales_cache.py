@@ -0,0 +1,78 @@
+"""
+tests/test_umbrales_cache.py
+============================
+Tests de la caché en disco de umbrales compilados.
+Ejecutar con: pytest -q
+"""
+from __future__ import annotations
+
+import os
+
+import pytest
+
+from core.umbrales_cache import CacheUmbrales, directorio_cache_por_defecto, ENV_CACHE_DIR
+from core.validator_core import UmbralesCompilados, clave_cache_umbrales, crear_semantica_alias
+
+
+@pytest.fixture
+def umbrales() -> UmbralesCompilados:
+    return UmbralesCompilados({("DENSIDAD", "150-200"): (2.0, 4.0)})
+
+
+def _clave(n: int) -> str:
+    return f"{n:064x}"
+
+
+class TestCacheUmbrales:
+
+    def test_guardar_y_obtener(self, tmp_path, umbrales):
+        cache = CacheUmbrales(tmp_path)
+        assert cache.obtener(_clave(1)) is None
+        cache.guardar(_clave(1), umbrales)
+        recuperado = cache.obtener(_clave(1))
+        assert isinstance(recuperado, UmbralesCompilados)
+        assert recuperado == umbrales
+
+    def test_entrada_corrupta_es_fallo(self, tmp_path):
+        cache = CacheUmbrales(tmp_path)
+        (tmp_path / f"{_clave(1)}.pkl").write_bytes(b"no es un pickle")
+        assert cache.obtener(_clave(1)) is None
+        assert len(cache) == 0
+
+    def test_expulsa_la_menos_usada(self, tmp_path, umbrales):
+        cache = CacheUmbrales(tmp_path, max_entradas=2)
+        for n in (1, 2):
+            cache.guardar(_clave(n), umbrales)
+            os.utime(tmp_path / f"{_clave(n)}.pkl", (n, n))
+        cache.obtener(_clave(1))            # refresca la 1: la 2 pasa a ser la más antigua
+        cache.guardar(_clave(3), umbrales)
+        assert cache.obtener(_clave(2)) is None
+        assert cache.obtener(_clave(1)) is not None
+        assert cache.obtener(_clave(3)) is not None
+
+    def test_limite_de_bytes(self, tmp_path, umbrales):
+        cache = CacheUmbrales(tmp_path, max_bytes=1)
+        cache.guardar(_clave(1), umbrales)
+        cache.guardar(_clave(2), umbrales)
+        assert len(cache) == 1               # la última siempre se conserva
+
+    def test_clave_invalida(self, tmp_path):
+        with pytest.raises(ValueError):
+            CacheUmbrales(tmp_path).obtener("../fuera")
+
+    def test_directorio_por_entorno(self, tmp_path, monkeypatch):
+        monkeypatch.setenv(ENV_CACHE_DIR, str(tmp_path))
+        assert directorio_cache_por_defecto() == tmp_path
+        assert CacheUmbrales().directorio == tmp_path
+
+
+class TestClaveCacheUmbrales:
+
+    def test_depende_de_contenido_hoja_y_alias(self):
+        alias = crear_semantica_alias()
+        base = clave_cache_umbrales(b"abc", "m.xlsx", None, alias)
+        assert base == clave_cache_umbrales(b"abc", "otro_nombre.xlsx", None, alias)
+        assert base != clave_cache_umbrales(b"abd", "m.xlsx", None, alias)
+        assert base != clave_cache_umbrales(b"abc", "m.xlsx", "Hoja2", alias)
+        assert base != clave_cache_umbrales(b"abc", "m.csv", None, alias)
+        assert base != clave_cache_umbrales(b"abc", "m.xlsx", None, {**alias, "X": "Y"})
@@ -15,6 +15,7 @@ import io
 import pytest
 import pandas as pd
 import numpy as np
+import openpyxl
 
 from core.models import ThresholdConfig, ValidationResult
 from core.validator_core import (
@@ -22,28 +23,57 @@ from core.validator_core import (
     strip_accents,
     canon_prop,
     canon_corte,
+    canon_prop_series,
+    canon_corte_index,
+    estadisticas_canonizacion,
+    limpiar_cache_canonizacion,
     # Emparejamiento
     _nombre_base_crudo,
     pair_files,
     # Lectura
     read_file,
+    read_file_with_sheet,
+    leer_libro,
+    leer_cabeceras,
+    preflight,
+    detectar_formato,
+    detectar_dialecto_csv,
+    _serializar_df,
+    _deserializar_df,
+    DialectoCSV,
+    ProyeccionColumnas,
     # Reglas de evaluación
     es_corte_pesado,
     _buscar_umbrales,
     _prop_base_para_umbral,
     clasificar_propiedad,
+    clasificar_matriz,
+    ESTADO_NO_NUMERICO,
+    ESTADO_SIN_UMBRAL,
+    ESTADO_VERDE,
+    ESTADO_AMARILLO,
+    ESTADO_ROJO,
     # Umbrales
     detectar_columna_tipo,
     normalizar_tipo,
     construir_umbrales,
+    compilar_umbrales,
+    UmbralesCompilados,
     crear_semantica_alias,
+    alias_propiedades,
+    ENV_ALIAS_FILE,
     # Pipeline
     calcular_errores_crudo_df,
+    plantilla_archivo,
+    detectar_cortes_en_df,
+    _df_desde_columnas,
     _sem_global_por_crudo,
     _build_summary_df,
     validate_params,
     build_excel,
     run_validation,
+    iter_validation,
+    reaggregate,
     # Alias compat
     canonize_name,
     validate_thresholds,
@@ -198,6 +228,53 @@ class TestCanonProp:
         assert canon_prop("---") == ""
 
 
+class TestAliasPropiedades:
+
+    def test_tabla_compartida_e_inmutable(self, monkeypatch):
+        monkeypatch.delenv(ENV_ALIAS_FILE, raising=False)
+        alias = alias_propiedades()
+        assert alias is alias_propiedades()
+        assert alias["RENDIMIENTO"] == "PESO"
+        with pytest.raises(TypeError):
+            alias["X"] = "Y"
+        copia = crear_semantica_alias()
+        copia["X"] = "Y"
+        assert "X" not in alias_propiedades()
+
+    @pytest.mark.parametrize("nombre,contenido", [
+        ("alias.json", '{"Dens. rel. 15/4": "densidad", "Ni": "Níquel total"}'),
+        ("alias.csv",  "alias,propiedad\nDens. rel. 15/4,densidad\nNi,Níquel total\n"),
+        ("alias.yaml", "Dens. rel. 15/4: densidad\nNi: Níquel total\n"),
+    ])
+    def test_archivo_externo(self, tmp_path, nombre, contenido):
+        if nombre.endswith(".yaml"):
+            pytest.importorskip("yaml")             # PyYAML es opcional (no está en requirements.txt)
+        ruta = tmp_path / nombre
+        ruta.write_text(contenido, encoding="utf-8")
+        alias = alias_propiedades(ruta)
+        assert canon_prop("Dens rel 15/4", alias) == "DENSIDAD"
+        assert alias["NI"] == "NIQUEL TOTAL"          # el archivo tiene prioridad
+        assert alias["RENDIMIENTO"] == "PESO"         # se conservan los del código
+
+    def test_recarga_solo_si_cambia(self, tmp_path, monkeypatch):
+        ruta = tmp_path / "alias.json"
+        ruta.write_text('{"A1": "AZUFRE"}', encoding="utf-8")
+        monkeypatch.setenv(ENV_ALIAS_FILE, str(ruta))
+        primera = alias_propiedades()
+        assert alias_propiedades() is primera
+        ruta.write_text('{"A22": "AZUFRE"}', encoding="utf-8")
+        segunda = alias_propiedades()
+        assert "A22" in segunda and "A1" not in segunda
+
+    def test_archivo_invalido(self, tmp_path):
+        ruta = tmp_path / "alias.json"
+        ruta.write_text("[1, 2]", encoding="utf-8")
+        with pytest.raises(ValueError, match="alias"):
+            alias_propiedades(ruta)
+        with pytest.raises(ValueError, match="alias"):
+            alias_propiedades(tmp_path / "no_existe.json")
+
+
 # ===========================================================================
 # 3. Tests canon_corte
 # ===========================================================================
@@ -223,6 +300,49 @@ class TestCanonCorte:
         assert canon_corte(None) == ""
 
 
+class TestCanonSeries:
+
+    def test_canon_prop_series_igual_que_por_celda(self, alias_prop):
+        serie = pd.Series(["Densidad", "Ni", None, 1, 1.0, True, "Densidad", ""], index=list("abcdefgh"))
+        out = canon_prop_series(serie, alias_prop)
+        assert out.index.equals(serie.index)
+        assert out.tolist() == [canon_prop(v, alias_prop) for v in serie.tolist()]
+
+    def test_canon_prop_series_una_vez_por_valor(self, alias_prop):
+        limpiar_cache_canonizacion()
+        canon_prop_series(pd.Series(["Azufre"] * 1000 + ["Densidad"] * 1000), alias_prop)
+        assert estadisticas_canonizacion()["canon_prop"]["misses"] == 2
+
+    def test_canon_corte_index(self):
+        cols = pd.Index(["Propiedad", "150 – 200", "200-250 ºC", None])
+        assert canon_corte_index(cols).tolist() == [canon_corte(c) for c in cols]
+        assert canon_corte_index([]).tolist() == []
+
+
+class TestCacheCanonizacion:
+
+    def test_aciertos_en_etiquetas_repetidas(self):
+        limpiar_cache_canonizacion()
+        for _ in range(3):
+            canon_corte("150 – 200 ºC")
+            canon_prop("Densidad a 15ºC")
+        stats = estadisticas_canonizacion()
+        assert stats["canon_corte"]["misses"] == 1
+        assert stats["canon_corte"]["hits"] == 2
+        assert stats["canon_prop"]["hit_rate"] == pytest.approx(2 / 3)
+
+    def test_limpiar_reinicia_contadores(self):
+        canon_corte("200-250")
+        limpiar_cache_canonizacion()
+        assert estadisticas_canonizacion()["canon_corte"]["size"] == 0
+
+    def test_valores_no_texto(self):
+        assert canon_corte(None) == ""
+        assert canon_prop(None) == ""
+        assert canon_corte(150) == "150"
+        assert strip_accents(1.5) == "1.5"
+
+
 # ===========================================================================
 # 4. Tests es_corte_pesado
 # ===========================================================================
@@ -309,6 +429,14 @@ class TestPairFiles:
         paired, u_isa, u_rams = pair_files([], [])
         assert paired == {}
 
+    def test_hojas_por_nombre_de_hoja(self):
+        isa  = ["[Lote_ISA.xlsx]Maya 1.5", "[Lote_ISA.xlsx]ISA_Brent"]
+        rams = ["[Lote_RAMS.xlsx]RAMS_Maya 1.5", "RAMS_Brent.xlsx"]
+        hojas = {isa[0]: "Maya 1.5", isa[1]: "ISA_Brent", rams[0]: "RAMS_Maya 1.5"}
+        paired, u_isa, u_rams = pair_files(isa, rams, hojas)
+        assert paired == {"Maya 1.5": (isa[0], rams[0]), "Brent": (isa[1], rams[1])}
+        assert not u_isa and not u_rams
+
 
 # ===========================================================================
 # 7. Tests read_file
@@ -334,6 +462,237 @@ class TestReadFile:
         with pytest.raises(ValueError):
             read_file(io.BytesIO(b"not an excel"), "corrupt.xlsx")
 
+    def test_xlsx_igual_que_read_excel(self):
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        filas = [
+            ["Propiedad", "150-200", "150-200", None, 350],
+            ["Densidad", 850.5, "851,5", "#DIV/0!", 3.0],
+            [None, None, None, None, None],
+            ["NA", "N/A", True, 1, None],
+            ["Azufre", "0.1", 2, None, None],
+        ]
+        for fila in filas:
+            ws.append(fila)
+        buf = io.BytesIO()
+        wb.save(buf)
+        df = read_file(io.BytesIO(buf.getvalue()), "isa.xlsx")
+        pd.testing.assert_frame_equal(df, pd.read_excel(io.BytesIO(buf.getvalue()), engine="openpyxl"))
+        assert list(df.columns) == ["Propiedad", "150-200", "150-200.1", "Unnamed: 3", 350]
+
+    def test_csv_dialecto_en_attrs(self, simple_isa):
+        csv = simple_isa.to_csv(index=False, sep=";", decimal=",").encode()
+        df  = read_file(io.BytesIO(csv), "test.csv")
+        assert df.attrs["dialecto_csv"] == {
+            "sep": ";", "decimal": ",", "thousands": ".", "encoding": "utf-8-sig",
+        }
+        assert df["150-200"].tolist() == [850.0, 5.0, 0.10]
+
+    def test_csv_coma_con_punto_decimal(self, simple_isa):
+        csv = simple_isa.to_csv(index=False).encode()
+        df  = read_file(io.BytesIO(csv), "test.csv")
+        pd.testing.assert_frame_equal(df, simple_isa)
+
+
+class TestLeerLibro:
+
+    @staticmethod
+    def _libro(hojas) -> bytes:
+        buf = io.BytesIO()
+        with pd.ExcelWriter(buf, engine="openpyxl") as writer:
+            for nombre, df in hojas.items():
+                df.to_excel(writer, sheet_name=nombre, index=False)
+        return buf.getvalue()
+
+    def test_todas_las_hojas(self, simple_isa, simple_rams):
+        datos = self._libro({"Maya": simple_isa, "Vacia": pd.DataFrame(), "Brent": simple_rams})
+        hojas = leer_libro(io.BytesIO(datos), "lote.xlsx")
+        assert list(hojas) == ["Maya", "Brent"]
+        pd.testing.assert_frame_equal(hojas["Maya"], read_file(io.BytesIO(datos), "lote.xlsx"))
+        pd.testing.assert_frame_equal(hojas["Brent"], simple_rams)
+
+    def test_min_hojas(self, isa_bytes):
+        assert leer_libro(io.BytesIO(isa_bytes), "a.xlsx", min_hojas=2) is None
+        assert list(leer_libro(io.BytesIO(isa_bytes), "a.xlsx")) == ["Sheet1"]
+
+    def test_xls(self, simple_isa):
+        xlwt = pytest.importorskip("xlwt")
+        libro = xlwt.Workbook()
+        for nombre in ("Maya", "Brent"):
+            hoja = libro.add_sheet(nombre)
+            for j, c in enumerate(simple_isa.columns):
+                hoja.write(0, j, c)
+                for i, v in enumerate(simple_isa[c], start=1):
+                    hoja.write(i, j, v)
+        buf = io.BytesIO()
+        libro.save(buf)
+        hojas = leer_libro(io.BytesIO(buf.getvalue()), "lote.xls")
+        assert list(hojas) == ["Maya", "Brent"]
+        pd.testing.assert_frame_equal(hojas["Brent"], simple_isa)
+
+    def test_csv_no_es_libro(self):
+        with pytest.raises(ValueError, match="no es un libro"):
+            leer_libro(io.BytesIO(b"Propiedad;150\nX;1\n"), "a.csv")
+
+
+class TestProyeccionColumnas:
+
+    @staticmethod
+    def _xlsx(filas) -> bytes:
+        wb = openpyxl.Workbook()
+        ws = wb.active
+        for fila in filas:
+            ws.append(fila)
+        buf = io.BytesIO()
+        wb.save(buf)
+        return buf.getvalue()
+
+    def test_incluye(self):
+        proy = ProyeccionColumnas(cortes=frozenset({"150-200"}))
+        assert proy.incluye("Propiedad")
+        assert proy.incluye(" 150 - 200 ")
+        assert not proy.incluye("200-250")
+        assert not proy.incluye("Unidad")
+        assert not proy.incluye("Validación Auto")
+        assert ProyeccionColumnas().incluye("200-250")
+
+    def test_xlsx_igual_que_lectura_completa(self):
+        datos = self._xlsx([
+            ["Unidad", "Propiedad", "150-200", "150-200", None, 350, "Validación"],
+            ["kg/m3", "Densidad", 850.5, "851,5", 1, 3.0, "OK"],
+            [None, None, None, None, None, None, None],
+            ["%", "Azufre", "#DIV/0!", 2, None, None, None, 7, 8],
+        ])
+        completo = read_file(io.BytesIO(datos), "isa.xlsx")
+        proy = ProyeccionColumnas()
+        df = read_file(io.BytesIO(datos), "isa.xlsx", proy)
+        esperado = completo[[c for c in completo.columns if proy.incluye(c)]]
+        assert list(df.columns) == [
+            "Propiedad", "150-200", "150-200.1", "Unnamed: 4", 350, "Unnamed: 7", "Unnamed: 8",
+        ]
+        pd.testing.assert_frame_equal(df, esperado)
+
+    def test_csv_usecols_conserva_nombres(self):
+        csv = b"Unidad;Propiedad;150-200;200-250;150-200\nkg;Densidad;1,5;2,5;3,5\n"
+        df = read_file(io.BytesIO(csv), "rams.csv",
+                       ProyeccionColumnas(cortes=frozenset({"150-200", "150-200.1"})))
+        assert list(df.columns) == ["Propiedad", "150-200", "150-200.1"]
+        assert df.iloc[0].tolist() == ["Densidad", 1.5, 3.5]
+        assert df.attrs["dialecto_csv"]["sep"] == ";"
+
+    def test_xls_proyectado(self, simple_rams):
+        xlwt = pytest.importorskip("xlwt")
+        libro = xlwt.Workbook()
+        hoja = libro.add_sheet("RAMS")
+        cabecera = ["Unidad"] + list(simple_rams.columns)
+        for j, nombre in enumerate(cabecera):
+            hoja.write(0, j, nombre)
+        for i, fila in enumerate(simple_rams.itertuples(index=False), start=1):
+            hoja.write(i, 0, "u")
+            for j, v in enumerate(fila, start=1):
+                hoja.write(i, j, v)
+        buf = io.BytesIO()
+        libro.save(buf)
+        df = read_file(io.BytesIO(buf.getvalue()), "rams.xls",
+                       ProyeccionColumnas(cortes=frozenset({"150-200", "300-350"})))
+        pd.testing.assert_frame_equal(df, simple_rams[["Propiedad", "150-200", "300-350"]])
+
+
+class TestSerializarDf:
+
+    def test_arrow_sin_perdida(self, isa_bytes):
+        pytest.importorskip("pyarrow")
+        df = read_file(io.BytesIO(isa_bytes), "isa.xlsx")
+        df.attrs["origen"] = "isa"
+        formato, payload = _serializar_df(df)
+        assert formato == "arrow" and isinstance(payload, bytes)
+        pd.testing.assert_frame_equal(_deserializar_df(formato, payload, dict(df.attrs)), df)
+
+    def test_texto_object_por_arrow(self):
+        """Texto object con NaN, como lo lee pandas 2.x: también por Arrow y sin cambios."""
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({
+            "Propiedad": pd.Series(["Densidad", np.nan, "Azufre"], dtype=object),
+            "150-200":   [850.0, np.nan, 0.1],
+        })
+        formato, payload = _serializar_df(df)
+        assert formato == "arrow"
+        pd.testing.assert_frame_equal(_deserializar_df(formato, payload, {}), df)
+
+    def test_objetos_mixtos_por_pickle(self):
+        df = pd.DataFrame({"Propiedad": ["Densidad", 1, None], 150: [1.0, 2.0, 3.0]})
+        formato, payload = _serializar_df(df)
+        assert formato == "pickle"
+        assert _deserializar_df(formato, payload, {}) is df
+
+
+class TestDetectarFormato:
+
+    def test_firmas(self):
+        assert detectar_formato(b"PK\x03\x04\x14\x00", ".xls") == ".xlsx"
+        assert detectar_formato(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".xlsx") == ".xls"
+        assert detectar_formato(b"PK\x03\x04", ".csv") == ".xlsx"
+
+    def test_sin_firma_respeta_extension(self):
+        assert detectar_formato(b"Propiedad;150-200", ".csv") == ".csv"
+        assert detectar_formato(b"not an excel", ".xlsx") == ".xlsx"
+        assert detectar_formato(b"\x09\x00\x04\x00", ".xls") == ".xls"
+
+    def test_xlsx_con_extension_xls(self, simple_isa, isa_bytes, monkeypatch):
+        pd.testing.assert_frame_equal(read_file(io.BytesIO(isa_bytes), "ISA_Maya.xls"), simple_isa)
+
+        llamadas = []
+        original = pd.read_excel
+
+        def _contar(*args, **kwargs):
+            llamadas.append(kwargs.get("engine"))
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(pd, "read_excel", _contar)
+        df = read_file_with_sheet(io.BytesIO(isa_bytes), "Errores_Cortes.xls")
+        pd.testing.assert_frame_equal(df, simple_isa)
+        assert llamadas == ["openpyxl"]             # un solo parseo, con el motor correcto
+
+    def test_xls_con_extension_xlsx(self, simple_isa):
+        xlwt = pytest.importorskip("xlwt")
+        libro = xlwt.Workbook()
+        hoja = libro.add_sheet("ISA")
+        for j, c in enumerate(simple_isa.columns):
+            hoja.write(0, j, c)
+            for i, v in enumerate(simple_isa[c], start=1):
+                hoja.write(i, j, v)
+        buf = io.BytesIO()
+        libro.save(buf)
+        pd.testing.assert_frame_equal(read_file(io.BytesIO(buf.getvalue()), "ISA_Maya.xlsx"), simple_isa)
+
+    def test_texto_con_extension_excel_falla(self):
+        with pytest.raises(ValueError, match="No se pudo leer"):
+            read_file_with_sheet(io.BytesIO(b"not an excel"), "matriz.xls")
+
+
+class TestDetectarDialectoCsv:
+
+    @pytest.mark.parametrize("texto,esperado", [
+        ("Propiedad;150-200\nDensidad;850,5\n",      DialectoCSV(";", ",", ".", "utf-8-sig")),
+        ("Propiedad,150-200\nDensidad,850.5\n",      DialectoCSV(",", ".", None, "utf-8-sig")),
+        ("Propiedad\t150-200\nDensidad\t1.234\n",   DialectoCSV("\t", ",", ".", "utf-8-sig")),
+        ("Propiedad|150-200\nDensidad|\"1,5\"\n",    DialectoCSV("|", ",", ".", "utf-8-sig")),
+    ])
+    def test_separador_y_decimal(self, texto, esperado):
+        assert detectar_dialecto_csv(texto.encode("utf-8")) == esperado
+
+    def test_encoding_windows(self):
+        muestra = "Propiedad;150-200\nPeso específico;850,5\n".encode("cp1252")
+        assert detectar_dialecto_csv(muestra).encoding == "cp1252"
+        df = read_file(io.BytesIO(muestra), "rams.csv")
+        assert df["Propiedad"].tolist() == ["Peso específico"]
+
+    def test_muestra_solo_cabecera(self):
+        texto = "Propiedad;150-200\n" + "Densidad;850,5\n" * 20_000
+        df = read_file(io.BytesIO(texto.encode()), "grande.csv")
+        assert df.shape == (20_000, 2)
+        assert df.attrs["dialecto_csv"]["sep"] == ";"
+
 
 # ===========================================================================
 # 8. Tests construir_umbrales — nuevo formato (repro, admisible)
@@ -374,6 +733,17 @@ class TestConstruirUmbrales:
         assert repro is None
         assert admis == 4.0
 
+    def test_cabecera_numerica_es_corte(self, alias_prop):
+        """Una cabecera 300 (numérica en Excel) es un corte, con la misma clave que en el ISA."""
+        df = pd.DataFrame({
+            "Propiedad": ["DENSIDAD", "DENSIDAD"],
+            "Tipo":      ["Reproductibilidad", "Admisible"],
+            300:         [2.0, 4.0],
+        })
+        umbrales = construir_umbrales(df, alias_prop)
+        (_nombre, corte), = detectar_cortes_en_df(pd.DataFrame(columns=["Propiedad", 300]))
+        assert umbrales[("DENSIDAD", corte)] == (2.0, 4.0)
+
     def test_no_propiedad_col_raises(self, alias_prop):
         df = pd.DataFrame({"Tipo": ["Repro"], "150-200": [1.0]})
         with pytest.raises(ValueError, match="'Propiedad'"):
@@ -406,6 +776,29 @@ class TestConstruirUmbrales:
         assert repro == 2.0
         assert admis is None   # "Comentario" no se procesa
 
+    def test_propiedad_vacia_hereda_la_anterior(self, alias_prop):
+        """Celdas combinadas en Excel llegan como NaN: se hereda la propiedad."""
+        df = pd.DataFrame({
+            "Propiedad": ["DENSIDAD", np.nan, "AZUFRE", None],
+            "Tipo":      ["Reproductibilidad", "Admisible", "REPET", "Admisible"],
+            "150-200":   [2.0, 4.0, 0.05, 0.10],
+        })
+        umbrales = construir_umbrales(df, alias_prop)
+        assert umbrales[("DENSIDAD", "150-200")] == (2.0, 4.0)
+        assert umbrales[("AZUFRE", "150-200")] == (0.05, 0.10)
+        assert len(umbrales) == 2
+
+    def test_texto_y_cortes_equivalentes(self, alias_prop):
+        """Coma decimal, texto no numérico ignorado y máximo entre columnas del mismo corte."""
+        df = pd.DataFrame({
+            "Propiedad": ["DENSIDAD", "DENSIDAD"],
+            "Tipo":      ["Reproductibilidad", "Admisible"],
+            "150-200":   ["2,5", "n.d."],
+            "150 – 200": ["1.0", " 4,0 "],
+        })
+        umbrales = construir_umbrales(df, alias_prop)
+        assert umbrales == {("DENSIDAD", "150-200"): (2.5, 4.0)}
+
 
 # ===========================================================================
 # 9. Tests clasificar_propiedad — nueva lógica REPRO / ADMISIBLE
@@ -592,6 +985,87 @@ class TestClasificarPropiedad:
         assert estados["300-350"] == "ROJO"
 
 
+class TestClasificarMatriz:
+
+    def test_estados_y_conteos(self):
+        nan = np.nan
+        errores = np.array([
+            [1.0, 3.0, 5.0, nan],
+            [0.5, 0.5, 9.0, 1.0],
+        ])
+        repro = np.array([[2.0, 2.0, 2.0, 2.0], [1.0, 1.0, nan, nan]])
+        admis = np.array([[4.0, 4.0, 4.0, 4.0], [2.0, 2.0, nan, nan]])
+        lote = clasificar_matriz(errores, repro, admis, np.array([True, True]), 0.9, 0.3)
+        assert lote.estados[0].tolist() == [ESTADO_VERDE, ESTADO_AMARILLO, ESTADO_ROJO, ESTADO_NO_NUMERICO]
+        assert lote.estados[1].tolist() == [ESTADO_VERDE, ESTADO_VERDE, ESTADO_SIN_UMBRAL, ESTADO_SIN_UMBRAL]
+        assert lote.n_verde.tolist() == [1, 2]
+        assert lote.n_amarillo.tolist() == [1, 0]
+        assert lote.n_rojo.tolist() == [1, 0]
+        assert lote.semaforos == ["ROJO", "VERDE"]
+
+    def test_peor_corte_por_ratio(self):
+        errores = np.array([[1.0, 1.5, 1.5]])
+        repro   = np.array([[2.0, 1.0, 1.0]])
+        admis   = np.full((1, 3), np.nan)
+        lote = clasificar_matriz(errores, repro, admis, np.array([True]), 0.9, 0.3)
+        assert lote.corte_peor[0] == 1            # empate 1.5/1.0: gana el primero
+        assert lote.error_peor[0] == 1.5
+        assert lote.umbral_peor[0] == 1.0
+
+    def test_sin_umbral_ni_valores(self):
+        errores = np.array([[np.nan], [1.0]])
+        vacio   = np.full((2, 1), np.nan)
+        lote = clasificar_matriz(errores, vacio, vacio, np.array([True, False]), 0.9, 0.3)
+        assert lote.semaforos == ["", "NA"]
+        assert lote.corte_peor.tolist() == [-1, -1]
+        assert lote.ratio_peor.tolist() == [-1.0, -1.0]
+
+
+class TestUmbralesCompilados:
+
+    def test_construir_devuelve_compilado(self, alias_prop):
+        df = pd.DataFrame({
+            "Propiedad": ["DENSIDAD", "DENSIDAD"],
+            "Tipo":      ["Reproductibilidad", "Admisible"],
+            "150-200":   [2.0, 4.0],
+        })
+        umbrales = construir_umbrales(df, alias_prop)
+        assert isinstance(umbrales, UmbralesCompilados)
+        assert compilar_umbrales(umbrales) is umbrales
+
+    def test_solo_lectura(self, simple_umbrales):
+        indice = compilar_umbrales(simple_umbrales)
+        with pytest.raises(TypeError):
+            indice[("AZUFRE", "150-200")] = (1.0, 2.0)
+        with pytest.raises(ValueError):
+            indice.repro[0, 0] = 1.0
+
+    def test_matrices_alineadas(self, simple_umbrales):
+        indice = compilar_umbrales(simple_umbrales)
+        repro, admis, tiene = indice.matrices(["AZUFRE", "OTRA"], ["200-250", "999-1000"])
+        assert repro[0, 0] == 0.05 and admis[0, 0] == 0.10
+        assert np.isnan(repro[0, 1]) and np.isnan(repro[1]).all()
+        assert tiene.tolist() == [True, False]
+
+    def test_fallback_peso_acumulado(self):
+        indice = compilar_umbrales({
+            ("PESO",            "150-200"): (1.0, 2.0),
+            ("PESO",            "200-250"): (1.0, 2.0),
+            ("PESO ACUMULADO",  "200-250"): (None, 5.0),
+        })
+        repro, admis, tiene = indice.matrices(["PESO ACUMULADO"], ["150-200", "200-250"])
+        assert repro[0, 0] == 1.0 and admis[0, 0] == 2.0   # heredado de PESO
+        assert np.isnan(repro[0, 1]) and admis[0, 1] == 5.0  # clave propia, sin mezclar
+        assert tiene.tolist() == [True]
+
+    def test_pickle(self, simple_umbrales):
+        import pickle
+        indice = pickle.loads(pickle.dumps(compilar_umbrales(simple_umbrales)))
+        assert isinstance(indice, UmbralesCompilados)
+        assert dict(indice) == simple_umbrales
+        assert indice.tiene_umbral("DENSIDAD")
+
+
 # ===========================================================================
 # 10. Tests _sem_global_por_crudo
 # ===========================================================================
@@ -724,6 +1198,128 @@ class TestCalcularErroresCrudoDf:
         )
         assert df_out["Semaforo"].iloc[0] == "ROJO"
 
+    def test_texto_con_coma_decimal(self, alias_prop):
+        """Valores de texto con coma decimal se convierten igual que con _float_or_none."""
+        isa  = pd.DataFrame({"Propiedad": ["Densidad"], "150-200": ["850,5"]})
+        rams = pd.DataFrame({"Propiedad": ["Densidad"], "150-200": [851.0]})
+        umbrales = {("DENSIDAD", "150-200"): (2.0, 4.0)}
+        df_out, _, _ = calcular_errores_crudo_df(
+            df_isa=isa, df_rams=rams,
+            umbrales=umbrales, alias_prop=alias_prop,
+            pct_ok_amarillo=0.9, pct_rojo_rojo=0.3,
+            hoja_resumen={}, crude_name="test",
+        )
+        assert df_out["150-200"].iloc[0] == pytest.approx(0.5)
+
+    def test_no_numerico_y_corte_ausente_en_rams(self, alias_prop):
+        """Texto no convertible o corte sin columna RAMS → error None."""
+        isa  = pd.DataFrame({"Propiedad": ["Densidad"], "150-200": ["n/d"], "200-250": [860.0]})
+        rams = pd.DataFrame({"Propiedad": ["Densidad"], "150-200": [851.0]})
+        df_out, _, _ = calcular_errores_crudo_df(
+            df_isa=isa, df_rams=rams,
+            umbrales={}, alias_prop=alias_prop,
+            pct_ok_amarillo=0.9, pct_rojo_rojo=0.3,
+            hoja_resumen={}, crude_name="test",
+        )
+        assert df_out["150-200"].iloc[0] is None
+        assert df_out["200-250"].iloc[0] is None
+        assert df_out["Semaforo"].iloc[0] == ""
+
+    def test_alinea_por_propiedad_canonica(self, alias_prop):
+        """Las filas RAMS se alinean por propiedad canónica, no por posición."""
+        isa  = pd.DataFrame({"Propiedad": ["Densidad", "Azufre"], "150-200": [850.0, 0.10]})
+        rams = pd.DataFrame({"Propiedad": ["Azufre total", "DENSIDAD"], "150-200": [0.13, 853.0]})
+        df_out, _, orden = calcular_errores_crudo_df(
+            df_isa=isa, df_rams=rams,
+            umbrales={}, alias_prop=alias_prop,
+            pct_ok_amarillo=0.9, pct_rojo_rojo=0.3,
+            hoja_resumen={}, crude_name="test",
+        )
+        assert orden == ["DENSIDAD", "AZUFRE"]
+        assert df_out["150-200"].tolist() == pytest.approx([3.0, 0.03])
+
+
+class TestPlantillaArchivo:
+
+    @staticmethod
+    def _df(props, valor=1.0):
+        return pd.DataFrame({"Propiedad": props, "Unidad": "kg", "150 – 200 ºC": valor, "200-250": valor})
+
+    def test_igual_que_sin_cache(self, alias_prop):
+        df = self._df(["Densidad", None, "Azufre (%)", float("nan"), "Densidad"])
+        plantilla = plantilla_archivo(df, alias_prop)
+        assert list(plantilla.cortes) == detectar_cortes_en_df(df) == [
+            ("150 – 200 ºC", "150-200C"),
+            ("200-250", "200-250"),
+        ]
+        assert dict(plantilla.mapa_cortes) == {"150-200C": "150 – 200 ºC", "200-250": "200-250"}
+        assert list(plantilla.propiedades) == canon_prop_series(df["Propiedad"], alias_prop).tolist()
+        assert dict(plantilla.indice_prop) == {p: i for i, p in enumerate(plantilla.propiedades) if p}
+        assert plantilla.indice_prop["DENSIDAD"] == 4
+
+    def test_misma_plantilla_una_vez(self, alias_prop):
+        limpiar_cache_canonizacion()
+        props = ["Densidad", "Azufre"]
+        primera = plantilla_archivo(self._df(props, 1.0), alias_prop)
+        assert plantilla_archivo(self._df(props, 2.0), alias_prop) is primera
+        assert plantilla_archivo(self._df(props + ["Ni"]), alias_prop) is not primera
+        stats = estadisticas_canonizacion()["plantilla"]
+        assert (stats["hits"], stats["misses"]) == (1, 2)
+
+    def test_nombres_cabecera_memo(self, isa_bytes):
+        limpiar_cache_canonizacion()
+        read_file(io.BytesIO(isa_bytes), "ISA_A.xlsx")
+        read_file(io.BytesIO(isa_bytes), "ISA_B.xlsx")
+        stats = estadisticas_canonizacion()["nombres_cabecera"]
+        assert stats["hits"] >= 1 and stats["maxsize"] == 256
+        limpiar_cache_canonizacion()
+        assert estadisticas_canonizacion()["nombres_cabecera"]["size"] == 0
+
+    def test_alias_distinto_no_comparte(self, alias_prop):
+        df = self._df(["Densidad"])
+        otro = {**alias_prop, "DENSIDAD": "DENS"}
+        assert plantilla_archivo(df, otro).propiedades == ("DENS",)
+        assert plantilla_archivo(df, alias_prop).propiedades == ("DENSIDAD",)
+
+    def test_sin_columna_propiedad(self, alias_prop):
+        plantilla = plantilla_archivo(pd.DataFrame({"150-200": [1.0]}), alias_prop)
+        assert plantilla.propiedades == () and not plantilla.indice_prop
+
+
+class TestDfDesdeColumnas:
+
+    def test_igual_que_append_por_filas(self):
+        """
+        El acumulador columnar da los mismos valores que df_out.loc[len(df_out)] = fila.
+        Con pandas 2.x el append por filas convertía el None de un corte sin
+        valor en NaN; el columnar conserva None en ambas versiones.
+        """
+        filas = [
+            {"Propiedad": "Densidad", "Semaforo": "VERDE", "150-200": 1.5, "200-250": None},
+            {"Propiedad": "Azufre",   "Semaforo": "",      "150-200": 0.2, "200-250": 0.3},
+        ]
+        cols = ["Propiedad", "Semaforo", "150-200", "200-250"]
+        esperado = pd.DataFrame(columns=cols)
+        for fila in filas:
+            esperado.loc[len(esperado)] = fila
+        df = _df_desde_columnas([(c, [f[c] for f in filas]) for c in cols])
+        assert list(df.columns) == cols
+
+        def _celdas(d: pd.DataFrame):
+            return [[None if pd.isna(v) else v for v in fila] for fila in d.values.tolist()]
+
+        assert _celdas(df) == _celdas(esperado)
+        assert df["200-250"].iloc[0] is None
+
+    def test_conserva_none_y_infiere_float(self):
+        df = _df_desde_columnas([("a", [1.0, None]), ("b", np.array([1.0, 2.0]))])
+        assert df["a"].iloc[1] is None
+        assert df["b"].dtype == np.float64
+
+    def test_sin_filas(self):
+        df = _df_desde_columnas([("Propiedad", []), ("150-200", np.array([]))])
+        assert df.shape == (0, 2)
+
 
 # ===========================================================================
 # 12. Tests validate_params
@@ -774,6 +1370,50 @@ class TestBuildSummaryDf:
         assert "Brent" in df.columns
 
 
+class TestReaggregate:
+
+    @staticmethod
+    def _ejecutar(isa_bytes, rams_bytes, matriz_bytes, rams_otro, **kwargs):
+        return run_validation(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes), "ISA_Brent.xlsx": io.BytesIO(isa_bytes)},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes), "RAMS_Brent.xlsx": io.BytesIO(rams_otro)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+            **kwargs,
+        )
+
+    @pytest.mark.parametrize("pct_ok, pct_rojo", [(0.5, 0.3), (0.9, 0.0), (1.0, 1.0)])
+    def test_igual_que_run_validation(self, isa_bytes, rams_bytes, matriz_bytes, simple_rams, pct_ok, pct_rojo):
+        buf = io.BytesIO()
+        simple_rams.assign(**{"150-200": simple_rams["150-200"] + 5.0}).to_excel(buf, index=False)
+        base = self._ejecutar(isa_bytes, rams_bytes, matriz_bytes, buf.getvalue())
+        esperado = self._ejecutar(
+            isa_bytes, rams_bytes, matriz_bytes, buf.getvalue(),
+            pct_ok_amarillo=pct_ok, pct_rojo_rojo=pct_rojo,
+        )
+        resumen_base = {p: dict(m) for p, m in base.resumen_raw.items()}
+
+        nuevo = reaggregate(base, pct_ok, pct_rojo)
+        assert nuevo.resumen_raw == esperado.resumen_raw
+        assert (nuevo.pct_ok_amarillo, nuevo.pct_rojo_rojo) == (pct_ok, pct_rojo)
+        pd.testing.assert_frame_equal(nuevo.summary, esperado.summary)
+        for name in esperado.paired_names:
+            pd.testing.assert_frame_equal(nuevo.crudo_dataframes[name], esperado.crudo_dataframes[name])
+        assert base.resumen_raw == resumen_base          # el original no cambia
+
+    def test_conteos_por_fila(self, isa_bytes, rams_bytes, matriz_bytes):
+        result = self._ejecutar(isa_bytes, rams_bytes, matriz_bytes, rams_bytes)
+        conteos = result.conteos_cortes["Maya"]
+        assert len(conteos) == len(result.crudo_dataframes["Maya"])
+        densidad = next(c for c in conteos if c.propiedad == "DENSIDAD")
+        assert (densidad.verde, densidad.amarillo, densidad.rojo, densidad.validos) == (2, 1, 0, 3)
+
+    def test_parametros_invalidos(self, isa_bytes, rams_bytes, matriz_bytes):
+        result = self._ejecutar(isa_bytes, rams_bytes, matriz_bytes, rams_bytes)
+        with pytest.raises(ValueError):
+            reaggregate(result, 1.5, 0.3)
+
+
 # ===========================================================================
 # 14. Tests build_excel
 # ===========================================================================
@@ -830,6 +1470,29 @@ class TestBuildExcelMVP:
         headers = [ws.cell(1, j).value for j in range(1, ws.max_column + 1)]
         assert "Semaforo" in headers
 
+    def test_detail_worst_una_hoja(self, alias_prop, simple_isa, simple_rams, simple_umbrales):
+        import openpyxl
+        result = self._make_result(alias_prop, simple_isa, simple_rams, simple_umbrales)
+        wb = openpyxl.load_workbook(io.BytesIO(build_excel(result, detail="worst")))
+        assert wb.sheetnames == ["Resumen", "Peor corte"]
+        ws = wb["Peor corte"]
+        assert [c.value for c in ws[1]] == ["Crudo", "Propiedad", "Semaforo", "Corte_peor", "Error_peor", "Umbral_peor"]
+        assert ws.max_row == len(result.crudo_dataframes["Maya"]) + 1 and ws.cell(2, 1).value == "Maya"
+
+    def test_detail_none_solo_resumen(self, alias_prop, simple_isa, simple_rams, simple_umbrales):
+        import openpyxl
+        result = self._make_result(alias_prop, simple_isa, simple_rams, simple_umbrales)
+        wb = openpyxl.load_workbook(io.BytesIO(build_excel(result, detail="none")))
+        assert wb.sheetnames == ["Resumen"]
+
+    def test_detail_mayor_que_el_calculado(self, alias_prop, simple_isa, simple_rams, simple_umbrales):
+        result = self._make_result(alias_prop, simple_isa, simple_rams, simple_umbrales)
+        result.detail = "worst"
+        with pytest.raises(ValueError, match="detail"):
+            build_excel(result, detail="full")
+        with pytest.raises(ValueError, match="detail"):
+            build_excel(result, detail="todo")
+
 
 # ===========================================================================
 # 15. Tests run_validation (pipeline completo)
@@ -907,9 +1570,624 @@ class TestRunValidation:
         sem_densidad = result.resumen_raw.get("DENSIDAD", {}).get("T")
         assert sem_densidad == "VERDE"
 
+    def test_pipeline_registra_dialecto_csv(self, simple_isa, simple_rams, matriz_bytes):
+        result = run_validation(
+            isa_files={"ISA_Maya.csv": io.BytesIO(simple_isa.to_csv(index=False, sep=";", decimal=",").encode())},
+            rams_files={"RAMS_Maya.csv": io.BytesIO(simple_rams.to_csv(index=False).encode())},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+        assert result.dialectos_csv["ISA_Maya.csv"]["sep"] == ";"
+        assert result.dialectos_csv["RAMS_Maya.csv"]["decimal"] == "."
+
+    def test_pipeline_paralelo_igual_que_serie(self, isa_bytes, rams_bytes, matriz_bytes, simple_isa):
+        def _ejecutar(workers):
+            return run_validation(
+                isa_files={
+                    "ISA_Maya.xlsx":  io.BytesIO(isa_bytes),
+                    "ISA_Brent.csv":  io.BytesIO(simple_isa.to_csv(index=False, sep=";", decimal=",").encode()),
+                    "ISA_Roto.xlsx":  io.BytesIO(b"not an excel"),
+                },
+                rams_files={
+                    "RAMS_Maya.xlsx":  io.BytesIO(rams_bytes),
+                    "RAMS_Brent.xlsx": io.BytesIO(rams_bytes),
+                    "RAMS_Roto.xlsx":  io.BytesIO(rams_bytes),
+                },
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                workers=workers,
+            )
+
+        serie, paralelo = _ejecutar(1), _ejecutar(2)
+        assert paralelo.paired_names == serie.paired_names == ["Brent", "Maya"]
+        assert paralelo.unpaired_isa == serie.unpaired_isa
+        assert any("ISA_Roto.xlsx [ERROR:" in u for u in paralelo.unpaired_isa)
+        assert paralelo.dialectos_csv == serie.dialectos_csv
+        pd.testing.assert_frame_equal(paralelo.summary, serie.summary)
+        for name in serie.paired_names:
+            pd.testing.assert_frame_equal(paralelo.crudo_dataframes[name], serie.crudo_dataframes[name])
+
+    @pytest.mark.parametrize("modo", ["hilos", "procesos"])
+    def test_evaluacion_concurrente_igual_que_serie(self, isa_bytes, rams_bytes, matriz_bytes, simple_isa, modo):
+        grande = pd.concat([simple_isa] * 20, ignore_index=True).to_csv(index=False).encode()
+
+        def _ejecutar(modo_evaluacion, workers):
+            return run_validation(
+                isa_files={
+                    "ISA_Maya.xlsx":   io.BytesIO(isa_bytes),
+                    "ISA_Brent.csv":   io.BytesIO(simple_isa.to_csv(index=False, sep=";", decimal=",").encode()),
+                    "ISA_Zafiro.csv":  io.BytesIO(grande),
+                    "ISA_Roto.xlsx":   io.BytesIO(b"not an excel"),
+                },
+                rams_files={
+                    "RAMS_Maya.xlsx":   io.BytesIO(rams_bytes),
+                    "RAMS_Brent.xlsx":  io.BytesIO(rams_bytes),
+                    "RAMS_Zafiro.xlsx": io.BytesIO(rams_bytes),
+                    "RAMS_Roto.xlsx":   io.BytesIO(rams_bytes),
+                },
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                workers=workers,
+                modo_evaluacion=modo_evaluacion,
+            )
+
+        serie, concurrente = _ejecutar("serie", 1), _ejecutar(modo, 2)
+        assert concurrente.paired_names == serie.paired_names == ["Brent", "Maya", "Zafiro"]
+        assert concurrente.unpaired_isa == serie.unpaired_isa
+        assert concurrente.orden_propiedades == serie.orden_propiedades
+        assert concurrente.resumen_raw == serie.resumen_raw
+        assert list(concurrente.resumen_raw) == list(serie.resumen_raw)
+        assert concurrente.dialectos_csv == serie.dialectos_csv
+        pd.testing.assert_frame_equal(concurrente.summary, serie.summary)
+        for name in serie.paired_names:
+            pd.testing.assert_frame_equal(concurrente.crudo_dataframes[name], serie.crudo_dataframes[name])
+
+    def test_mayores_primero(self):
+        from core.validator_core import HojaLibro, LibroDiferido, _mayores_primero
+        pares = [("A", ("a", "ra")), ("B", ("b", "rb")), ("C", ("c", "rc")), ("D", ("d", "rd"))]
+        libro = LibroDiferido(b"x" * 200, "lote.xlsx", hojas=2)
+        isa  = {"a": b"x" * 10, "b": io.BytesIO(b"x" * 50), "c": b"x" * 10, "d": HojaLibro(libro, "D")}
+        rams = {"ra": b"", "rb": b"", "rc": b"", "rd": b""}
+        assert [c for c, _ in _mayores_primero(pares, isa, rams)] == ["D", "B", "A", "C"]
+
+    def test_modo_evaluacion_invalido(self, isa_bytes, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="modo_evaluacion"):
+            run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                modo_evaluacion="gpu",
+            )
+
+    def test_cache_crudos_solo_recalcula_lo_que_cambia(self, isa_bytes, rams_bytes, matriz_bytes, simple_rams):
+        from core.crudos_cache import CacheCrudos
+        otro = simple_rams.assign(**{"150-200": simple_rams["150-200"] + 5.0})
+        buf = io.BytesIO()
+        otro.to_excel(buf, index=False)
+
+        def _ejecutar(rams_brent, cache=None, **kwargs):
+            return run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes), "ISA_Brent.xlsx": io.BytesIO(isa_bytes)},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes), "RAMS_Brent.xlsx": io.BytesIO(rams_brent)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                cache_crudos=cache,
+                **kwargs,
+            )
+
+        cache = CacheCrudos()
+        primera = _ejecutar(rams_bytes, cache)
+        assert primera.crudos_recalculados == ["Brent", "Maya"] and primera.crudos_reutilizados == []
+        primera.crudo_dataframes["Maya"]["Nota"] = "revisado"    # el llamante edita su resultado
+
+        segunda = _ejecutar(buf.getvalue(), cache)
+        assert segunda.crudos_reutilizados == ["Maya"] and segunda.crudos_recalculados == ["Brent"]
+        nueva = _ejecutar(buf.getvalue())
+        assert segunda.paired_names == nueva.paired_names
+        assert segunda.resumen_raw == nueva.resumen_raw
+        pd.testing.assert_frame_equal(segunda.summary, nueva.summary)
+        for name in nueva.paired_names:
+            pd.testing.assert_frame_equal(segunda.crudo_dataframes[name], nueva.crudo_dataframes[name])
+
+        # Otros porcentajes: se reutiliza todo y se reagrega
+        tercera = _ejecutar(buf.getvalue(), cache, pct_ok_amarillo=0.5)
+        assert tercera.crudos_reutilizados == ["Brent", "Maya"]
+        nueva = _ejecutar(buf.getvalue(), pct_ok_amarillo=0.5)
+        assert tercera.resumen_raw == nueva.resumen_raw != segunda.resumen_raw
+        pd.testing.assert_frame_equal(tercera.summary, nueva.summary)
+        for name in nueva.paired_names:
+            pd.testing.assert_frame_equal(tercera.crudo_dataframes[name], nueva.crudo_dataframes[name])
+
+        # Otra tolerancia → otra clave: nada se reutiliza
+        cuarta = _ejecutar(buf.getvalue(), cache, tol=0.2)
+        assert cuarta.crudos_reutilizados == [] and cuarta.crudos_recalculados == ["Brent", "Maya"]
+
+    def test_cache_crudos_no_guarda_errores(self, rams_bytes, matriz_bytes):
+        from core.crudos_cache import CacheCrudos
+        cache = CacheCrudos()
+        for _ in range(2):
+            result = run_validation(
+                isa_files={"ISA_Roto.xlsx": io.BytesIO(b"not an excel")},
+                rams_files={"RAMS_Roto.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                cache_crudos=cache,
+            )
+            assert result.crudos_recalculados == ["Roto"] and not result.paired_names
+        assert len(cache) == 0
+
+    def test_detail_mismo_resumen(self, isa_bytes, rams_bytes, matriz_bytes):
+        def _ejecutar(detail):
+            return run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes), "ISA_Roto.xlsx": io.BytesIO(b"not an excel")},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes), "RAMS_Roto.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                detail=detail,
+            )
+
+        full, worst, none = _ejecutar("full"), _ejecutar("worst"), _ejecutar("none")
+        for result in (worst, none):
+            assert result.paired_names == full.paired_names == ["Maya"]
+            assert result.unpaired_isa == full.unpaired_isa
+            assert result.resumen_raw == full.resumen_raw
+            pd.testing.assert_frame_equal(result.summary, full.summary)
+        columnas = ["Propiedad", "Semaforo", "Corte_peor", "Error_peor", "Umbral_peor"]
+        pd.testing.assert_frame_equal(worst.crudo_dataframes["Maya"], full.crudo_dataframes["Maya"][columnas])
+        assert worst.cortes_visibles == {"Maya": []} and worst.detail == "worst"
+        assert none.crudo_dataframes == {} and none.cortes_visibles == {}
+        assert none.conteos_cortes == full.conteos_cortes
+
+        # Sin detalle también se puede reagregar
+        esperado = reaggregate(full, 0.5, 0.1)
+        assert reaggregate(none, 0.5, 0.1).resumen_raw == esperado.resumen_raw
+
+    def test_detail_invalido(self, isa_bytes, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="detail"):
+            run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                detail="todo",
+            )
+
+    def test_rams_con_columnas_extra(self, isa_bytes, rams_bytes, matriz_bytes, simple_rams):
+        rams_extra = simple_rams.assign(**{"Unidad": "kg", "400-450": 1.0, "Validación": "OK"})
+        buf = io.BytesIO()
+        rams_extra.to_excel(buf, index=False)
+
+        def _ejecutar(rams):
+            return run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+            )
+
+        base, extra = _ejecutar(rams_bytes), _ejecutar(buf.getvalue())
+        assert extra.cortes_visibles["Maya"] == ["150-200", "200-250", "300-350"]
+        pd.testing.assert_frame_equal(extra.crudo_dataframes["Maya"], base.crudo_dataframes["Maya"])
+        pd.testing.assert_frame_equal(extra.summary, base.summary)
+
+    def test_workers_invalido(self, isa_bytes, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="workers"):
+            run_validation(
+                isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                workers=0,
+            )
+
+    def test_pipeline_cache_umbrales(self, isa_bytes, rams_bytes, matriz_bytes, tmp_path, monkeypatch):
+        import core.validator_core as vc
+        from core.umbrales_cache import CacheUmbrales
+
+        cache = CacheUmbrales(tmp_path)
+        kwargs = dict(matriz_filename="Errores_Cortes.xlsx", cache_umbrales=cache)
+        frio = run_validation(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            **kwargs,
+        )
+        assert len(cache) == 1
+
+        def _no_parsear(*args, **kw):
+            raise AssertionError("la matriz no debe reparsearse en caliente")
+
+        monkeypatch.setattr(vc, "read_file_with_sheet", _no_parsear)
+        caliente = run_validation(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            **kwargs,
+        )
+        pd.testing.assert_frame_equal(frio.summary, caliente.summary)
+        pd.testing.assert_frame_equal(frio.crudo_dataframes["Maya"], caliente.crudo_dataframes["Maya"])
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_pipeline_cache_frames(self, isa_bytes, rams_bytes, matriz_bytes, simple_isa, simple_rams,
+                                   monkeypatch, workers):
+        import core.validator_core as vc
+        from core.frames_cache import CacheDataFrames
+
+        cache = CacheDataFrames()
+        isa_csv = simple_isa.to_csv(index=False, sep=";", decimal=",").encode()
+        rams_csv = simple_rams.to_csv(index=False).encode()
+
+        def _ejecutar(sufijo=""):
+            return run_validation(
+                isa_files={f"ISA_Maya{sufijo}.xlsx": io.BytesIO(isa_bytes),
+                           f"ISA_Brent{sufijo}.csv": io.BytesIO(isa_csv)},
+                rams_files={f"RAMS_Maya{sufijo}.xlsx": io.BytesIO(rams_bytes),
+                            f"RAMS_Brent{sufijo}.csv": io.BytesIO(rams_csv)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                workers=workers,
+                cache_frames=cache,
+            )
+
+        frio = _ejecutar()
+        assert cache.estadisticas()["hits"] == 0 and len(cache) == 4
+
+        def _no_parsear(*args, **kw):
+            raise AssertionError("ISA/RAMS no deben reparsearse en caliente")
+
+        monkeypatch.setattr(vc, "read_file", _no_parsear)
+        caliente = _ejecutar("_v2")             # mismos bytes, otros nombres
+        assert cache.estadisticas()["hits"] == 4
+        assert caliente.dialectos_csv["ISA_Brent_v2.csv"] == frio.dialectos_csv["ISA_Brent.csv"]
+        pd.testing.assert_frame_equal(frio.summary.rename(columns=lambda c: c.replace("_v2", "")),
+                                      caliente.summary.rename(columns=lambda c: c.replace("_v2", "")))
+        for nombre in ("Maya", "Brent"):
+            pd.testing.assert_frame_equal(frio.crudo_dataframes[nombre],
+                                          caliente.crudo_dataframes[f"{nombre}_v2"])
+
+    @staticmethod
+    def _zip(miembros) -> bytes:
+        import zipfile
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as zf:
+            for nombre, datos in miembros.items():
+                zf.writestr(nombre, datos)
+        return buf.getvalue()
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_pipeline_zip_igual_que_sueltos(self, isa_bytes, rams_bytes, matriz_bytes, simple_isa, workers):
+        isa_csv = simple_isa.to_csv(index=False, sep=";", decimal=",").encode()
+        sueltos = run_validation(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes), "ISA_Brent.csv": io.BytesIO(isa_csv),
+                       "ISA_Roto.xlsx": io.BytesIO(b"not an excel")},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes), "RAMS_Brent.xlsx": io.BytesIO(rams_bytes),
+                        "RAMS_Roto.xlsx": io.BytesIO(rams_bytes), "RAMS_Solo.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+        en_zip = run_validation(
+            isa_files={
+                "isa.zip": io.BytesIO(self._zip({
+                    "lote/ISA_Maya.xlsx": isa_bytes, "lote/ISA_Roto.xlsx": b"not an excel",
+                    "lote/leeme.txt": b"-",
+                })),
+                "ISA_Brent.csv": io.BytesIO(isa_csv),
+            },
+            rams_files={"rams.zip": io.BytesIO(self._zip({
+                "RAMS_Maya.xlsx": rams_bytes, "RAMS_Brent.xlsx": rams_bytes,
+                "RAMS_Roto.xlsx": rams_bytes, "otros/RAMS_Solo.xlsx": rams_bytes,
+            }))},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+            workers=workers,
+        )
+        assert en_zip.paired_names == sueltos.paired_names == ["Brent", "Maya"]
+        assert sorted(en_zip.unpaired_isa) == sorted(sueltos.unpaired_isa)
+        assert en_zip.unpaired_rams == sueltos.unpaired_rams == ["RAMS_Solo.xlsx"]
+        pd.testing.assert_frame_equal(en_zip.summary, sueltos.summary)
+        for name in sueltos.paired_names:
+            pd.testing.assert_frame_equal(en_zip.crudo_dataframes[name], sueltos.crudo_dataframes[name])
+
+    def test_zip_invalido(self, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="ZIP no válido"):
+            run_validation(
+                isa_files={"isa.zip": io.BytesIO(b"no es un zip")},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+            )
+
+    def test_zip_nombre_repetido(self, isa_bytes, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="repetido 'ISA_Maya.xlsx'"):
+            run_validation(
+                isa_files={"isa.zip": io.BytesIO(self._zip({"a/ISA_Maya.xlsx": isa_bytes,
+                                                            "b/ISA_Maya.xlsx": isa_bytes}))},
+                rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+            )
+
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_pipeline_multihoja(self, simple_isa, simple_rams, isa_bytes, rams_bytes, matriz_bytes,
+                                monkeypatch, workers):
+        import core.validator_core as vc
+        from core.frames_cache import CacheDataFrames
+
+        isa_brent = simple_isa.assign(**{"150-200": [853.0, 5.0, 0.3]})
+        libro_isa = TestLeerLibro._libro({"Maya": simple_isa, "ISA_Brent": isa_brent, "Notas": pd.DataFrame()})
+        libro_rams = TestLeerLibro._libro({"RAMS_Maya": simple_rams, "Extra": simple_rams})
+        buf = io.BytesIO()
+        isa_brent.to_excel(buf, index=False)
+
+        sueltos = run_validation(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes), "ISA_Brent.xlsx": io.BytesIO(buf.getvalue())},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes), "RAMS_Brent.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+        cache = CacheDataFrames()
+
+        def _libros():
+            return run_validation(
+                isa_files={"Lote_ISA.xlsx": io.BytesIO(libro_isa)},
+                rams_files={"Lote_RAMS.xlsx": io.BytesIO(libro_rams), "RAMS_Brent.xlsx": io.BytesIO(rams_bytes)},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+                workers=workers,
+                cache_frames=cache,
+                multihoja=True,
+            )
+
+        libros = _libros()
+        assert libros.paired_names == sueltos.paired_names == ["Brent", "Maya"]
+        assert libros.unpaired_rams == ["[Lote_RAMS.xlsx]Extra"] and not libros.unpaired_isa
+        pd.testing.assert_frame_equal(libros.summary, sueltos.summary)
+        for name in sueltos.paired_names:
+            pd.testing.assert_frame_equal(libros.crudo_dataframes[name], sueltos.crudo_dataframes[name])
+
+        # Las hojas pasan por la caché de DataFrames como cualquier archivo
+        def _no_parsear(*args, **kw):
+            raise AssertionError("las hojas no deben reparsearse en caliente")
+
+        monkeypatch.setattr(vc.LibroDiferido, "leer", _no_parsear)
+        monkeypatch.setattr(vc, "read_file", _no_parsear)
+        assert len(cache) == 4
+        pd.testing.assert_frame_equal(_libros().summary, libros.summary)
+        assert cache.estadisticas()["hits"] == 4
+
+    def test_expandir_libros_diferido(self, simple_isa, simple_rams, isa_bytes):
+        from contextlib import ExitStack
+        from core.validator_core import HojaLibro, expandir_libros, nombre_hoja
+
+        datos = TestLeerLibro._libro({"Maya": simple_isa, "Vacia": pd.DataFrame(), "Brent": simple_rams})
+        with ExitStack() as pila:
+            archivos, hojas = expandir_libros({"Lote.xlsx": io.BytesIO(datos), "ISA_Solo.xlsx": isa_bytes}, pila)
+            assert archivos["ISA_Solo.xlsx"] is isa_bytes
+            assert hojas == {nombre_hoja("Lote.xlsx", "Maya"): "Maya", nombre_hoja("Lote.xlsx", "Brent"): "Brent"}
+            maya, brent = archivos["[Lote.xlsx]Maya"], archivos["[Lote.xlsx]Brent"]
+            assert isinstance(maya, HojaLibro) and maya.libro is brent.libro
+            libro = maya.libro
+            assert libro._libro is None and libro._fuente is None      # solo se ha leído el índice
+
+            proyeccion = ProyeccionColumnas(cortes=frozenset())
+            pd.testing.assert_frame_equal(maya.leer(proyeccion), read_file(io.BytesIO(datos), "Lote.xlsx", proyeccion))
+            maya.cerrar()
+            assert libro._libro is not None                            # queda abierto para Brent
+            pd.testing.assert_frame_equal(brent.leer(), simple_rams)
+            brent.cerrar()
+            assert libro._libro is None and libro._fuente is None
+
+    def test_multihoja_desactivado_lee_la_primera(self, simple_isa, simple_rams, rams_bytes, matriz_bytes):
+        libro_isa = TestLeerLibro._libro({"Maya": simple_isa, "Brent": simple_isa})
+        result = run_validation(
+            isa_files={"ISA_Lote.xlsx": io.BytesIO(libro_isa)},
+            rams_files={"RAMS_Lote.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+        assert result.paired_names == ["Lote"]
+
+
+class TestIterValidation:
+
+    @staticmethod
+    def _entradas(isa_bytes, rams_bytes, matriz_bytes):
+        return dict(
+            isa_files={
+                "ISA_Maya.xlsx":  io.BytesIO(isa_bytes),
+                "ISA_Brent.xlsx": io.BytesIO(isa_bytes),
+                "ISA_Roto.xlsx":  io.BytesIO(b"not an excel"),
+                "ISA_Solo.xlsx":  io.BytesIO(isa_bytes),
+            },
+            rams_files={
+                "RAMS_Maya.xlsx":  io.BytesIO(rams_bytes),
+                "RAMS_Brent.xlsx": io.BytesIO(rams_bytes),
+                "RAMS_Roto.xlsx":  io.BytesIO(rams_bytes),
+            },
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+
+    @pytest.mark.parametrize("modo, workers", [("serie", 1), ("hilos", 2)])
+    def test_eventos_y_resultado(self, isa_bytes, rams_bytes, matriz_bytes, modo, workers):
+        eventos = list(iter_validation(
+            **self._entradas(isa_bytes, rams_bytes, matriz_bytes), workers=workers, modo_evaluacion=modo,
+        ))
+        tipos = [e.tipo for e in eventos]
+        assert tipos[:2] == ["umbrales", "emparejado"] and tipos[-1] == "fin"
+        assert eventos[1].total == 3
+        assert sorted(e.crudo for e in eventos if e.tipo == "leido") == ["Brent", "Maya"]
+        assert sorted(e.crudo for e in eventos if e.tipo == "evaluado") == ["Brent", "Maya"]
+        fallido, = [e for e in eventos if e.tipo == "fallido"]
+        assert fallido.crudo == "Roto" and fallido.mensaje
+        por_crudo = [e for e in eventos if e.tipo in ("evaluado", "fallido")]
+        assert [e.completados for e in por_crudo] == [1, 2, 3]
+        progreso = [e.progreso for e in eventos]
+        assert progreso == sorted(progreso) and progreso[-1] == 1.0
+        assert all(e.segundos >= 0 for e in eventos)
+
+        result = eventos[-1].resultado
+        esperado = run_validation(**self._entradas(isa_bytes, rams_bytes, matriz_bytes))
+        assert result.paired_names == esperado.paired_names == ["Brent", "Maya"]
+        assert result.unpaired_isa == esperado.unpaired_isa
+        pd.testing.assert_frame_equal(result.summary, esperado.summary)
+        for e in eventos:
+            if e.tipo == "evaluado":
+                pd.testing.assert_frame_equal(e.df_out, esperado.crudo_dataframes[e.crudo])
+                assert e.semaforo == esperado.summary.iloc[0][e.crudo]
+
+    def test_en_serie_leido_antes_de_evaluado(self, isa_bytes, rams_bytes, matriz_bytes):
+        tipos = [
+            (e.tipo, e.crudo)
+            for e in iter_validation(**self._entradas(isa_bytes, rams_bytes, matriz_bytes))
+            if e.tipo in ("leido", "evaluado")
+        ]
+        assert tipos == [("leido", "Brent"), ("evaluado", "Brent"), ("leido", "Maya"), ("evaluado", "Maya")]
+
+    @pytest.mark.parametrize("modo, workers", [("serie", 1), ("hilos", 2)])
+    def test_leido_antes_de_evaluar(self, isa_bytes, rams_bytes, matriz_bytes, monkeypatch, modo, workers):
+        import core.validator_core as vc
+        orden = []
+        evaluar = vc._evaluar_crudo
+
+        def _evaluar(crude_name, *args):
+            orden.append(("evaluar", crude_name))
+            return evaluar(crude_name, *args)
+
+        monkeypatch.setattr(vc, "_evaluar_crudo", _evaluar)
+        for e in iter_validation(
+            **self._entradas(isa_bytes, rams_bytes, matriz_bytes), workers=workers, modo_evaluacion=modo,
+        ):
+            if e.tipo == "leido":
+                orden.append(("leido", e.crudo))
+        for crudo in ("Brent", "Maya"):
+            assert orden.index(("leido", crudo)) < orden.index(("evaluar", crudo))
+
+    def test_parametros_invalidos_al_llamar(self, isa_bytes, rams_bytes, matriz_bytes):
+        with pytest.raises(ValueError, match="workers"):
+            iter_validation(**self._entradas(isa_bytes, rams_bytes, matriz_bytes), workers=0)
+
+    def test_cerrar_antes_del_final(self, isa_bytes, rams_bytes, matriz_bytes):
+        eventos = iter_validation(**self._entradas(isa_bytes, rams_bytes, matriz_bytes), workers=2)
+        for evento in eventos:
+            if evento.tipo == "evaluado":
+                break
+        eventos.close()
+        with pytest.raises(StopIteration):
+            next(eventos)
+
+
+# ===========================================================================
+# 16. Tests preflight (comprobación previa)
+# ===========================================================================
+
+class TestPreflight:
+
+    @staticmethod
+    def _xlsx(df: pd.DataFrame) -> bytes:
+        buf = io.BytesIO()
+        df.to_excel(buf, index=False)
+        return buf.getvalue()
+
+    def test_cabeceras_igual_que_read_file(self, simple_isa):
+        wb = openpyxl.Workbook()
+        for fila in (["Propiedad", "150-200", "150-200", None],
+                     ["Densidad", 1, 2, None, None, 7],
+                     [None, None, None],
+                     [3, 4],
+                     ["", None]):
+            wb.active.append(fila)
+        buf = io.BytesIO()
+        wb.save(buf)
+        csv = simple_isa.to_csv(index=False, sep=";", decimal=",").encode()
+        for nombre, datos in (("a.xlsx", buf.getvalue()), ("a.csv", csv)):
+            df = read_file(io.BytesIO(datos), nombre)
+            (cabecera,) = leer_cabeceras(io.BytesIO(datos), nombre)
+            assert list(cabecera.columnas) == list(df.columns)
+            props = canon_prop_series(pd.Series(cabecera.propiedades, dtype=object))
+            assert props.tolist() == canon_prop_series(df["Propiedad"]).tolist()
+
+    def test_sin_columna_propiedad(self):
+        (cabecera,) = leer_cabeceras(io.BytesIO(b"Prop;150-200\nX;1\n"), "a.csv")
+        assert cabecera.propiedades is None and cabecera.columnas == ("Prop", "150-200")
+
+    def test_todo_correcto(self, isa_bytes, rams_bytes, matriz_bytes):
+        report = preflight(
+            isa_files={"ISA_Maya.xlsx": io.BytesIO(isa_bytes)},
+            rams_files={"RAMS_Maya.xlsx": io.BytesIO(rams_bytes)},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+        )
+        assert report.ok and report.total_pairs == 1
+        crudo = report.crudos["Maya"]
+        assert crudo.cortes == ["150-200", "200-250", "300-350"] and crudo.n_propiedades == 3
+        assert crudo.propiedades_sin_umbral == ["VISCOSIDAD"]     # la matriz tiene VISCOSIDAD 50
+        assert not (crudo.cortes_sin_umbral or crudo.cortes_sin_rams or crudo.propiedades_sin_rams)
+        assert report.tabla["Estado"].tolist() == ["Avisos"]
+
+    def test_detecta_problemas_como_run_validation(self, simple_isa, simple_rams, isa_bytes, rams_bytes, matriz_bytes):
+        isa_brent = simple_isa.assign(**{"400-450": 1.0})
+        isa_brent.loc[len(isa_brent)] = ["Nitrógeno", 1.0, 1.0, 1.0, 1.0]
+        rams_brent = simple_rams.iloc[:2]
+        isa_files = {
+            "ISA_Maya.xlsx": isa_bytes,
+            "ISA_Brent.xlsx": self._xlsx(isa_brent),
+            "ISA_Sur.xlsx": isa_bytes,
+            "ISA_Roto.xlsx": b"not an excel",
+            "ISA_Solo.xlsx": isa_bytes,
+        }
+        rams_files = {
+            "RAMS_Maya.xlsx": rams_bytes,
+            "RAMS_Brent.xlsx": self._xlsx(rams_brent),
+            "RAMS_Sur.xlsx": self._xlsx(simple_rams.rename(columns={"Propiedad": "Prop"})),
+            "RAMS_Roto.xlsx": rams_bytes,
+        }
+
+        def _ejecutar(fn):
+            return fn(
+                isa_files={k: io.BytesIO(v) for k, v in isa_files.items()},
+                rams_files={k: io.BytesIO(v) for k, v in rams_files.items()},
+                matriz_file=io.BytesIO(matriz_bytes),
+                matriz_filename="Errores_Cortes.xlsx",
+            )
+
+        report, result = _ejecutar(preflight), _ejecutar(run_validation)
+        assert not report.ok
+        assert list(report.crudos) == ["Brent", "Maya", "Roto", "Sur"]
+        assert report.unpaired_isa == ["ISA_Solo.xlsx"] and not report.unpaired_rams
+        assert list(report.errores_lectura) == ["ISA_Roto.xlsx"]
+
+        brent = report.crudos["Brent"]
+        assert brent.ok and brent.con_avisos
+        assert brent.cortes_sin_umbral == brent.cortes_sin_rams == ["400-450"]
+        assert brent.propiedades_sin_umbral == ["VISCOSIDAD", "NITROGENO"]
+        assert brent.propiedades_sin_rams == ["AZUFRE", "NITROGENO"]
+        assert report.crudos["Sur"].errores == ["El archivo RAMS no tiene columna 'Propiedad'."]
+
+        # Los pares sin errores son exactamente los que la validación completa procesa
+        assert [n for n, c in report.crudos.items() if c.ok] == result.paired_names
+
+    def test_zip_y_multihoja(self, simple_isa, simple_rams, rams_bytes, matriz_bytes):
+        import zipfile
+        libro = TestLeerLibro._libro({"Maya": simple_isa, "Brent": simple_isa})
+        buf = io.BytesIO()
+        with zipfile.ZipFile(buf, "w") as zf:
+            zf.writestr("lote/RAMS_Maya.xlsx", rams_bytes)
+            zf.writestr("lote/RAMS_Brent.xlsx", rams_bytes)
+        report = preflight(
+            isa_files={"Lote_ISA.xlsx": io.BytesIO(libro)},
+            rams_files={"rams.zip": io.BytesIO(buf.getvalue())},
+            matriz_file=io.BytesIO(matriz_bytes),
+            matriz_filename="Errores_Cortes.xlsx",
+            multihoja=True,
+        )
+        assert report.ok and list(report.crudos) == ["Brent", "Maya"]
+        assert report.crudos["Maya"].isa == "[Lote_ISA.xlsx]Maya"
+
 
 # ===========================================================================
-# 16. Tests de compatibilidad
+# 17. Tests de compatibilidad
 # ===========================================================================
 
 class TestBackwardsCompat:
@@ -19,7 +19,7 @@ import re
 import pandas as pd
 import streamlit as st
 
-from core.models import ValidationResult
+from core.models import EventoValidacion, PreflightReport, ValidationResult
 
 # ---------------------------------------------------------------------------
 # Paleta de colores (idéntica al MVP)
@@ -56,6 +56,11 @@ def _df_to_csv_bytes(df: pd.DataFrame) -> bytes:
 
 def render_pairing_feedback(result: ValidationResult) -> None:
     """Muestra estado de emparejamiento de archivos."""
+    if result.crudos_reutilizados:
+        st.caption(
+            f"♻️ {len(result.crudos_reutilizados)} crudo(s) sin cambios reutilizados de la validación "
+            f"anterior; {len(result.crudos_recalculados)} recalculado(s)."
+        )
     if not result.unpaired_isa and not result.unpaired_rams:
         st.success(
             f"✅ Todos los archivos emparejados correctamente "
@@ -78,6 +83,108 @@ def render_pairing_feedback(result: ValidationResult) -> None:
         )
 
 
+def render_csv_dialects(result: ValidationResult) -> None:
+    """Muestra el formato detectado (separador, decimal, encoding) de los CSV leídos."""
+    if not result.dialectos_csv:
+        return
+    nombres = {"\t": "TAB", " ": "espacio"}
+    filas = [
+        {
+            "Archivo":   fname,
+            "Separador": nombres.get(d["sep"], d["sep"]),
+            "Decimal":   d["decimal"],
+            "Miles":     d["thousands"] or "—",
+            "Encoding":  d["encoding"],
+        }
+        for fname, d in sorted(result.dialectos_csv.items())
+    ]
+    with st.expander(f"📄 Formato detectado en {len(filas)} archivo(s) CSV", expanded=False):
+        st.dataframe(pd.DataFrame(filas), hide_index=True, use_container_width=True)
+
+
+# ---------------------------------------------------------------------------
+# Progreso de la validación (eventos de iter_validation)
+# ---------------------------------------------------------------------------
+
+def texto_progreso(evento: EventoValidacion) -> str:
+    """Texto de la barra de progreso para un evento de iter_validation."""
+    cuenta = f"{evento.completados}/{evento.total}"
+    if evento.tipo == "umbrales":
+        return f"⏳ Matriz de umbrales cargada ({evento.mensaje}). Emparejando archivos..."
+    if evento.tipo == "emparejado":
+        return f"⏳ {evento.mensaje}. Leyendo archivos..."
+    if evento.tipo == "leido":
+        return f"⏳ {cuenta} · leído `{evento.crudo}` ({evento.segundos:.2f} s)"
+    if evento.tipo == "evaluado":
+        return f"⏳ {cuenta} · `{evento.crudo}` evaluado ({evento.segundos:.2f} s)"
+    if evento.tipo == "fallido":
+        return f"⚠️ {cuenta} · `{evento.crudo}` con error"
+    return f"✅ {evento.total} crudo(s) en {evento.segundos:.1f} s"
+
+
+def render_crudos_terminados(eventos: list[EventoValidacion]) -> None:
+    """Tabla de los crudos ya terminados mientras la validación sigue en curso."""
+    filas = [
+        {
+            "Crudo":       e.crudo,
+            "Semáforo":    SEMAFORO_EMOJI.get(e.semaforo, e.semaforo) if e.tipo == "evaluado" else "❌ Error",
+            "Propiedades": len(e.df_out) if e.df_out is not None else 0,
+            "Tiempo (s)":  round(e.segundos, 2),
+            "Detalle":     "♻️ Sin cambios" if e.reutilizado else e.mensaje,
+        }
+        for e in eventos
+    ]
+    st.dataframe(pd.DataFrame(filas), hide_index=True, use_container_width=True)
+
+
+# ---------------------------------------------------------------------------
+# Comprobación previa (solo cabeceras)
+# ---------------------------------------------------------------------------
+
+def render_preflight(report: PreflightReport) -> None:
+    """Muestra el resultado de la comprobación previa: pares, cortes y propiedades."""
+    if report.ok:
+        st.success(
+            f"✅ Comprobación previa correcta: {report.total_pairs} "
+            f"par{'es' if report.total_pairs != 1 else ''} ({report.segundos:.2f} s)."
+        )
+    else:
+        st.warning(f"⚠️ La comprobación previa encontró problemas ({report.segundos:.2f} s).")
+
+    for fname, error in sorted(report.errores_lectura.items()):
+        st.error(f"❌ `{fname}`: {error}")
+    if report.unpaired_isa:
+        st.warning(
+            f"⚠️ **{len(report.unpaired_isa)} archivo(s) ISA sin par RAMS:**\n\n"
+            + "\n".join(f"- `{f}`" for f in report.unpaired_isa)
+        )
+    if report.unpaired_rams:
+        st.warning(
+            f"⚠️ **{len(report.unpaired_rams)} archivo(s) RAMS sin par ISA:**\n\n"
+            + "\n".join(f"- `{f}`" for f in report.unpaired_rams)
+        )
+    if not report.crudos:
+        return
+
+    st.dataframe(report.tabla, hide_index=True, use_container_width=True)
+    listas = (
+        ("Cortes sin umbral", "cortes_sin_umbral"),
+        ("Cortes sin RAMS", "cortes_sin_rams"),
+        ("Propiedades sin umbral", "propiedades_sin_umbral"),
+        ("Propiedades sin RAMS", "propiedades_sin_rams"),
+    )
+    for name, crudo in report.crudos.items():
+        if crudo.ok and not crudo.con_avisos:
+            continue
+        with st.expander(f"{'⚠️' if crudo.ok else '❌'} {name}", expanded=False):
+            for error in crudo.errores:
+                st.error(error)
+            for titulo, atributo in listas:
+                valores = getattr(crudo, atributo)
+                if valores:
+                    st.markdown(f"**{titulo}:** " + ", ".join(f"`{v}`" for v in valores))
+
+
 # ---------------------------------------------------------------------------
 # Tabla Resumen (idéntica a la hoja Resumen del MVP)
 # ---------------------------------------------------------------------------
@@ -250,6 +357,7 @@ def _render_errores_tab(df_out: pd.DataFrame, cortes_visibles: list[str]) -> Non
 def render_all_results(result: ValidationResult) -> None:
     """Renderiza todos los resultados de validación."""
     render_pairing_feedback(result)
+    render_csv_dialects(result)
 
     if not result.has_results:
         st.error("❌ No se pudo procesar ningún par de archivos.")
@@ -258,6 +366,9 @@ def render_all_results(result: ValidationResult) -> None:
     render_summary(result)
 
     st.subheader("🔍 Detalle por Crudo")
+    if result.detail == "none":
+        st.caption("Validación sin detalle por crudo (detail=\"none\"): solo el resumen.")
+        return
     for name in result.paired_names:
         df_out = result.crudo_dataframes.get(name, pd.DataFrame())
         cortes = result.cortes_visibles.get(name, [])